@@ -0,0 +1,161 @@
+"""
+Load test of the public form views under a local ASGI server (uvicorn),
+with the sync views and then with the async views (FORMBUILDER_ASYNC_VIEWS).
+
+Each simulated client fetches the form, then keeps alternating a submission
+and a fresh page load until the run ends; ``--think`` adds a pause between
+requests, as real (slow) visitors have. Reports requests/second and latency
+percentiles per mode and concurrency level.
+
+    pip install uvicorn
+    python benchmarks/asgi_load.py --clients 10 50 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.utils import BASE_DIR, create_field_types, create_form  # noqa: E402
+
+
+CSRF_URL = '/forms/api/csrf/'
+
+
+async def http(port, method, path, headers=(), body=b''):
+    """Send one HTTP/1.1 request and return (status, headers, body)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close',
+            f'Content-Length: {len(body)}', *headers]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, content = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    response_headers = [tuple(line.split(': ', 1)) for line in lines[1:] if ': ' in line]
+    return int(lines[0].split()[1]), response_headers, content
+
+
+async def client(port, slug, data, deadline, think, timings, errors):
+    display = f'/forms/f/{slug}/'
+    try:
+        # The cached display page carries no token; form_display.js fetches one
+        await http(port, 'GET', display)
+        status, headers, content = await http(port, 'GET', CSRF_URL)
+        cookie = next(v.split(';')[0] for k, v in headers if k.lower() == 'set-cookie' and v.startswith('csrftoken='))
+        token = json.loads(content)['token']
+    except Exception:
+        errors.append('setup')
+        return
+
+    body = urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+    post_headers = (f'Cookie: {cookie}', 'Content-Type: application/x-www-form-urlencoded')
+    while time.perf_counter() < deadline:
+        for method, path, headers, payload, expected in (
+            ('POST', f'{display}submit/', post_headers, body, 302),
+            ('GET', display, (f'Cookie: {cookie}',), b'', 200),
+        ):
+            start = time.perf_counter()
+            try:
+                status, _, _ = await http(port, method, path, headers, payload)
+            except OSError:
+                status = None
+            timings.append(time.perf_counter() - start)
+            if status != expected:
+                errors.append(status)
+            if think:
+                await asyncio.sleep(think)
+
+
+async def run_load(port, slug, data, clients, duration, think):
+    timings, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, slug, data, deadline, think, timings, errors) for _ in range(clients)))
+    return timings, errors
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f'ASGI server did not start on port {port}')
+
+
+def percentile(timings, pct):
+    return statistics.quantiles(timings, n=100)[pct - 1] * 1000 if len(timings) > 1 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fields', type=int, default=30)
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--think', type=float, default=0, help='Seconds each client waits between requests')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        sys.exit('This benchmark needs uvicorn: pip install uvicorn')
+
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'benchmarks.asgi_settings',
+        'FORMBUILDER_BENCHMARK_DB': os.path.join(tempfile.mkdtemp(), 'asgi_load.sqlite3'),
+        'PYTHONPATH': str(BASE_DIR),
+    }
+    os.environ.update(env)
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    create_field_types()
+    form = create_form(args.fields)
+    data = {
+        f'field_{field.id}': 'benchmark answer'
+        for field in form.fields.select_related('field_type')
+        if field.field_type.input_type in ('text', 'textarea')
+    }
+
+    print(f'{args.fields} fields, {args.duration:.0f}s per run, think time {args.think}s')
+    for label, async_views in (('sync views', '0'), ('async views', '1')):
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+             '--port', str(args.port), '--log-level', 'warning', '--no-access-log'],
+            cwd=BASE_DIR,
+            env={**env, 'FORMBUILDER_ASYNC_VIEWS': async_views},
+        )
+        try:
+            wait_for_port(args.port)
+            for clients in args.clients:
+                timings, errors = asyncio.run(
+                    run_load(args.port, form.slug, data, clients, args.duration, args.think)
+                )
+                print(
+                    f'  {label:<12} {clients:>4} clients  {len(timings) / args.duration:8.1f} req/s'
+                    f'  p50 {percentile(timings, 50):7.1f} ms  p95 {percentile(timings, 95):7.1f} ms'
+                    f'  {len(errors)} errors'
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
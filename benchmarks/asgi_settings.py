@@ -0,0 +1,14 @@
+"""
+Settings for the ASGI server started by benchmarks/asgi_load.py.
+
+The harness passes the database path and the view mode in the environment.
+"""
+import os
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import DATABASES
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+DATABASES['default']['NAME'] = os.environ['FORMBUILDER_BENCHMARK_DB']
+FORMBUILDER_ASYNC_VIEWS = os.environ.get('FORMBUILDER_ASYNC_VIEWS') == '1'
@@ -0,0 +1,48 @@
+"""
+Requests/second for form_display on a large published form, with and
+without the pre-rendered form body fragment cache.
+
+    python benchmarks/form_display.py --fields 200 --requests 300
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.utils import setup_django, create_field_types, create_form, measure  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fields', type=int, default=200)
+    parser.add_argument('--sections', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    create_field_types()
+    form = create_form(args.fields, sections=args.sections)
+    url = reverse('formbuilder:form_display', kwargs={'slug': form.slug})
+    client = Client()
+
+    def get():
+        response = client.get(url)
+        assert response.status_code == 200
+
+    print(f'form_display, {args.fields} fields, {args.requests} requests')
+    for label, enabled in (('fragment cache off', False), ('fragment cache on', True)):
+        cache.clear()
+        with override_settings(FORMBUILDER_FRAGMENT_CACHE=enabled):
+            get()  # warm the schema (and fragment) cache
+            total = sum(measure(get, args.requests))
+        print(f'  {label:<20} {args.requests / total:8.1f} req/s  {total / args.requests * 1000:7.2f} ms/req')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Submission throughput with synchronous writes versus the ingestion queue.
+
+Concurrent clients post to form_submit against a file-backed SQLite test
+database, first storing every submission directly and then only queueing
+it; the queued backlog is then stored with drain_submissions' batches.
+
+    python benchmarks/ingestion.py --fields 30 --requests 500 --clients 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.utils import setup_django, create_field_types, create_form  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fields', type=int, default=30)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    setup_django(test_db_name=os.path.join(db_dir, 'ingestion.sqlite3'))
+
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from formbuilder.models import FormSubmission
+    from formbuilder.submissions import drain_queued_submissions
+
+    create_field_types()
+    form = create_form(args.fields)
+    # Plain text answers for every field that takes free text
+    data = {
+        f'field_{field.id}': 'benchmark answer'
+        for field in form.fields.select_related('field_type')
+        if field.field_type.input_type in ('text', 'textarea')
+    }
+    url = reverse('formbuilder:form_submit', kwargs={'slug': form.slug})
+
+    def post_many(count):
+        client = Client()
+        failures = 0
+        for _ in range(count):
+            try:
+                if client.post(url, data).status_code != 302:
+                    failures += 1
+            except Exception:  # e.g. "database is locked" under contention
+                failures += 1
+        connection.close()
+        return failures
+
+    per_client = args.requests // args.clients
+    total_requests = per_client * args.clients
+    print(f'form_submit, {args.fields} fields, {total_requests} requests from {args.clients} clients')
+    for label, queued in (('synchronous', False), ('queued', True)):
+        with override_settings(FORMBUILDER_QUEUE_SUBMISSIONS=queued):
+            post_many(1)  # warm the schema cache
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                failures = sum(pool.map(post_many, [per_client] * args.clients))
+            total = time.perf_counter() - start
+        print(f'  {label:<12} {total_requests / total:8.1f} req/s  {failures} failed')
+
+    before = FormSubmission.objects.count()
+    start = time.perf_counter()
+    while drain_queued_submissions(args.batch_size):
+        pass
+    elapsed = time.perf_counter() - start
+    drained = FormSubmission.objects.count() - before
+    print(f'  {"drain":<12} {drained / elapsed:8.1f} submissions/s  (batch size {args.batch_size})')
+
+
+if __name__ == '__main__':
+    main()
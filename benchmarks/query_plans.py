@@ -0,0 +1,126 @@
+"""
+EXPLAIN QUERY PLAN output and timings for the queries behind each view,
+before and after the hot-path indexes (migration 0006).
+
+    python benchmarks/query_plans.py --submissions 50000 --fields 30
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.utils import setup_django, create_field_types, create_form  # noqa: E402
+
+
+INDEX_MIGRATION = '0006_hot_path_indexes'
+
+
+def seed(form_count, field_count, submission_count):
+    from django.utils import timezone
+    from datetime import timedelta
+    from formbuilder.models import FormSubmission, FormFieldValue
+
+    forms = [create_form(field_count, sections=5, name=f'Form {i}') for i in range(form_count)]
+    form = forms[0]
+    field_ids = list(form.fields.values_list('id', flat=True))
+    now = timezone.now()
+
+    batch_size = 2000
+    for start in range(0, submission_count, batch_size):
+        submissions = FormSubmission.objects.bulk_create([
+            FormSubmission(form=forms[i % form_count], data={})
+            for i in range(start, min(start + batch_size, submission_count))
+        ])
+        FormSubmission.objects.filter(pk__in=[s.pk for s in submissions]).update(submitted_at=now)
+        FormFieldValue.objects.bulk_create([
+            FormFieldValue(submission=s, field_id=field_id, value='x')
+            for s in submissions if s.form_id == form.id
+            for field_id in field_ids
+        ])
+    for i, submission in enumerate(FormSubmission.objects.order_by('id').only('id')[:submission_count:97]):
+        FormSubmission.objects.filter(pk=submission.pk).update(submitted_at=now - timedelta(minutes=i))
+    return form
+
+
+def query_shapes(form):
+    """The querysets each view runs, labelled by view"""
+    from formbuilder.models import Form, FormField, FormFieldValue
+
+    submissions = form.submissions.all()
+    middle = submissions.order_by('-submitted_at', '-id')[submissions.count() // 2]
+    return [
+        ('form_list', Form.objects.order_by('-created_at')[:50]),
+        ('form_list (status filter)', Form.objects.filter(status='published').order_by('-created_at')[:50]),
+        ('form_display: form', Form.objects.filter(slug=form.slug)),
+        ('form_display: fields', FormField.objects.filter(form=form).select_related('field_type').order_by('order')),
+        ('form_display: sections', form.sections.order_by('order')),
+        ('form_submissions: first page', submissions.order_by('-submitted_at', '-id')[:51]),
+        ('form_submissions: deep page', submissions.filter(
+            submitted_at__lt=middle.submitted_at
+        ).order_by('-submitted_at', '-id')[:51]),
+        ('api_get_submission: values', FormFieldValue.objects.filter(submission=middle).select_related('field')),
+        ('form_export: since id', submissions.filter(id__gt=middle.id).order_by('id').values_list('id', 'data')),
+    ]
+
+
+def hot_path_indexes():
+    """(model, index) for each index added by INDEX_MIGRATION"""
+    from django.apps import apps
+    from django.db import connection
+    from django.db.migrations.loader import MigrationLoader
+
+    migration = MigrationLoader(connection).get_migration('formbuilder', INDEX_MIGRATION)
+    return [(apps.get_model('formbuilder', op.model_name), op.index) for op in migration.operations]
+
+
+def report(form, repeat):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        for label, queryset in query_shapes(form):
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+
+            print(f'  {label:<32} {elapsed:9.3f} ms')
+            for line in plan:
+                print(f'      {line}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--forms', type=int, default=20)
+    parser.add_argument('--fields', type=int, default=30)
+    parser.add_argument('--submissions', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+
+    create_field_types()
+    form = seed(args.forms, args.fields, args.submissions)
+
+    # Only the indexes of INDEX_MIGRATION are dropped for the "before" plans;
+    # migrating back to 0005 would also undo every later migration
+    indexes = hot_path_indexes()
+    for label, change in (('before', 'remove_index'), ('after', 'add_index')):
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                getattr(editor, change)(model, index)
+        print(f'\n{label} indexes ({args.submissions} submissions)')
+        report(form, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
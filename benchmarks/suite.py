@@ -0,0 +1,196 @@
+"""
+Repeatable benchmark of the public views, the submissions and form lists
+and the builder APIs, reported as JSON.
+
+A form is seeded with seed_formbuilder's generator, then every scenario is
+driven through the test client: latency percentiles and queries per
+request over --requests timed calls, and the peak Python memory of a
+separate, shorter pass under tracemalloc (which would skew the timings).
+Save the output on two commits and pass one to --compare to see the
+change.
+
+    python benchmarks/suite.py --submissions 20000 --output before.json
+    python benchmarks/suite.py --submissions 20000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.utils import BASE_DIR, setup_django, create_field_types  # noqa: E402
+
+
+MEMORY_REQUESTS = 20
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scenarios(form, schema):
+    """(name, method, url name, url kwargs, payload factory) for each benchmarked request"""
+    from formbuilder.seeding import fake_answers
+
+    rng = random.Random(0)
+    checkbox_ids = {field.id for field in schema.fields if field.input_type == 'checkbox'}
+    field = form.fields.order_by('order').first()
+    section = form.sections.order_by('order').first()
+    field_ids = list(form.fields.order_by('order').values_list('id', flat=True))
+
+    def submission():
+        return {
+            f'field_{field_id}': value.split(',') if field_id in checkbox_ids else value
+            for field_id, value in fake_answers(schema, rng).items()
+        }
+
+    def field_update():
+        return json.dumps({'label': f'Question {rng.randrange(10 ** 6)}'})
+
+    def field_move():
+        return json.dumps({'move': {'id': field_ids[-1], 'before': field_ids[0]}})
+
+    requests = [
+        ('form_display', 'get', 'form_display', {'slug': form.slug}, None),
+        ('form_submit', 'post', 'form_submit', {'slug': form.slug}, submission),
+        ('form_submissions', 'get', 'form_submissions', {'pk': form.pk}, None),
+        ('form_list', 'get', 'form_list', {}, None),
+        ('form_edit', 'get', 'form_edit', {'pk': form.pk}, None),
+        ('api_get_field', 'get', 'api_get_field', {'pk': field.pk}, None),
+        ('api_get_section', 'get', 'api_get_section', {'pk': section.pk}, None),
+        ('api_update_field', 'json', 'api_update_field', {'pk': field.pk}, field_update),
+        ('api_reorder_fields', 'json', 'api_reorder_fields', {'pk': form.pk}, field_move),
+        ('api_form_analytics', 'get', 'api_form_analytics', {'pk': form.pk}, None),
+    ]
+    if section is None:
+        requests = [request for request in requests if request[0] != 'api_get_section']
+    return requests
+
+
+def run_scenario(client, method, url, payload, requests):
+    from django.db import connection
+    from formbuilder.instrumentation import RequestRecorder, percentile
+
+    def call():
+        data = payload() if payload else None
+        if method == 'get':
+            response = client.get(url)
+        elif method == 'json':
+            response = client.post(url, data, content_type='application/json')
+        else:
+            response = client.post(url, data)
+        assert response.status_code in (200, 302), f'{url} returned {response.status_code}'
+
+    call()  # warm the caches
+
+    timings = []
+    # Counted with a wrapper: the test client clears connection.queries per request
+    recorder = RequestRecorder()
+    with connection.execute_wrapper(recorder):
+        for _ in range(requests):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    for _ in range(min(requests, MEMORY_REQUESTS)):
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'requests': requests,
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        **{f'p{p}_ms': round(percentile(timings, p), 3) for p in (50, 95, 99)},
+        'queries_per_request': round(sum(recorder.queries.values()) / requests, 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(report, baseline):
+    print(f'{"scenario":<22} {"p50 ms":>16} {"p95 ms":>16} {"queries":>12}', file=sys.stderr)
+    for name, result in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        columns = [
+            f'{before[key]:>7g} -> {result[key]:<6g}'
+            for key in ('p50_ms', 'p95_ms', 'queries_per_request')
+        ]
+        print(f'{name:<22} ' + ' '.join(columns), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sections', type=int, default=5)
+    parser.add_argument('--fields', type=int, default=40)
+    parser.add_argument('--options', type=int, default=5)
+    parser.add_argument('--rules', type=int, default=5)
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--forms', type=int, default=50, help='Extra small forms, so form_list has rows')
+    parser.add_argument('--requests', type=int, default=100, help='Timed requests per scenario')
+    parser.add_argument('--only', nargs='*', help='Run only these scenarios')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='A previous report to print a comparison against')
+    args = parser.parse_args()
+
+    setup_django()
+
+    import django
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from formbuilder.schema import get_published_schema
+    from formbuilder.seeding import seed_form, seed_submissions
+
+    create_field_types()
+    form = seed_form('Benchmark Form', args.sections, args.fields, args.options, args.rules)
+    for _ in seed_submissions(form, args.submissions):
+        pass
+    for i in range(args.forms):
+        seed_form(f'Listed Form {i + 1}', fields=3)
+
+    client = Client()
+    client.force_login(User.objects.create_superuser('benchmark', password='benchmark'))
+
+    results = {}
+    for name, method, url_name, kwargs, payload in scenarios(form, get_published_schema(form.slug)):
+        if args.only and name not in args.only:
+            continue
+        url = reverse(f'formbuilder:{url_name}', kwargs=kwargs)
+        results[name] = run_scenario(client, method, url, payload, args.requests)
+        print(f'{name:<22} p50 {results[name]["p50_ms"]:8.2f} ms', file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'only')},
+        'scenarios': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(report, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
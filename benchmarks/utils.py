@@ -0,0 +1,74 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks run against a throwaway test database created the same way the
+test runner does, so they never touch db.sqlite3.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(test_db_name=None):
+    """
+    Configure Django and create a fresh test database.
+
+    ``test_db_name`` puts the test database in a file instead of the
+    default (in memory for SQLite), for benchmarks where disk writes matter.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    if test_db_name:
+        connection.settings_dict['TEST']['NAME'] = test_db_name
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def create_field_types():
+    from django.core.management import call_command
+    call_command('setup_field_types', stdout=open(os.devnull, 'w'))
+
+
+def create_form(field_count, sections=0, name='Benchmark Form'):
+    """Create a published form cycling through every field type"""
+    from formbuilder.models import FieldType, Form, FormField, FormSection
+
+    field_types = list(FieldType.objects.all())
+    form = Form.objects.create(name=name, status='published')
+    section_list = FormSection.objects.bulk_create([
+        FormSection(form=form, title=f'Section {i}', order=i) for i in range(sections)
+    ])
+    choices = {'choices': [{'value': f'Option {i}', 'label': f'Option {i}'} for i in range(5)]}
+
+    FormField.objects.bulk_create([
+        FormField(
+            form=form,
+            section=section_list[i % sections] if sections else None,
+            field_type=field_types[i % len(field_types)],
+            label=f'Question {i}',
+            order=i,
+            options=choices if field_types[i % len(field_types)].has_options else {},
+        )
+        for i in range(field_count)
+    ])
+    return form
+
+
+def measure(func, iterations):
+    """Call func repeatedly and return a list of per-call durations in seconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
@@ -67,6 +67,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # With the FTS trigger on submissions (migration 0011), concurrent
+            # submits in deferred transactions fail with "database is locked"
+            # instead of waiting; take the write lock when they begin
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -106,3 +112,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Uploaded files (file fields on submitted forms)
+# https://docs.djangoproject.com/en/6.0/topics/files/
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Compressed archives of pruned submissions (see prune_submissions)
+
+FORMBUILDER_ARCHIVE_DIR = BASE_DIR / 'archives'
+
+# Sampled request instrumentation: add
+# 'formbuilder.instrumentation.RequestInstrumentationMiddleware' to
+# MIDDLEWARE and raise the sample rate to record requests
+
+FORMBUILDER_INSTRUMENTATION_SAMPLE_RATE = 0
+FORMBUILDER_INSTRUMENTATION_LOG = BASE_DIR / 'logs' / 'formbuilder-requests.jsonl'
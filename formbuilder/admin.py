@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import FieldType, Form, FormSection, FormField, FormSubmission, FormFieldValue
+from .models import (
+    FieldType, Form, FormVersion, FormSection, FormField, FormSubmission, FormFieldValue, FormFieldFile, QueuedSubmission,
+    DailySubmissionCount, OptionCount,
+)
 
 
 @admin.register(FieldType)
@@ -11,12 +14,19 @@ class FieldTypeAdmin(admin.ModelAdmin):
 
 @admin.register(Form)
 class FormAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'status', 'created_by', 'created_at']
+    list_display = ['name', 'slug', 'status', 'created_by', 'created_at', 'retention_days']
     list_filter = ['status', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
 
 
+@admin.register(FormVersion)
+class FormVersionAdmin(admin.ModelAdmin):
+    list_display = ['form', 'number', 'published_by', 'published_at']
+    list_filter = ['form']
+    readonly_fields = ['snapshot']
+
+
 @admin.register(FormSection)
 class FormSectionAdmin(admin.ModelAdmin):
     list_display = ['title', 'form', 'order']
@@ -32,11 +42,36 @@ class FormFieldAdmin(admin.ModelAdmin):
 
 @admin.register(FormSubmission)
 class FormSubmissionAdmin(admin.ModelAdmin):
-    list_display = ['form', 'submitted_by', 'submitted_at']
+    list_display = ['form', 'form_version', 'submitted_by', 'submitted_at']
     list_filter = ['form', 'submitted_at']
 
 
 @admin.register(FormFieldValue)
 class FormFieldValueAdmin(admin.ModelAdmin):
     list_display = ['submission', 'field', 'value']
-    list_filter = ['submission__form']
\ No newline at end of file
+    list_filter = ['submission__form']
+
+
+@admin.register(FormFieldFile)
+class FormFieldFileAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'field', 'submission', 'size', 'content_type']
+    list_filter = ['submission__form']
+    search_fields = ['original_name', 'sha256']
+
+
+@admin.register(QueuedSubmission)
+class QueuedSubmissionAdmin(admin.ModelAdmin):
+    list_display = ['form', 'submitted_by', 'submitted_at']
+    list_filter = ['form']
+
+
+@admin.register(DailySubmissionCount)
+class DailySubmissionCountAdmin(admin.ModelAdmin):
+    list_display = ['form', 'date', 'count']
+    list_filter = ['form']
+
+
+@admin.register(OptionCount)
+class OptionCountAdmin(admin.ModelAdmin):
+    list_display = ['field', 'value', 'count']
+    list_filter = ['form']
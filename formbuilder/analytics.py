@@ -0,0 +1,179 @@
+"""
+Incremental submission analytics.
+
+Counters are bumped in the same transaction that stores a submission: one
+row per form per day, and one per (field, option) for choice fields. The
+dashboard only reads those rows, so its cost grows with the number of
+fields and days rather than with the number of submissions. The
+rebuild_analytics command recomputes them from stored submissions.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import DailySubmissionCount, OptionCount
+
+
+OPTION_INPUT_TYPES = {'select', 'radio', 'checkbox', 'yes_no'}
+
+
+def option_fields(schema):
+    return {field.id: field for field in schema.fields if field.input_type in OPTION_INPUT_TYPES}
+
+
+def split_options(field, value):
+    """
+    The options picked in one stored answer.
+
+    Checkbox answers are always counted in their stored, comma-joined form,
+    so live submissions and rebuild_analytics split them the same way.
+    """
+    if field.input_type == 'checkbox':
+        return [option for option in value.split(',') if option]
+    return [value] if value else []
+
+
+def count_submissions(schema, submissions):
+    """Tally [(submitted_at, {field_id: value})] into per-day and per-option Counters"""
+    days = Counter()
+    options = Counter()
+    fields = option_fields(schema)
+    for submitted_at, values in submissions:
+        days[timezone.localdate(submitted_at)] += 1
+        for field_id, field in fields.items():
+            if field_id in values:
+                for option in split_options(field, values[field_id]):
+                    options[field_id, option[:255]] += 1
+    return days, options
+
+
+def increment(model, columns, unique, rows):
+    """
+    Add counts to counter rows, creating missing ones.
+
+    ``rows`` are tuples of the ``columns`` values followed by the count, and
+    ``unique`` are the columns of the unique constraint that identifies a row. On
+    SQLite and PostgreSQL this is one INSERT ... ON CONFLICT DO UPDATE sent
+    with executemany; elsewhere each row is an UPDATE, plus an INSERT if
+    the row is new.
+    """
+    if not rows:
+        return
+
+    if connection.vendor in ('sqlite', 'postgresql'):
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        count = quote('count')
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(map(quote, columns))}, {count}) VALUES ({placeholders}) '
+                f'ON CONFLICT ({", ".join(map(quote, unique))}) '
+                f'DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+                rows,
+            )
+        return
+
+    for *values, added in rows:
+        values = dict(zip(columns, values))
+        lookup = {column: values[column] for column in unique}
+        if not model.objects.filter(**lookup).update(count=F('count') + added):
+            model.objects.create(count=added, **values)
+
+
+def record_submissions(schema, submissions):
+    """
+    Add stored submissions to the counters.
+
+    ``submissions`` are (submitted_at, {field_id: value}) pairs. Call this
+    inside the transaction that stores them.
+    """
+    days, options = count_submissions(schema, submissions)
+    adapt_date = connection.ops.adapt_datefield_value
+    increment(DailySubmissionCount, ['form_id', 'date'], ['form_id', 'date'], [
+        (schema.id, adapt_date(day), count) for day, count in days.items()
+    ])
+    increment(OptionCount, ['form_id', 'field_id', 'value'], ['field_id', 'value'], [
+        (schema.id, field_id, value, count) for (field_id, value), count in options.items()
+    ])
+
+
+def forget_submissions(schema, submissions):
+    """
+    Take deleted submissions back out of the counters.
+
+    Takes the same pairs as record_submissions; counters that drop to zero
+    are removed.
+    """
+    days, options = count_submissions(schema, submissions)
+    for day, count in days.items():
+        DailySubmissionCount.objects.filter(form_id=schema.id, date=day).update(
+            count=Greatest(F('count') - count, 0)
+        )
+    for (field_id, value), count in options.items():
+        OptionCount.objects.filter(field_id=field_id, value=value).update(count=Greatest(F('count') - count, 0))
+    DailySubmissionCount.objects.filter(form_id=schema.id, count=0).delete()
+    OptionCount.objects.filter(form_id=schema.id, count=0).delete()
+
+
+def rebuild_analytics(form, schema, rows):
+    """
+    Recompute a form's counters from its stored submissions.
+
+    ``rows`` are all of its submissions as exports.iter_submission_rows
+    yields them.
+    """
+    with transaction.atomic():
+        DailySubmissionCount.objects.filter(form=form).delete()
+        OptionCount.objects.filter(form=form).delete()
+
+        days, options = count_submissions(schema, ((submitted_at, values) for _, submitted_at, values in rows))
+        DailySubmissionCount.objects.bulk_create([
+            DailySubmissionCount(form=form, date=day, count=count) for day, count in days.items()
+        ], batch_size=1000)
+        OptionCount.objects.bulk_create([
+            OptionCount(form=form, field_id=field_id, value=value, count=count)
+            for (field_id, value), count in options.items()
+        ], batch_size=1000)
+
+    return sum(days.values())
+
+
+def form_analytics(schema):
+    """Totals, per-day counts and option frequencies for a form, read from the counters"""
+    days = list(DailySubmissionCount.objects.filter(form_id=schema.id).values_list('date', 'count'))
+    counts = {}
+    for field_id, value, count in OptionCount.objects.filter(form_id=schema.id).values_list(
+        'field_id', 'value', 'count'
+    ):
+        counts.setdefault(field_id, {})[value] = count
+
+    fields = []
+    for field in option_fields(schema).values():
+        field_counts = dict(counts.get(field.id, {}))
+        if field.input_type == 'yes_no':
+            choices = [('Yes', 'Yes'), ('No', 'No')]
+        else:
+            choices = [(choice['value'], choice.get('label', choice['value'])) for choice in field.choices]
+        options = [
+            {'value': value, 'label': label, 'count': field_counts.pop(value, 0)}
+            for value, label in choices
+        ]
+        # Answers for options that have since been removed from the field
+        options.extend({'value': value, 'label': value, 'count': count} for value, count in field_counts.items())
+        fields.append({
+            'field_id': field.id,
+            'label': field.label,
+            'input_type': field.input_type,
+            'options': options,
+        })
+
+    return {
+        'form_id': schema.id,
+        'total': sum(count for _, count in days),
+        'days': [{'date': day.isoformat(), 'count': count} for day, count in days],
+        'fields': fields,
+    }
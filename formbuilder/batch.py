@@ -0,0 +1,275 @@
+"""
+Apply a list of builder edits in one transaction.
+
+The form builder queues its edits and sends them as an ordered list of
+operations. Every section and field of the form is loaded once, the
+operations are applied in memory, and the result is written back with
+bulk_create, bulk_update and one DELETE per model. New rows are named by a
+client-side ``ref`` that later operations (and conditional logic rules) can
+use in place of an id; the response maps each ref to the id it was given.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .conditions import compile_conditions
+from .models import FieldType, FormField, FormSection
+from .ordering import ORDER_GAP, OrderingError, place
+from .signals import bump_schema_version, suspend_version_bumps
+from .validation import check_validations
+
+
+MAX_OPERATIONS = getattr(settings, 'FORMBUILDER_BATCH_MAX_OPERATIONS', 1000)
+
+SECTION_ATTRIBUTES = ('title', 'description')
+FIELD_ATTRIBUTES = (
+    'label', 'help_text', 'placeholder', 'is_required', 'options', 'validations', 'conditional_logic',
+)
+
+
+class BatchError(ValueError):
+    """Raised when an operation in a batch cannot be applied"""
+
+
+def parse_options(options):
+    """Turn the builder's one-choice-per-line text into an options dict"""
+    if isinstance(options, dict):
+        return options
+    lines = (line.strip() for line in options.strip().split('\n'))
+    return {'choices': [{'value': line, 'label': line} for line in lines if line]}
+
+
+def sort_key(row):
+    return row.order, row.pk is None, row.pk or 0
+
+
+class Batch:
+    """The sections and fields of one form, edited in memory and written back in bulk"""
+
+    def __init__(self, form, field_types):
+        self.form = form
+        self.field_types = field_types
+        self.rows = {
+            FormSection: list(form.sections.select_for_update()),
+            FormField: list(form.fields.select_for_update()),
+        }
+        self.by_id = {model: {row.pk: row for row in rows} for model, rows in self.rows.items()}
+        self.refs = {}
+        self.changed = {FormSection: {}, FormField: {}}
+        self.columns = {FormSection: set(), FormField: set()}
+        self.deleted = {FormSection: set(), FormField: set()}
+
+    def get(self, model, key):
+        """Look up a live row by id or by the ref of a row added earlier in the batch"""
+        if isinstance(key, str) and key in self.refs:
+            row = self.refs[key]
+        else:
+            try:
+                row = self.by_id[model].get(int(key))
+            except (TypeError, ValueError):
+                row = None
+        if not isinstance(row, model) or not any(r is row for r in self.rows[model]):
+            raise BatchError(f'Unknown {model._meta.verbose_name} {key!r}')
+        return row
+
+    def set(self, row, **values):
+        for name, value in values.items():
+            setattr(row, name, value)
+        if row.pk is not None:
+            self.changed[type(row)][row.pk] = row
+            self.columns[type(row)].update(values)
+
+    def add(self, row, op):
+        ref = op.get('ref')
+        if not isinstance(ref, str) or not ref or ref in self.refs:
+            raise BatchError('New rows need a unique string ref')
+        row.order = max((r.order for r in self.rows[type(row)]), default=0) + ORDER_GAP
+        self.refs[ref] = row
+        self.rows[type(row)].append(row)
+
+    def delete(self, model, op):
+        row = self.get(model, op.get('id'))
+        self.rows[model] = [r for r in self.rows[model] if r is not row]
+        if row.pk is not None:
+            self.deleted[model].add(row.pk)
+            self.changed[model].pop(row.pk, None)
+        return row
+
+    def move(self, model, op):
+        row = self.get(model, op.get('id'))
+        if model is FormField and 'section_id' in op:
+            self.set(row, section=self.section_for(op))
+
+        if op.get('order') is not None:
+            order = int(op['order'])
+            if order < 0:
+                raise BatchError('Orders cannot be negative')
+            self.set(row, order=order)
+        else:
+            try:
+                changed = place(
+                    sorted(self.rows[model], key=sort_key),
+                    row,
+                    before=self.get(model, op['before']) if op.get('before') else None,
+                    after=self.get(model, op['after']) if op.get('after') else None,
+                )
+            except OrderingError as e:
+                raise BatchError(str(e))
+            for moved in changed:
+                self.set(moved, order=moved.order)
+
+    def check_validations(self, rules):
+        try:
+            check_validations(rules)
+        except ValueError as e:
+            raise BatchError(str(e))
+
+    def section_for(self, op):
+        return self.get(FormSection, op['section_id']) if op.get('section_id') else None
+
+    def add_section(self, op):
+        if not op.get('title'):
+            raise BatchError('A section needs a title')
+        self.add(FormSection(form=self.form, title=op['title'], description=op.get('description', '')), op)
+
+    def update_section(self, op):
+        section = self.get(FormSection, op.get('id'))
+        self.set(section, **{name: op[name] for name in SECTION_ATTRIBUTES if name in op})
+
+    def delete_section(self, op):
+        section = self.delete(FormSection, op)
+        # Like api_delete_section, its fields move out of the section. Saved
+        # fields are also cleared by the SET_NULL when the row is deleted.
+        for field in self.rows[FormField]:
+            if section.pk is not None:
+                in_section = field.section_id == section.pk
+            else:
+                in_section = FormField.section.is_cached(field) and field.section is section
+            if in_section:
+                field.section = None
+
+    def move_section(self, op):
+        self.move(FormSection, op)
+
+    def add_field(self, op):
+        field_type = self.field_types.get(int(op.get('field_type_id') or 0))
+        if field_type is None:
+            raise BatchError(f"Unknown field type {op.get('field_type_id')!r}")
+        if not op.get('label'):
+            raise BatchError('A field needs a label')
+        field = FormField(
+            form=self.form,
+            section=self.section_for(op),
+            field_type=field_type,
+            label=op['label'],
+            help_text=op.get('help_text', ''),
+            placeholder=op.get('placeholder', ''),
+            is_required=bool(op.get('is_required', False)),
+            options=parse_options(op.get('options') or {}),
+            validations=op.get('validations') or {},
+            conditional_logic=op.get('conditional_logic') or {},
+        )
+        self.check_validations(field.validations)
+        self.add(field, op)
+
+    def update_field(self, op):
+        field = self.get(FormField, op.get('id'))
+        values = {name: op[name] for name in FIELD_ATTRIBUTES if name in op}
+        if 'options' in values:
+            values['options'] = parse_options(values['options'] or {})
+        if 'validations' in values:
+            self.check_validations(values['validations'])
+        if 'section_id' in op:
+            values['section'] = self.section_for(op)
+        self.set(field, **values)
+
+    def delete_field(self, op):
+        self.delete(FormField, op)
+
+    def move_field(self, op):
+        self.move(FormField, op)
+
+    def resolve_condition_refs(self):
+        """Point conditional logic rules that name a new field's ref at its id"""
+        ids = {ref: row.pk for ref, row in self.refs.items() if isinstance(row, FormField)}
+        for field in self.rows[FormField]:
+            rules = (field.conditional_logic or {}).get('rules') or []
+            if any(rule.get('field_id') in ids for rule in rules if isinstance(rule.get('field_id'), str)):
+                for rule in rules:
+                    if isinstance(rule.get('field_id'), str) and rule['field_id'] in ids:
+                        rule['field_id'] = ids[rule['field_id']]
+                self.set(field, conditional_logic=field.conditional_logic)
+
+    def save(self):
+        # Sections first, so new fields can point at new sections
+        FormSection.objects.bulk_create([row for row in self.rows[FormSection] if row.pk is None])
+        FormField.objects.bulk_create([row for row in self.rows[FormField] if row.pk is None])
+        self.resolve_condition_refs()
+
+        try:
+            compile_conditions({field.pk: field.conditional_logic for field in self.rows[FormField]})
+        except ValueError as e:
+            raise BatchError(str(e))
+
+        now = timezone.now()
+        for model in (FormSection, FormField):
+            changed = list(self.changed[model].values())
+            if not changed:
+                continue
+            columns = self.columns[model]
+            if model is FormField:
+                for row in changed:
+                    row.updated_at = now
+                columns.add('updated_at')
+            model.objects.bulk_update(changed, sorted(columns), batch_size=500)
+
+        if self.deleted[FormField]:
+            FormField.objects.filter(pk__in=self.deleted[FormField]).delete()
+        if self.deleted[FormSection]:
+            FormSection.objects.filter(pk__in=self.deleted[FormSection]).delete()
+
+
+OPERATIONS = {
+    name: getattr(Batch, name)
+    for name in (
+        'add_section', 'update_section', 'delete_section', 'move_section',
+        'add_field', 'update_field', 'delete_field', 'move_field',
+    )
+}
+
+
+def apply_batch(form, operations):
+    """
+    Apply an ordered list of operations to a form's sections and fields.
+
+    Everything happens in one transaction, and the schema version is bumped
+    once. Returns {ref: id} for every row added. Raises BatchError naming
+    the failing operation, in which case nothing is written.
+    """
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        raise BatchError('operations must be a list of objects')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'A batch can hold at most {MAX_OPERATIONS} operations')
+    if not operations:
+        return {}
+
+    type_ids = {op.get('field_type_id') for op in operations if op.get('op') == 'add_field'}
+    type_ids = {int(pk) for pk in type_ids if str(pk).isdigit()}
+    field_types = FieldType.objects.in_bulk(type_ids) if type_ids else {}
+
+    with transaction.atomic(), suspend_version_bumps():
+        batch = Batch(form, field_types)
+        for index, op in enumerate(operations):
+            handler = OPERATIONS.get(op.get('op'))
+            try:
+                if handler is None:
+                    raise BatchError(f"Unknown op {op.get('op')!r}")
+                handler(batch, op)
+            except BatchError as e:
+                raise BatchError(f'Operation {index}: {e}')
+            except (KeyError, TypeError, ValueError) as e:
+                raise BatchError(f'Operation {index}: invalid value {e}')
+        batch.save()
+        bump_schema_version([form.id])
+
+    return {ref: row.pk for ref, row in batch.refs.items() if row.pk is not None}
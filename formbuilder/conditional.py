@@ -0,0 +1,57 @@
+"""
+Conditional GET and HTTP cache headers.
+
+The public form pages only change when the form is published again, so
+they carry an ETag and Last-Modified taken from the published schema and
+are marked cacheable by browsers and shared proxies. Revalidating clients
+get a 304 answered from the cached schema, without a query or a render.
+Nothing on those pages depends on the visitor: the CSRF token is fetched
+separately by form_display.js (see api_csrf_token) and flashed messages are
+left for the builder pages.
+
+The builder's read APIs use the same validators privately, with
+Cache-Control: no-cache so the browser revalidates each time.
+"""
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+PUBLIC_CACHE_MAX_AGE = getattr(settings, 'FORMBUILDER_PUBLIC_CACHE_MAX_AGE', 60)
+
+
+def schema_etag(schema):
+    """A strong ETag for pages rendered from a FormSchema"""
+    return f'"{schema.id}-{schema.form_version_id or 0}-{schema.version}-{schema.updated_at.timestamp():.0f}"'
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 (or 412) response if the client's copy is current, otherwise None"""
+    return get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+
+def add_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def cache_publicly(response, etag, last_modified):
+    """Let browsers and proxies keep a public page for PUBLIC_CACHE_MAX_AGE seconds, then revalidate"""
+    if response.status_code not in (200, 304):
+        return response
+    add_validators(response, etag, last_modified)
+    patch_cache_control(response, public=True, max_age=PUBLIC_CACHE_MAX_AGE)
+    # The same bytes go to every visitor; proxies only need to split by encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cache_privately(response, etag, last_modified):
+    """Let only the user's browser keep a response, revalidating it on every use"""
+    if response.status_code not in (200, 304):
+        return response
+    add_validators(response, etag, last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
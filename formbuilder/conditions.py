@@ -0,0 +1,185 @@
+"""
+Server-side evaluation of show/hide conditional logic.
+
+A form's conditional_logic rules are compiled into a dependency graph in
+topological order, so a single forward pass decides which fields are
+visible, including fields that depend on other conditional fields. The
+same graph is handed to form_display.js so a change only re-evaluates the
+fields that depend on the changed input.
+"""
+from dataclasses import dataclass
+
+
+class ConditionCycleError(ValueError):
+    """Raised when conditional logic would make fields depend on themselves"""
+
+
+def _is_empty(value, expected):
+    return not value
+
+
+def _is_not_empty(value, expected):
+    return bool(value)
+
+
+def _equals(value, expected):
+    if isinstance(value, list):
+        return expected in value
+    return value == expected
+
+
+def _not_equals(value, expected):
+    return not _equals(value, expected)
+
+
+def _contains(value, expected):
+    if isinstance(value, list):
+        return any(expected in item for item in value)
+    return expected in value
+
+
+OPERATORS = {
+    'equals': _equals,
+    'not_equals': _not_equals,
+    'contains': _contains,
+    'is_empty': _is_empty,
+    'is_not_empty': _is_not_empty,
+}
+
+
+@dataclass(frozen=True)
+class ConditionGraph:
+    # field id -> (require all rules?, ((depends on field id, operator, value), ...))
+    rules: dict
+    # conditional field ids, each after every field it depends on
+    order: tuple
+    # field id -> conditional fields to re-evaluate when it changes, in order
+    affected: dict
+
+    def hidden_fields(self, values):
+        """Return the ids of fields hidden by conditional logic for the given answers"""
+        hidden = set()
+        for field_id in self.order:
+            require_all, rules = self.rules[field_id]
+            results = (
+                dep_id in values and OPERATORS[operator](
+                    '' if dep_id in hidden else values[dep_id], expected
+                )
+                for dep_id, operator, expected in rules
+            )
+            if not (all(results) if require_all else any(results)):
+                hidden.add(field_id)
+        return hidden
+
+    def as_json(self):
+        """The graph in the shape form_display.js expects"""
+        return {
+            'rules': {
+                field_id: {
+                    'all': require_all,
+                    'rules': [{'field_id': d, 'operator': o, 'value': v} for d, o, v in rules],
+                }
+                for field_id, (require_all, rules) in self.rules.items()
+            },
+            'order': list(self.order),
+            'affected': {field_id: list(ids) for field_id, ids in self.affected.items()},
+        }
+
+
+def rule_field_id(rule):
+    """The field a rule depends on, or None for a malformed rule"""
+    try:
+        return int(rule['field_id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def parse_rules(logic):
+    """
+    Return (require_all, rules) for a conditional_logic dict, or None if it has no rules.
+
+    Rules without a numeric field id or with an unknown operator are
+    skipped. Only an explicit 'AND' requires every rule to match.
+    """
+    rules = tuple(
+        (rule_field_id(rule), rule.get('operator', 'equals'), str(rule.get('value') or ''))
+        for rule in (logic or {}).get('rules', [])
+        if isinstance(rule, dict) and rule_field_id(rule) and rule.get('operator', 'equals') in OPERATORS
+    )
+    if not rules:
+        return None
+    return logic.get('logic_type') == 'AND', rules
+
+
+def topological_order(dependencies):
+    """
+    Order field ids so each comes after the fields it depends on.
+
+    ``dependencies`` maps field id -> set of field ids. Raises
+    ConditionCycleError naming the fields involved if there is a cycle.
+    """
+    order = []
+    state = {}
+
+    def visit(field_id, path):
+        if state.get(field_id) == 'done':
+            return
+        if state.get(field_id) == 'visiting':
+            cycle = path[path.index(field_id):]
+            raise ConditionCycleError(
+                'Conditional logic creates a cycle between fields ' + ' -> '.join(map(str, cycle + [field_id]))
+            )
+        state[field_id] = 'visiting'
+        for dep_id in sorted(dependencies.get(field_id, ())):
+            visit(dep_id, path + [field_id])
+        state[field_id] = 'done'
+        order.append(field_id)
+
+    for field_id in sorted(dependencies):
+        visit(field_id, [])
+    return order
+
+
+def compile_conditions(logic_by_field):
+    """Build a ConditionGraph from {field_id: conditional_logic}"""
+    rules = {}
+    for field_id, logic in logic_by_field.items():
+        parsed = parse_rules(logic)
+        if parsed:
+            rules[field_id] = parsed
+
+    dependencies = {
+        field_id: {dep_id for dep_id, _, _ in field_rules}
+        for field_id, (_, field_rules) in rules.items()
+    }
+    order = [field_id for field_id in topological_order(dependencies) if field_id in rules]
+    position = {field_id: i for i, field_id in enumerate(order)}
+
+    # Everything downstream of each field, in evaluation order
+    dependents = {}
+    for field_id, deps in dependencies.items():
+        for dep_id in deps:
+            dependents.setdefault(dep_id, set()).add(field_id)
+    affected = {}
+    for source in dependents:
+        seen, stack = set(), [source]
+        while stack:
+            for field_id in dependents.get(stack.pop(), ()):
+                if field_id not in seen:
+                    seen.add(field_id)
+                    stack.append(field_id)
+        affected[source] = tuple(sorted(seen, key=position.__getitem__))
+
+    return ConditionGraph(rules=rules, order=tuple(order), affected=affected)
+
+
+def check_conditional_logic(form, field_id, logic):
+    """
+    Raise ConditionCycleError if saving ``logic`` on a field would create a cycle.
+
+    ``field_id`` is None for a field that does not exist yet.
+    """
+    logic_by_field = dict(form.fields.values_list('id', 'conditional_logic'))
+    # Nothing can depend on a new field yet, so any placeholder id will do
+    logic_by_field[field_id or 0] = logic
+    compile_conditions(logic_by_field)
@@ -0,0 +1,54 @@
+"""
+Pre-rendered HTML for published forms.
+
+The field markup of a form only changes when its schema version changes, so
+it is rendered once and kept in the cache. Views splice the per-request bits
+(CSRF token, messages) around the stored fragment.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FORMBUILDER_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def form_body_cache_key(schema):
+    return f'formbuilder:form_body:{schema.id}:{schema.version}'
+
+
+def render_form_body(schema, values=None, errors=None):
+    """Render the field markup, optionally refilled with submitted values and errors"""
+    return render_to_string('formbuilder/partials/form_body.html', {
+        'sections': schema.sections,
+        'fields_without_section': schema.fields_without_section,
+        'values': values,
+        'errors': errors,
+    })
+
+
+def get_form_body(schema):
+    """Return the rendered field markup for a schema, from cache when enabled"""
+    if not getattr(settings, 'FORMBUILDER_FRAGMENT_CACHE', True):
+        return render_form_body(schema)
+
+    key = form_body_cache_key(schema)
+    body = cache.get(key)
+    if body is None:
+        body = render_form_body(schema)
+        cache.set(key, body, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(body)
+
+
+async def aget_form_body(schema):
+    """Async get_form_body; only the cache lookups are awaited"""
+    if not getattr(settings, 'FORMBUILDER_FRAGMENT_CACHE', True):
+        return render_form_body(schema)
+
+    key = form_body_cache_key(schema)
+    body = await cache.aget(key)
+    if body is None:
+        body = render_form_body(schema)
+        await cache.aset(key, body, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(body)
@@ -0,0 +1,227 @@
+"""
+Sampled per-request instrumentation of the form builder views.
+
+Add ``formbuilder.instrumentation.RequestInstrumentationMiddleware`` to
+MIDDLEWARE and set FORMBUILDER_INSTRUMENTATION_SAMPLE_RATE (0 to 1) to
+record a share of the requests served by formbuilder URLs. Each sampled
+request writes one JSON line to a rotating log: view name, wall time,
+number and total time of SQL queries, template render time, and any query
+that ran FORMBUILDER_INSTRUMENTATION_DUPLICATE_THRESHOLD times or more
+(usually an N+1 loop). Requests that are not sampled only pay for one
+random() call. api_instrumentation aggregates the log into per-view
+percentiles.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import Template
+
+
+SAMPLE_RATE = getattr(settings, 'FORMBUILDER_INSTRUMENTATION_SAMPLE_RATE', 0)
+LOG_PATH = Path(getattr(settings, 'FORMBUILDER_INSTRUMENTATION_LOG', 'formbuilder-requests.jsonl'))
+LOG_MAX_BYTES = getattr(settings, 'FORMBUILDER_INSTRUMENTATION_LOG_MAX_BYTES', 5 * 1024 * 1024)
+LOG_BACKUP_COUNT = getattr(settings, 'FORMBUILDER_INSTRUMENTATION_LOG_BACKUPS', 3)
+DUPLICATE_THRESHOLD = getattr(settings, 'FORMBUILDER_INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+
+PERCENTILES = (50, 95, 99)
+METRICS = ('wall_ms', 'queries', 'sql_ms', 'template_ms')
+
+logger = logging.getLogger('formbuilder.instrumentation')
+logger.propagate = False
+
+_current = ContextVar('formbuilder_request_recorder', default=None)
+
+
+class RequestRecorder:
+    """Collects the queries and template time of one request"""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper(); ``sql`` still has its
+        # placeholders, so repeats of the same query count as one pattern
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries[sql] += 1
+
+    def duplicates(self):
+        return [
+            {'sql': sql[:500], 'count': count}
+            for sql, count in self.queries.most_common()
+            if count >= DUPLICATE_THRESHOLD
+        ]
+
+
+def timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        recorder = _current.get()
+        # Only the outermost render is timed; includes are part of it
+        if recorder is None or recorder.rendering:
+            return render(self, *args, **kwargs)
+        recorder.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            recorder.template_time += time.perf_counter() - start
+            recorder.rendering = False
+    wrapper.formbuilder_timed = True
+    return wrapper
+
+
+def install_template_timer():
+    if not getattr(Template.render, 'formbuilder_timed', False):
+        Template.render = timed_render(Template.render)
+
+
+def install_log_handler():
+    """Point the logger at LOG_PATH, replacing a handler left for another path"""
+    path = str(LOG_PATH.absolute())
+    if any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+        return
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Record timings and queries for a sample of formbuilder requests.
+
+    Works under WSGI and ASGI, including the async public views enabled by
+    FORMBUILDER_ASYNC_VIEWS. Connections are per thread, and async views
+    query through sync_to_async, so on that path the wrapper is installed on
+    the connection of the thread sync_to_async runs on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_template_timer()
+        install_log_handler()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not sampled():
+            return self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        log_request(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not sampled():
+            return await self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        await sync_to_async(add_execute_wrapper)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_execute_wrapper)(recorder)
+            _current.reset(token)
+        log_request(request, response, recorder, time.perf_counter() - start)
+        return response
+
+
+def add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+def sampled():
+    return SAMPLE_RATE and random.random() < SAMPLE_RATE
+
+
+def log_request(request, response, recorder, wall_time):
+    match = request.resolver_match
+    if match is None or match.namespace != 'formbuilder':
+        return
+    logger.info(json.dumps({
+        'view': match.view_name,
+        'method': request.method,
+        'status': response.status_code,
+        'wall_ms': round(wall_time * 1000, 3),
+        'queries': sum(recorder.queries.values()),
+        'sql_ms': round(recorder.sql_time * 1000, 3),
+        'template_ms': round(recorder.template_time * 1000, 3),
+        'duplicates': recorder.duplicates(),
+    }))
+
+
+def log_files():
+    """The rotating log and its backups, oldest first"""
+    backups = [LOG_PATH.with_name(f'{LOG_PATH.name}.{i}') for i in range(LOG_BACKUP_COUNT, 0, -1)]
+    return [path for path in backups + [LOG_PATH] if path.exists()]
+
+
+def read_records():
+    for path in log_files():
+        with open(path, encoding='utf-8') as lines:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a rotation or a crash
+                    continue
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted ``values``"""
+    index = max(0, -(-len(values) * p // 100) - 1)
+    return values[index]
+
+
+def summarize(records):
+    """Per-view request counts, percentiles of each metric, and N+1 counts"""
+    by_view = {}
+    for record in records:
+        by_view.setdefault(record['view'], []).append(record)
+
+    views = []
+    for view, items in sorted(by_view.items()):
+        summary = {'view': view, 'count': len(items)}
+        for metric in METRICS:
+            values = sorted(item[metric] for item in items)
+            summary[metric] = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+        summary['duplicate_query_requests'] = sum(1 for item in items if item['duplicates'])
+        views.append(summary)
+    return views
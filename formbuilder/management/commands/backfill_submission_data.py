@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from formbuilder.models import FormSubmission, FormFieldValue
+
+
+class Command(BaseCommand):
+    help = 'Fills FormSubmission.data from FormFieldValue rows for older submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only backfill submissions of this form id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        submissions = FormSubmission.objects.filter(data__isnull=True).order_by('id')
+        if options['form']:
+            submissions = submissions.filter(form_id=options['form'])
+
+        updated_count = 0
+        last_id = 0
+        while True:
+            batch = list(submissions.filter(id__gt=last_id).only('id')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            data = {submission.id: {} for submission in batch}
+            values = FormFieldValue.objects.filter(submission__in=batch).order_by()
+            for submission_id, field_id, value in values.values_list('submission_id', 'field_id', 'value'):
+                data[submission_id][str(field_id)] = value
+
+            for submission in batch:
+                submission.data = data[submission.id]
+            FormSubmission.objects.bulk_update(batch, ['data'])
+
+            updated_count += len(batch)
+            self.stdout.write(f'Backfilled {updated_count} submissions...')
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Backfilled {updated_count} submissions.'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from formbuilder.submissions import drain_queued_submissions
+
+
+class Command(BaseCommand):
+    help = 'Stores submissions queued by form_submit (FORMBUILDER_QUEUE_SUBMISSIONS) in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Submissions stored per transaction')
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep polling the queue instead of exiting once it is empty')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait between polls of an empty queue with --watch')
+
+    def handle(self, *args, **options):
+        stored_count = 0
+        while True:
+            stored = drain_queued_submissions(options['batch_size'])
+            stored_count += stored
+            if stored:
+                self.stdout.write(f'Stored {stored_count} submissions...')
+            elif options['watch']:
+                time.sleep(options['interval'])
+            else:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Stored {stored_count} submissions.'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from formbuilder.exports import EXPORT_FORMATS, parse_export_filters, stream_export
+from formbuilder.models import Form
+
+
+class Command(BaseCommand):
+    help = 'Streams the submissions of a form as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('form_id', type=int)
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--since-id', help='Only export submissions with a greater id')
+        parser.add_argument('--start', help='Only export submissions on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Only export submissions on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            form = Form.objects.get(pk=options['form_id'])
+        except Form.DoesNotExist:
+            raise CommandError(f'Form {options["form_id"]} does not exist')
+
+        try:
+            filters = parse_export_filters(
+                since_id=options['since_id'], start=options['start'], end=options['end']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = stream_export(form, options['format'], **filters)
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(chunks)
+            self.stdout.write(self.style.SUCCESS(f'Exported to {options["output"]}'))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
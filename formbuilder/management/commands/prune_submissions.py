@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from formbuilder.models import Form
+from formbuilder.retention import PRUNE_BATCH_SIZE, prune_form, purge_form
+
+
+class Command(BaseCommand):
+    help = ('Prunes submissions older than each form\'s retention_days, archiving them first, '
+            'and finishes deleting forms queued for deletion')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only process this form id')
+        parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE,
+                            help='Submissions deleted per transaction')
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep running instead of exiting after one pass')
+        parser.add_argument('--interval', type=float, default=3600,
+                            help='Seconds to wait between passes with --watch')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
+
+    def run_once(self, options):
+        forms = Form.objects.order_by('id')
+        if options['form']:
+            forms = forms.filter(id=options['form'])
+
+        for form in forms.filter(deletion_requested_at__isnull=False):
+            deleted = purge_form(form, options['batch_size'])
+            self.stdout.write(f'Deleted form "{form.name}" and {deleted} submissions')
+
+        pruned_count = 0
+        for form in forms.filter(retention_days__isnull=False, deletion_requested_at__isnull=True):
+            pruned, archive = prune_form(form, options['batch_size'])
+            pruned_count += pruned
+            if pruned:
+                self.stdout.write(f'{form.name}: pruned {pruned} submissions' + (f' into {archive}' if archive else ''))
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Pruned {pruned_count} submissions.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from formbuilder.analytics import rebuild_analytics
+from formbuilder.exports import iter_submission_rows
+from formbuilder.models import Form
+from formbuilder.schema import get_form_schema
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the submission analytics counters from stored submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only rebuild the counters of this form id')
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by('id')
+        if options['form']:
+            forms = forms.filter(id=options['form'])
+
+        submission_count = 0
+        for form in forms:
+            counted = rebuild_analytics(form, get_form_schema(form.slug), iter_submission_rows(form))
+            submission_count += counted
+            self.stdout.write(f'{form.name}: {counted} submissions')
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Counted {submission_count} submissions.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from formbuilder.retention import PRUNE_BATCH_SIZE, rehydrate_archive
+
+
+class Command(BaseCommand):
+    help = 'Restores submissions from archives written by prune_submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archives', nargs='+', help='.jsonl.gz archive files')
+        parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE,
+                            help='Submissions restored per transaction')
+
+    def handle(self, *args, **options):
+        restored_count = 0
+        for path in options['archives']:
+            restored = rehydrate_archive(path, options['batch_size'])
+            restored_count += restored
+            self.stdout.write(f'{path}: restored {restored} submissions')
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Restored {restored_count} submissions.'))
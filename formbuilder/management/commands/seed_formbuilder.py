@@ -0,0 +1,52 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from formbuilder.models import FieldType
+from formbuilder.seeding import free_names, seed_form, seed_submissions
+
+
+class Command(BaseCommand):
+    help = 'Creates published forms filled with synthetic submissions, for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=1,
+                            help='Number of forms to create')
+        parser.add_argument('--sections', type=int, default=5,
+                            help='Sections per form')
+        parser.add_argument('--fields', type=int, default=20,
+                            help='Fields per form, cycling through the field types')
+        parser.add_argument('--options', type=int, default=5,
+                            help='Options per select, radio and checkbox field')
+        parser.add_argument('--rules', type=int, default=0,
+                            help='Fields per form shown only when the first choice field has its first option')
+        parser.add_argument('--submissions', type=int, default=1000,
+                            help='Submissions per form')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread submission times over this many past days')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Submissions inserted per transaction')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, so runs are repeatable')
+
+    def handle(self, *args, **options):
+        if not FieldType.objects.exists():
+            call_command('setup_field_types', stdout=self.stdout)
+
+        total = 0
+        for i, name in enumerate(free_names('Seeded Form', options['forms'])):
+            form = seed_form(
+                name,
+                sections=options['sections'],
+                fields=options['fields'],
+                options=options['options'],
+                rules=options['rules'],
+            )
+            self.stdout.write(f'Created "{form.name}" ({form.slug}) with {options["fields"]} fields')
+
+            for seeded in seed_submissions(form, options['submissions'], options['batch_size'],
+                                           options['days'], options['seed'] + i):
+                self.stdout.write(f'  {seeded} submissions...')
+            total += options['submissions']
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDone! Created {options["forms"]} forms and {total} submissions.'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0003_rename_defauld_validations_fieldtype_default_validations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='schema_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever sections or fields change'),
+        ),
+    ]
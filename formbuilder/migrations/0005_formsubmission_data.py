@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0004_form_schema_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='data',
+            field=models.JSONField(blank=True, help_text='All answers as {field_id: value}', null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0005_formsubmission_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['-created_at'], name='fb_form_created'),
+        ),
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['status', '-created_at'], name='fb_form_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='formfield',
+            index=models.Index(fields=['form', 'order'], name='fb_field_form_order'),
+        ),
+        migrations.AddIndex(
+            model_name='formfield',
+            index=models.Index(fields=['section', 'order'], name='fb_field_section_order'),
+        ),
+        migrations.AddIndex(
+            model_name='formfieldvalue',
+            index=models.Index(fields=['submission', 'field'], name='fb_value_submission_field'),
+        ),
+        migrations.AddIndex(
+            model_name='formsection',
+            index=models.Index(fields=['form', 'order'], name='fb_section_form_order'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', '-submitted_at', '-id'], name='fb_submission_form_recent'),
+        ),
+    ]
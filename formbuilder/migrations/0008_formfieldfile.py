@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 21:05
+
+import django.db.models.deletion
+import formbuilder.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0007_submission_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(max_length=255, storage=formbuilder.uploads.upload_storage, upload_to='')),
+                ('original_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='formbuilder.formfield')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='formbuilder.formsubmission')),
+            ],
+        ),
+    ]
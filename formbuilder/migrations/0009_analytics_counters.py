@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0008_formfieldfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySubmissionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='formbuilder.form')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('form', 'date'), name='fb_daily_count_form_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OptionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_counts', to='formbuilder.formfield')),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_counts', to='formbuilder.form')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='fb_option_count_field_value')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 22:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0009_analytics_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['created_by', '-created_at'], name='fb_form_creator_created'),
+        ),
+    ]
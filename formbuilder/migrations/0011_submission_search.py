@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-18 22:40
+
+from django.db import migrations
+
+
+# SQLite: an FTS5 table keyed by submission id, filled from the JSON
+# payload by triggers so every write path (including bulk inserts and
+# cascaded deletes) keeps it in sync.
+SQLITE_FORWARDS = [
+    'CREATE VIRTUAL TABLE formbuilder_submission_search USING fts5(form_id, content)',
+    '''CREATE TRIGGER formbuilder_submission_search_insert
+       AFTER INSERT ON formbuilder_formsubmission WHEN new.data IS NOT NULL
+       BEGIN
+           INSERT INTO formbuilder_submission_search (rowid, form_id, content)
+           SELECT new.id, new.form_id, group_concat(value, ' ') FROM json_each(new.data);
+       END''',
+    '''CREATE TRIGGER formbuilder_submission_search_update
+       AFTER UPDATE OF data ON formbuilder_formsubmission
+       BEGIN
+           DELETE FROM formbuilder_submission_search WHERE rowid = old.id;
+           INSERT INTO formbuilder_submission_search (rowid, form_id, content)
+           SELECT new.id, new.form_id, group_concat(value, ' ') FROM json_each(new.data);
+       END''',
+    '''CREATE TRIGGER formbuilder_submission_search_delete
+       AFTER DELETE ON formbuilder_formsubmission
+       BEGIN
+           DELETE FROM formbuilder_submission_search WHERE rowid = old.id;
+       END''',
+    '''INSERT INTO formbuilder_submission_search (rowid, form_id, content)
+       SELECT id, form_id, (SELECT group_concat(value, ' ') FROM json_each(data))
+       FROM formbuilder_formsubmission WHERE data IS NOT NULL''',
+]
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER formbuilder_submission_search_insert',
+    'DROP TRIGGER formbuilder_submission_search_update',
+    'DROP TRIGGER formbuilder_submission_search_delete',
+    'DROP TABLE formbuilder_submission_search',
+]
+
+# PostgreSQL: a GIN index over the string values of the JSON payload
+POSTGRESQL_FORWARDS = [
+    '''CREATE INDEX fb_submission_search ON formbuilder_formsubmission
+       USING GIN (jsonb_to_tsvector('simple', data, '["string"]'))''',
+]
+POSTGRESQL_BACKWARDS = [
+    'DROP INDEX fb_submission_search',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0010_form_creator_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARDS, 'postgresql': POSTGRESQL_FORWARDS}),
+            run({'sqlite': SQLITE_BACKWARDS, 'postgresql': POSTGRESQL_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 6.0 on 2026-10-18 23:15
+
+import math
+from datetime import date
+
+from django.db import migrations, models
+
+
+TYPED_COLUMNS = {'number': 'value_number', 'date': 'value_date', 'yes_no': 'value_bool'}
+
+
+def parse(input_type, value):
+    try:
+        if input_type == 'number':
+            number = float(value)
+            return number if math.isfinite(number) else None
+        if input_type == 'date':
+            return date.fromisoformat(value)
+    except ValueError:
+        return None
+    return {'Yes': True, 'No': False}.get(value)
+
+
+def backfill_typed_values(apps, schema_editor):
+    FormFieldValue = apps.get_model('formbuilder', 'FormFieldValue')
+    for input_type, column in TYPED_COLUMNS.items():
+        values = FormFieldValue.objects.filter(field__field_type__input_type=input_type).order_by('id')
+        last_id = 0
+        while True:
+            batch = list(values.filter(id__gt=last_id).only('id', 'value')[:1000])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for row in batch:
+                setattr(row, column, parse(input_type, row.value))
+            FormFieldValue.objects.bulk_update(batch, [column])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0011_submission_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formfieldvalue',
+            name='value_bool',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='formfieldvalue',
+            name='value_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='formfieldvalue',
+            name='value_number',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_typed_values, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='formfieldvalue',
+            index=models.Index(condition=models.Q(('value_number__isnull', False)), fields=['field', 'value_number'], name='fb_value_field_number'),
+        ),
+        migrations.AddIndex(
+            model_name='formfieldvalue',
+            index=models.Index(condition=models.Q(('value_date__isnull', False)), fields=['field', 'value_date'], name='fb_value_field_date'),
+        ),
+        migrations.AddIndex(
+            model_name='formfieldvalue',
+            index=models.Index(condition=models.Q(('value_bool__isnull', False)), fields=['field', 'value_bool'], name='fb_value_field_bool'),
+        ),
+    ]
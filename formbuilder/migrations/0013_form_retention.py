@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0012_typed_field_values'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='archive_pruned',
+            field=models.BooleanField(default=True, help_text='Write pruned submissions to a compressed archive before deleting them'),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='deletion_requested_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the form is queued for chunked deletion by prune_submissions', null=True),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Prune submissions older than this many days; empty keeps them forever', null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 00:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formbuilder', '0013_form_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot', models.JSONField(help_text='The published FormSchema, see schema.snapshot_schema')),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='formbuilder.form')),
+                ('published_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='published_version',
+            field=models.ForeignKey(blank=True, editable=False, help_text='The snapshot served to the public', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='formbuilder.formversion'),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='form_version',
+            field=models.ForeignKey(blank=True, help_text='The published version that was filled in', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='formbuilder.formversion'),
+        ),
+        migrations.AddField(
+            model_name='queuedsubmission',
+            name='form_version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='formbuilder.formversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='formversion',
+            constraint=models.UniqueConstraint(fields=('form', 'number'), name='fb_version_form_number'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils.text import slugify
+from django.utils import timezone
+
+from .uploads import upload_storage
+from .validation import check_validations
 
 class FieldType(models.Model):
     INPUT_TYPE_CHOICES = [
@@ -46,12 +51,22 @@ class Form(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')  # ◄── This line
     is_multi_section = models.BooleanField(default=False)
     success_message = models.TextField(default="Thank you for your submission!", blank=True)
+    schema_version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever sections or fields change")
+    retention_days = models.PositiveIntegerField(null=True, blank=True, help_text="Prune submissions older than this many days; empty keeps them forever")
+    archive_pruned = models.BooleanField(default=True, help_text="Write pruned submissions to a compressed archive before deleting them")
+    deletion_requested_at = models.DateTimeField(null=True, blank=True, editable=False, help_text="Set when the form is queued for chunked deletion by prune_submissions")
+    published_version = models.ForeignKey('FormVersion', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+', help_text="The snapshot served to the public")
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_forms')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='fb_form_created'),
+            models.Index(fields=['status', '-created_at'], name='fb_form_status_created'),
+            models.Index(fields=['created_by', '-created_at'], name='fb_form_creator_created'),
+        ]
 
     def __str__(self):
         return self.name
@@ -59,9 +74,35 @@ class Form(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        # schema_version is only changed through F() updates (see signals.py),
+        # so a stale instance must never write it back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'schema_version'
+            ]
         super().save(*args, **kwargs)
 
 
+class FormVersion(models.Model):
+    """A frozen snapshot of a form's structure, taken each time it is published"""
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    snapshot = models.JSONField(help_text="The published FormSchema, see schema.snapshot_schema")
+    published_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    published_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'number'], name='fb_version_form_number'),
+        ]
+    
+    def __str__(self):
+        return f"{self.form.name} v{self.number}"
+
+
 class FormSection(models.Model):
     """Optional sections for organizing form fields"""
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='sections')
@@ -72,6 +113,9 @@ class FormSection(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['form', 'order'], name='fb_section_form_order'),
+        ]
 
     def __str__(self):
         return f"{self.form_name} - {self.title}"
@@ -97,20 +141,35 @@ class FormField(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['form', 'order'], name='fb_field_form_order'),
+            models.Index(fields=['section', 'order'], name='fb_field_section_order'),
+        ]
     
     def __str__(self):
         return f"{self.form.name} - {self.label}"
 
+    def clean(self):
+        try:
+            check_validations(self.validations)
+        except ValueError as e:
+            raise ValidationError({'validations': str(e)})
+
 class FormSubmission(models.Model):
     """A completed form submission"""
     
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='submissions')
+    form_version = models.ForeignKey(FormVersion, on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions', help_text="The published version that was filled in")
     submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='form_submissions')
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    data = models.JSONField(null=True, blank=True, help_text="All answers as {field_id: value}")
     
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['form', '-submitted_at', '-id'], name='fb_submission_form_recent'),
+        ]
     
     def __str__(self):
         return f"{self.form.name} - {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
@@ -122,9 +181,88 @@ class FormFieldValue(models.Model):
     submission = models.ForeignKey(FormSubmission, on_delete=models.CASCADE, related_name='values')
     field = models.ForeignKey(FormField, on_delete=models.CASCADE, related_name='values')
     value = models.TextField(blank=True)
+    # Typed copies of the answer for number, date and yes/no fields
+    value_number = models.FloatField(null=True, blank=True)
+    value_date = models.DateField(null=True, blank=True)
+    value_bool = models.BooleanField(null=True, blank=True)
     
     class Meta:
         ordering = ['field__order']
+        indexes = [
+            models.Index(fields=['submission', 'field'], name='fb_value_submission_field'),
+            models.Index(fields=['field', 'value_number'], name='fb_value_field_number',
+                         condition=models.Q(value_number__isnull=False)),
+            models.Index(fields=['field', 'value_date'], name='fb_value_field_date',
+                         condition=models.Q(value_date__isnull=False)),
+            models.Index(fields=['field', 'value_bool'], name='fb_value_field_bool',
+                         condition=models.Q(value_bool__isnull=False)),
+        ]
+    
+    def __str__(self):
+        return f"{self.field.label}: {self.value[:50]}"
+
+
+class FormFieldFile(models.Model):
+    """A file uploaded to a file field; identical files share one stored copy"""
+    
+    submission = models.ForeignKey(FormSubmission, on_delete=models.CASCADE, related_name='files')
+    field = models.ForeignKey(FormField, on_delete=models.CASCADE, related_name='files')
+    file = models.FileField(max_length=255, storage=upload_storage)
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    
+    def __str__(self):
+        return f"{self.field.label}: {self.original_name}"
+
+
+class DailySubmissionCount(models.Model):
+    """Number of submissions a form received on one day, kept up to date by analytics.py"""
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='daily_counts')
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'date'], name='fb_daily_count_form_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.form.name} - {self.date}: {self.count}"
+
+
+class OptionCount(models.Model):
+    """How often an option of a choice field was picked, kept up to date by analytics.py"""
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='option_counts')
+    field = models.ForeignKey(FormField, on_delete=models.CASCADE, related_name='option_counts')
+    value = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'value'], name='fb_option_count_field_value'),
+        ]
+    
+    def __str__(self):
+        return f"{self.field.label} = {self.value}: {self.count}"
+
+
+class QueuedSubmission(models.Model):
+    """A validated submission waiting for drain_submissions to store it"""
+    
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='queued_submissions')
+    form_version = models.ForeignKey(FormVersion, on_delete=models.SET_NULL, null=True, related_name='+')
+    submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    submitted_at = models.DateTimeField(default=timezone.now)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    answers = models.JSONField(help_text="Validated answers as {field_id: value}")
+    
+    class Meta:
+        ordering = ['id']
     
     def __str__(self):
-        return f"{self.field.label}: {self.value[:50]}"
\ No newline at end of file
+        return f"{self.form.name} - queued {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,120 @@
+"""
+Reordering of fields and sections.
+
+A full reorder is applied with one bulk UPDATE inside a transaction, after
+checking that every id belongs to the form. Orders are spaced ORDER_GAP
+apart so that moving a single item usually rewrites just that row.
+"""
+from django.db import transaction
+
+
+ORDER_GAP = 1024
+
+
+class OrderingError(ValueError):
+    """Raised when a reorder payload does not match the form's rows"""
+
+
+def parse_ids(items):
+    try:
+        return [int(item['id']) for item in items]
+    except (KeyError, TypeError, ValueError):
+        raise OrderingError('Every item needs an integer id')
+
+
+def reorder(queryset, items, section_ids=None):
+    """
+    Apply [{'id': ..., 'order': ...}] to the rows of a queryset in one UPDATE.
+
+    Items may carry a 'section_id' when ``section_ids`` (the ids of sections
+    that may be assigned) is given. bulk_update does not send signals, so
+    callers bump the form's schema version. Returns the number of rows changed.
+    """
+    ids = parse_ids(items)
+    if len(set(ids)) != len(ids):
+        raise OrderingError('Duplicate ids in payload')
+
+    with transaction.atomic():
+        rows = {obj.id: obj for obj in queryset.select_for_update().filter(id__in=ids)}
+        unknown = sorted(set(ids) - set(rows))
+        if unknown:
+            raise OrderingError(f'Ids do not belong to this form: {unknown}')
+
+        changed = []
+        update_fields = {'order'}
+        for item in items:
+            obj = rows[int(item['id'])]
+            try:
+                obj.order = int(item['order'])
+            except (KeyError, TypeError, ValueError):
+                raise OrderingError('Every item needs an integer order')
+            if obj.order < 0:
+                raise OrderingError('Orders cannot be negative')
+
+            if section_ids is not None and 'section_id' in item:
+                section_id = int(item['section_id']) if item['section_id'] else None
+                if section_id is not None and section_id not in section_ids:
+                    raise OrderingError(f'Section {section_id} does not belong to this form')
+                obj.section_id = section_id
+                update_fields.add('section')
+            changed.append(obj)
+
+        queryset.model.objects.bulk_update(changed, sorted(update_fields), batch_size=500)
+    return len(changed)
+
+
+def place(rows, obj, before=None, after=None):
+    """
+    Position ``obj`` directly before or after another row, in memory.
+
+    ``rows`` are the siblings sorted by order. The moved row takes the
+    midpoint between its new neighbours; only when there is no gap left is
+    the whole list renumbered ORDER_GAP apart. Returns the rows whose order
+    changed.
+    """
+    target = before if before is not None else after
+    if target is None:
+        raise OrderingError("A move needs 'before' or 'after'")
+
+    rows = [row for row in rows if row is not obj]
+    if target is obj or not any(row is target for row in rows):
+        raise OrderingError('Ids do not belong to this form')
+    index = next(i for i, row in enumerate(rows) if row is target) + (0 if before is not None else 1)
+
+    # -1 so a row can still be placed at order 0 at the very top
+    low = rows[index - 1].order if index > 0 else -1
+    high = rows[index].order if index < len(rows) else low + 2 * ORDER_GAP
+    if high - low > 1:
+        obj.order = (low + high) // 2
+        return [obj]
+
+    rows.insert(index, obj)
+    for position, row in enumerate(rows, start=1):
+        row.order = position * ORDER_GAP
+    return rows
+
+
+def move(queryset, obj_id, before=None, after=None):
+    """
+    Move one row directly before or after another, rewriting as few rows as possible.
+
+    Like reorder(), this bypasses model signals. Returns the number of rows
+    changed.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by('order', 'id').only('id', 'order'))
+        by_id = {obj.id: obj for obj in rows}
+        if not {obj_id, before, after} - {None} <= by_id.keys():
+            raise OrderingError('Ids do not belong to this form')
+
+        changed = place(
+            rows,
+            by_id[obj_id],
+            before=by_id[before] if before is not None else None,
+            after=by_id[after] if after is not None else None,
+        )
+        if len(changed) == 1:
+            queryset.filter(pk=obj_id).update(order=changed[0].order)
+        else:
+            queryset.model.objects.bulk_update(changed, ['order'], batch_size=500)
+        return len(changed)
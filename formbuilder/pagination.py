@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination over (timestamp, id), e.g. (submitted_at, id).
+
+Unlike OFFSET pagination, every page is a range scan starting at the
+cursor, so page 1,000 costs the same as page 1.
+"""
+from datetime import datetime, timezone
+
+from django.db.models import Q
+
+
+def encode_cursor(obj, order_field='submitted_at'):
+    micros = int(getattr(obj, order_field).timestamp() * 1_000_000)
+    return f'{micros}-{obj.pk}'
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, id) for a cursor, or None if it is malformed"""
+    try:
+        micros, pk = cursor.split('-')
+        timestamp = datetime.fromtimestamp(int(micros) / 1_000_000, tz=timezone.utc)
+        return timestamp, int(pk)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def keyset_page(queryset, before=None, after=None, page_size=50, order_field='submitted_at'):
+    """
+    Return one page of a queryset ordered newest first by ``order_field``.
+
+    ``before`` pages towards older rows and ``after`` towards newer ones.
+    Returns (items, older_cursor, newer_cursor); a cursor is None when there
+    is nothing further in that direction.
+    """
+    position = decode_cursor(after) if after else decode_cursor(before) if before else None
+
+    if after and position:
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__gt': timestamp}) | Q(**{order_field: timestamp, 'pk__gt': pk})
+        ).order_by(order_field, 'pk')
+    else:
+        if position:
+            timestamp, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{order_field}__lt': timestamp}) | Q(**{order_field: timestamp, 'pk__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{order_field}', '-pk')
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    if after and position:
+        items.reverse()
+        has_older, has_newer = True, has_more
+    else:
+        has_older, has_newer = has_more, position is not None
+
+    older = encode_cursor(items[-1], order_field) if items and has_older else None
+    newer = encode_cursor(items[0], order_field) if items and has_newer else None
+    return items, older, newer
@@ -0,0 +1,247 @@
+"""
+Retention of submissions.
+
+Forms with ``retention_days`` set have older submissions pruned by the
+prune_submissions command in bounded batches, one short transaction each,
+oldest first. Unless ``archive_pruned`` is turned off, every batch is first
+appended to a gzipped JSON Lines archive under FORMBUILDER_ARCHIVE_DIR,
+which rehydrate_submissions can load back.
+
+Deleting a form with many submissions works the same way: the form is
+hidden and flagged, and prune_submissions deletes its submissions batch by
+batch before removing the form itself, instead of one cascade that holds
+a write lock for the whole delete.
+"""
+import gzip
+import json
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .analytics import forget_submissions, record_submissions
+from .models import Form, FormFieldFile, FormFieldValue, FormSubmission, FormVersion
+from .schema import get_form_schema, invalidate_form_schema
+from .submissions import stores_field_values, value_rows
+
+
+ARCHIVE_DIR = Path(getattr(settings, 'FORMBUILDER_ARCHIVE_DIR', 'formbuilder-archives'))
+PRUNE_BATCH_SIZE = getattr(settings, 'FORMBUILDER_PRUNE_BATCH_SIZE', 1000)
+
+FILE_COLUMNS = ('field_id', 'file', 'original_name', 'content_type', 'size', 'sha256')
+
+
+class Archive:
+    """A gzipped JSON Lines file of pruned submissions, created on the first write"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = None
+
+    def write(self, records):
+        if self.file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = gzip.open(self.path, 'at', encoding='utf-8')
+        for record in records:
+            # isoformat() keeps the microseconds DjangoJSONEncoder would drop
+            record = {**record, 'submitted_at': record['submitted_at'].isoformat()}
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def archive_path(form, now=None):
+    return ARCHIVE_DIR / f'form-{form.id}-{(now or timezone.now()):%Y%m%d%H%M%S}.jsonl.gz'
+
+
+def archive_records(form_id, ids):
+    """Everything needed to restore the given submissions, one dict each"""
+    rows = list(FormSubmission.objects.filter(id__in=ids).order_by('id').values_list(
+        'id', 'form_version_id', 'submitted_at', 'submitted_by_id', 'ip_address', 'data'
+    ))
+
+    # Submissions stored before the JSON payload existed
+    fallback = {}
+    legacy = [row[0] for row in rows if row[5] is None]
+    if legacy:
+        values = FormFieldValue.objects.filter(submission_id__in=legacy).order_by()
+        for submission_id, field_id, value in values.values_list('submission_id', 'field_id', 'value'):
+            fallback.setdefault(submission_id, {})[str(field_id)] = value
+
+    files = {}
+    for file in FormFieldFile.objects.filter(submission_id__in=ids).values('submission_id', *FILE_COLUMNS):
+        files.setdefault(file.pop('submission_id'), []).append(file)
+
+    return [
+        {
+            'id': submission_id,
+            'form_id': form_id,
+            'form_version_id': form_version_id,
+            'submitted_at': submitted_at,
+            'submitted_by_id': submitted_by_id,
+            'ip_address': ip_address,
+            'data': data if data is not None else fallback.get(submission_id, {}),
+            'files': files.get(submission_id, []),
+        }
+        for submission_id, form_version_id, submitted_at, submitted_by_id, ip_address, data in rows
+    ]
+
+
+def answers(data):
+    """A JSON payload keyed by int field id, as analytics and value_rows take it"""
+    return {int(field_id): value for field_id, value in data.items()}
+
+
+def prune_batch(schema, expired, batch_size=PRUNE_BATCH_SIZE, archive=None):
+    """
+    Delete the oldest ``batch_size`` submissions of the ``expired`` queryset.
+
+    The batch is archived first when ``archive`` is given, and taken out of
+    the analytics counters in the same transaction as the delete (uploaded
+    files stay in storage, where other submissions may share them). Returns
+    the number deleted.
+    """
+    with transaction.atomic():
+        ids = list(expired.order_by('submitted_at', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        records = archive_records(schema.id, ids)
+        if archive is not None:
+            archive.write(records)
+        forget_submissions(schema, [(record['submitted_at'], answers(record['data'])) for record in records])
+        FormSubmission.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def prune_form(form, batch_size=PRUNE_BATCH_SIZE, now=None):
+    """
+    Prune a form's submissions older than its retention_days.
+
+    Returns (number pruned, archive path or None).
+    """
+    now = now or timezone.now()
+    expired = form.submissions.filter(submitted_at__lt=now - timedelta(days=form.retention_days))
+    schema = get_form_schema(form.slug)
+
+    archive = Archive(archive_path(form, now)) if form.archive_pruned else None
+    pruned = 0
+    try:
+        while deleted := prune_batch(schema, expired, batch_size, archive):
+            pruned += deleted
+    finally:
+        if archive is not None:
+            archive.close()
+
+    return pruned, archive.path if archive and archive.file else None
+
+
+def request_form_deletion(form, batch_size=None):
+    """
+    Delete a form, deferring to prune_submissions when it has many submissions.
+
+    Forms with at most ``batch_size`` (default FORMBUILDER_PRUNE_BATCH_SIZE)
+    submissions are deleted right away and True is returned. Larger ones are
+    archived (so they stop accepting submissions), flagged with
+    deletion_requested_at and False is returned.
+    """
+    batch_size = batch_size or PRUNE_BATCH_SIZE
+    if form.submissions.all()[:batch_size + 1].count() <= batch_size:
+        form.delete()
+        return True
+
+    # update() skips the post_save signal, so drop the cached schema here
+    Form.objects.filter(pk=form.pk).update(deletion_requested_at=timezone.now(), status='archived')
+    invalidate_form_schema(form.slug)
+    return False
+
+
+def purge_form(form, batch_size=PRUNE_BATCH_SIZE):
+    """Delete a form flagged for deletion, its submissions first in batches. Returns the submissions deleted."""
+    deleted = 0
+    while ids := list(form.submissions.order_by().values_list('id', flat=True)[:batch_size]):
+        with transaction.atomic():
+            FormSubmission.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    form.delete()
+    return deleted
+
+
+def restore_batch(records):
+    """Recreate archived submissions that no longer exist. Returns the number restored."""
+    with transaction.atomic():
+        existing = set(FormSubmission.objects.filter(id__in=[r['id'] for r in records]).values_list('id', flat=True))
+        records = [record for record in records if record['id'] not in existing]
+        slugs = dict(Form.objects.filter(pk__in={r['form_id'] for r in records}).values_list('id', 'slug'))
+        users = set(User.objects.filter(pk__in={r['submitted_by_id'] for r in records} - {None}).values_list('id', flat=True))
+        # Archives written before versions existed have no form_version_id
+        versions = set(FormVersion.objects.filter(
+            pk__in={r.get('form_version_id') for r in records} - {None}
+        ).values_list('id', flat=True))
+
+        restored = 0
+        by_form = {}
+        for record in records:
+            # Submissions of forms deleted since they were archived are skipped
+            if record['form_id'] in slugs:
+                by_form.setdefault(record['form_id'], []).append(record)
+
+        for form_id, items in by_form.items():
+            schema = get_form_schema(slugs[form_id])
+            live_ids = {str(field.id) for field in schema.fields}
+            submissions = [
+                FormSubmission(
+                    id=record['id'],
+                    form_id=form_id,
+                    form_version_id=record.get('form_version_id') if record.get('form_version_id') in versions else None,
+                    submitted_by_id=record['submitted_by_id'] if record['submitted_by_id'] in users else None,
+                    ip_address=record['ip_address'],
+                    submitted_at=parse_datetime(record['submitted_at']),
+                    data=record['data'],
+                )
+                for record in items
+            ]
+            FormSubmission.objects.bulk_create(submissions)
+
+            # Like save_submission, answers to fields deleted since stay in the
+            # payload but get no value, file or counter rows
+            stored = [
+                answers({field_id: value for field_id, value in submission.data.items() if field_id in live_ids})
+                for submission in submissions
+            ]
+            if stores_field_values(schema):
+                FormFieldValue.objects.bulk_create([
+                    row
+                    for submission, values in zip(submissions, stored)
+                    for row in value_rows(schema, submission, values)
+                ], batch_size=1000)
+            FormFieldFile.objects.bulk_create([
+                FormFieldFile(submission_id=record['id'], **file)
+                for record in items
+                for file in record['files']
+                if str(file['field_id']) in live_ids
+            ])
+            record_submissions(schema, [
+                (submission.submitted_at, values) for submission, values in zip(submissions, stored)
+            ])
+            restored += len(submissions)
+
+    return restored
+
+
+def rehydrate_archive(path, batch_size=PRUNE_BATCH_SIZE):
+    """Restore the submissions in an archive written by prune_submissions. Returns the number restored."""
+    restored = 0
+    with gzip.open(path, 'rt', encoding='utf-8') as lines:
+        while batch := [json.loads(line) for line in islice(lines, batch_size)]:
+            restored += restore_batch(batch)
+    return restored
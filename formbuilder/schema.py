@@ -0,0 +1,301 @@
+"""
+Compiled, cacheable snapshots of a form's structure.
+
+Public views render and validate against a FormSchema instead of walking
+Form -> FormSection -> FormField -> FieldType on every request. Schemas are
+built once and kept in Django's cache until a signal invalidates them (see
+signals.py).
+
+Publishing a form freezes its schema into a FormVersion row (see
+versions.py). The public views serve that snapshot, read with the form in
+one query, so edits to the live fields only reach visitors when the form
+is published again.
+"""
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .conditions import ConditionCycleError, ConditionGraph, compile_conditions
+from .models import Form, FormField
+
+
+SCHEMA_CACHE_TIMEOUT = getattr(settings, 'FORMBUILDER_SCHEMA_CACHE_TIMEOUT', 60 * 60)
+
+
+@dataclass(frozen=True)
+class FieldSchema:
+    id: int
+    label: str
+    help_text: str
+    placeholder: str
+    is_required: bool
+    input_type: str
+    has_options: bool
+    choices: tuple
+    validations: dict
+    conditional_logic: dict
+    section_id: Optional[int]
+    order: int
+
+
+@dataclass(frozen=True)
+class SectionSchema:
+    id: int
+    title: str
+    description: str
+    order: int
+    fields: tuple
+
+
+@dataclass(frozen=True)
+class FormSchema:
+    id: int
+    name: str
+    slug: str
+    description: str
+    status: str
+    success_message: str
+    version: int
+    updated_at: datetime
+    sections: tuple
+    fields_without_section: tuple
+    conditions: ConditionGraph
+    # Set when the schema is a published FormVersion snapshot, along with
+    # the ids of its fields that have since been deleted from the form
+    form_version_id: Optional[int] = None
+    deleted_field_ids: frozenset = frozenset()
+
+    @property
+    def is_published(self):
+        return self.status == 'published'
+
+    @property
+    def fields(self):
+        """All fields in display order"""
+        fields = list(self.fields_without_section)
+        for section in self.sections:
+            fields.extend(section.fields)
+        return fields
+
+
+def schema_cache_key(slug):
+    return f'formbuilder:schema:{slug}'
+
+
+def published_schema_cache_key(slug):
+    return f'formbuilder:published:{slug}'
+
+
+def compile_field(field):
+    """Flatten a FormField (with its FieldType loaded) into a FieldSchema"""
+    field_type = field.field_type
+    options = field.options or {}
+    return FieldSchema(
+        id=field.id,
+        label=field.label,
+        help_text=field.help_text,
+        placeholder=field.placeholder,
+        is_required=field.is_required,
+        input_type=field_type.input_type,
+        has_options=field_type.has_options,
+        choices=tuple(options.get('choices', [])),
+        validations={**(field_type.default_validations or {}), **(field.validations or {})},
+        conditional_logic=field.conditional_logic or {},
+        section_id=field.section_id,
+        order=field.order,
+    )
+
+
+def field_queryset(form):
+    return FormField.objects.filter(form=form).select_related('field_type').order_by('order')
+
+
+def build_form_schema(form):
+    """
+    Build a FormSchema for a form.
+
+    Fields are loaded in a single query with their FieldType joined in and
+    grouped by section in Python, so building costs the same number of
+    queries whatever the size of the form.
+    """
+    return assemble_form_schema(form, field_queryset(form), form.sections.order_by('order'))
+
+
+async def abuild_form_schema(form):
+    """Async build_form_schema, loading rows with async iteration"""
+    fields = [field async for field in field_queryset(form)]
+    sections = [section async for section in form.sections.order_by('order')]
+    return assemble_form_schema(form, fields, sections)
+
+
+def compile_schema_conditions(fields):
+    try:
+        return compile_conditions({field.id: field.conditional_logic for field in fields})
+    except ConditionCycleError:
+        # Cycles are rejected when fields are saved; older data just shows every field
+        return compile_conditions({})
+
+
+def assemble_form_schema(form, fields, sections):
+    fields_by_section = {}
+    for field in fields:
+        fields_by_section.setdefault(field.section_id, []).append(compile_field(field))
+
+    sections = tuple(
+        SectionSchema(
+            id=section.id,
+            title=section.title,
+            description=section.description,
+            order=section.order,
+            fields=tuple(fields_by_section.get(section.id, [])),
+        )
+        for section in sections
+    )
+
+    all_fields = [field for fields in fields_by_section.values() for field in fields]
+    conditions = compile_schema_conditions(all_fields)
+
+    return FormSchema(
+        id=form.id,
+        name=form.name,
+        slug=form.slug,
+        description=form.description,
+        status=form.status,
+        success_message=form.success_message,
+        version=form.schema_version,
+        updated_at=form.updated_at,
+        sections=sections,
+        fields_without_section=tuple(fields_by_section.get(None, [])),
+        conditions=conditions,
+    )
+
+
+def get_form_schema(slug):
+    """Return the cached FormSchema for a slug, building it on a miss"""
+    key = schema_cache_key(slug)
+    schema = cache.get(key)
+    if schema is None:
+        form = Form.objects.filter(slug=slug).first()
+        if form is None:
+            return None
+        schema = build_form_schema(form)
+        cache.set(key, schema, SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+async def aget_form_schema(slug):
+    """Async get_form_schema"""
+    key = schema_cache_key(slug)
+    schema = await cache.aget(key)
+    if schema is None:
+        form = await Form.objects.filter(slug=slug).afirst()
+        if form is None:
+            return None
+        schema = await abuild_form_schema(form)
+        await cache.aset(key, schema, SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+def snapshot_schema(schema):
+    """Serialize a FormSchema to the JSON stored in FormVersion.snapshot"""
+    return {
+        'name': schema.name,
+        'description': schema.description,
+        'success_message': schema.success_message,
+        'version': schema.version,
+        'sections': [asdict(section) for section in schema.sections],
+        'fields_without_section': [asdict(field) for field in schema.fields_without_section],
+    }
+
+
+def schema_from_snapshot(form, version):
+    """
+    Rebuild the FormSchema frozen in a FormVersion.
+
+    Identity and status come from the live form, so a renamed slug or an
+    unpublished form still behave as they do for the live schema. If the
+    form's structure changed since, one query finds the snapshot's fields
+    that no longer exist.
+    """
+    snapshot = version.snapshot
+
+    def load_fields(fields):
+        return tuple(FieldSchema(**{**field, 'choices': tuple(field['choices'])}) for field in fields)
+
+    sections = tuple(
+        SectionSchema(**{**section, 'fields': load_fields(section['fields'])})
+        for section in snapshot['sections']
+    )
+    fields_without_section = load_fields(snapshot['fields_without_section'])
+    all_fields = list(fields_without_section) + [field for section in sections for field in section.fields]
+
+    deleted_field_ids = frozenset()
+    if snapshot['version'] != form.schema_version:
+        ids = {field.id for field in all_fields}
+        deleted_field_ids = frozenset(ids - set(FormField.objects.filter(id__in=ids).values_list('id', flat=True)))
+
+    return FormSchema(
+        id=form.id,
+        name=snapshot['name'],
+        slug=form.slug,
+        description=snapshot['description'],
+        status=form.status,
+        success_message=snapshot['success_message'],
+        version=snapshot['version'],
+        updated_at=version.published_at,
+        sections=sections,
+        fields_without_section=fields_without_section,
+        conditions=compile_schema_conditions(all_fields),
+        form_version_id=version.id,
+        deleted_field_ids=deleted_field_ids,
+    )
+
+
+def published_form_queryset(slug):
+    return Form.objects.filter(slug=slug, status='published').select_related('published_version')
+
+
+def get_published_schema(slug):
+    """
+    Return the cached schema the public sees for a published form, or None.
+
+    That is the form's published FormVersion snapshot, loaded together with
+    the form in one query. Forms published before versions existed are
+    served from their live schema.
+    """
+    key = published_schema_cache_key(slug)
+    schema = cache.get(key)
+    if schema is None:
+        form = published_form_queryset(slug).first()
+        if form is None:
+            return None
+        if form.published_version is not None:
+            schema = schema_from_snapshot(form, form.published_version)
+        else:
+            schema = build_form_schema(form)
+        cache.set(key, schema, SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+async def aget_published_schema(slug):
+    """Async get_published_schema"""
+    key = published_schema_cache_key(slug)
+    schema = await cache.aget(key)
+    if schema is None:
+        form = await published_form_queryset(slug).afirst()
+        if form is None:
+            return None
+        if form.published_version is not None:
+            schema = await sync_to_async(schema_from_snapshot)(form, form.published_version)
+        else:
+            schema = await abuild_form_schema(form)
+        await cache.aset(key, schema, SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+def invalidate_form_schema(slug):
+    cache.delete_many([schema_cache_key(slug), published_schema_cache_key(slug)])
@@ -0,0 +1,53 @@
+"""
+Full-text search over submission answers.
+
+On SQLite the answers are indexed in an FTS5 table that triggers keep in
+sync with FormSubmission.data (see migration 0011). On PostgreSQL a GIN
+index over the payload's string values is queried with a tsquery. Other
+databases fall back to a substring match on the payload, which scans the
+form's submissions. Submissions stored without a payload are found once
+backfill_submission_data has filled it in.
+"""
+from django.conf import settings
+from django.db import connection
+
+from .models import FormSubmission
+
+
+SEARCH_LIMIT = getattr(settings, 'FORMBUILDER_SEARCH_LIMIT', 100)
+
+
+def match_expression(form_id, query):
+    """An FTS5 query matching every term of ``query``, the last one as a prefix"""
+    phrases = ['"{}"'.format(term.replace('"', '""')) for term in query.split()]
+    phrases[-1] += '*'
+    return f'form_id:"{form_id}" AND content:({" ".join(phrases)})'
+
+
+def search_submissions(form_id, query, limit=SEARCH_LIMIT):
+    """Return the ids of a form's submissions whose answers match ``query``, newest first"""
+    if not query.split():
+        return []
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            'SELECT rowid FROM formbuilder_submission_search WHERE formbuilder_submission_search MATCH %s '
+            'ORDER BY rowid DESC LIMIT %s'
+        )
+        params = [match_expression(form_id, query), limit]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            'SELECT id FROM formbuilder_formsubmission WHERE form_id = %s '
+            "AND jsonb_to_tsvector('simple', data, '[\"string\"]') @@ plainto_tsquery('simple', %s) "
+            'ORDER BY id DESC LIMIT %s'
+        )
+        params = [form_id, query, limit]
+    else:
+        return list(
+            FormSubmission.objects.filter(form_id=form_id, data__icontains=query)
+            .order_by('-id').values_list('id', flat=True)[:limit]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
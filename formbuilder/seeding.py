@@ -0,0 +1,169 @@
+"""
+Synthetic forms and submissions for load testing and benchmarks.
+
+seed_form builds a published form with a given number of sections, fields,
+options per choice field and conditional rules. seed_submissions fills it
+with answers that pass validation, written in batches with one bulk insert
+per table and one counter update per batch, the way drain_submissions
+stores queued submissions. Used by the seed_formbuilder command and
+benchmarks/suite.py.
+"""
+import random
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .analytics import record_submissions
+from .models import FieldType, Form, FormField, FormFieldValue, FormSection, FormSubmission
+from .schema import get_form_schema, get_published_schema
+from .submissions import stores_field_values, value_rows
+from .versions import publish_form
+
+
+# Seeded answers have no file to point at
+SEED_INPUT_TYPES = ('text', 'textarea', 'email', 'tel', 'number', 'date', 'select', 'radio', 'checkbox', 'yes_no')
+OPTION_INPUT_TYPES = {'select', 'radio', 'checkbox'}
+
+
+def free_names(prefix, count):
+    """
+    ``count`` names "<prefix> N" whose slugs are not taken yet.
+
+    Numbering carries on past the forms of earlier runs, so seeding the same
+    database again adds forms instead of failing on the unique slug.
+    """
+    taken = set(Form.objects.filter(slug__startswith=slugify(prefix)).values_list('slug', flat=True))
+    names = []
+    number = 0
+    while len(names) < count:
+        number += 1
+        name = f'{prefix} {number}'
+        if slugify(name) not in taken:
+            names.append(name)
+    return names
+
+
+def seed_form(name, sections=0, fields=10, options=5, rules=0):
+    """
+    Create and publish a form whose fields cycle through the field types.
+
+    The last ``rules`` fields only show when the first choice field is set
+    to its first option. Raises ValueError if setup_field_types has not
+    been run.
+    """
+    field_types = list(FieldType.objects.filter(is_active=True, input_type__in=SEED_INPUT_TYPES).order_by('id'))
+    if not field_types:
+        raise ValueError('No field types to seed with; run setup_field_types first')
+
+    choices = {'choices': [{'value': f'option-{i}', 'label': f'Option {i}'} for i in range(options)]}
+    with transaction.atomic():
+        form = Form.objects.create(name=name, status='draft', is_multi_section=sections > 1)
+        section_list = FormSection.objects.bulk_create([
+            FormSection(form=form, title=f'Section {i + 1}', order=i) for i in range(sections)
+        ])
+        field_list = FormField.objects.bulk_create([
+            FormField(
+                form=form,
+                section=section_list[i * sections // fields] if sections else None,
+                field_type=field_types[i % len(field_types)],
+                label=f'Question {i + 1}',
+                order=i,
+                options=choices if field_types[i % len(field_types)].input_type in OPTION_INPUT_TYPES else {},
+            )
+            for i in range(fields)
+        ])
+
+        trigger = next((f for f in field_list if f.field_type.input_type in OPTION_INPUT_TYPES), None)
+        if trigger is not None and options and rules:
+            conditional = [field for field in field_list if field.order > trigger.order][-rules:]
+            for field in conditional:
+                field.conditional_logic = {
+                    'logic_type': 'AND',
+                    'rules': [{'field_id': trigger.id, 'operator': 'equals', 'value': 'option-0'}],
+                }
+            FormField.objects.bulk_update(conditional, ['conditional_logic'])
+
+        publish_form(form)
+    return form
+
+
+def fake_answer(field, rng):
+    """A stored answer that passes validation for a FieldSchema"""
+    input_type = field.input_type
+    if input_type in OPTION_INPUT_TYPES:
+        values = [choice['value'] for choice in field.choices]
+        if not values:
+            return ''
+        if input_type == 'checkbox':
+            return ','.join(rng.sample(values, rng.randint(1, len(values))))
+        return rng.choice(values)
+    if input_type == 'yes_no':
+        return rng.choice(('Yes', 'No'))
+    if input_type == 'number':
+        return str(rng.randint(0, 1000))
+    if input_type == 'date':
+        return (date(2020, 1, 1) + timedelta(days=rng.randrange(2000))).isoformat()
+    if input_type == 'email':
+        return f'user{rng.randrange(10 ** 6)}@example.com'
+    if input_type == 'tel':
+        return f'555-{rng.randrange(10 ** 4):04d}'
+    return f'Answer {rng.randrange(10 ** 6)}'
+
+
+def fake_answers(schema, rng):
+    """{field_id: stored answer} for one submission, leaving out fields hidden by conditional logic"""
+    answers = {field.id: fake_answer(field, rng) for field in schema.fields}
+    checkbox_ids = {field.id for field in schema.fields if field.input_type == 'checkbox'}
+    # Conditions see checkbox answers as lists, the way they are submitted
+    submitted = {
+        field_id: value.split(',') if field_id in checkbox_ids else value
+        for field_id, value in answers.items()
+    }
+    hidden = schema.conditions.hidden_fields(submitted)
+    return {field_id: value for field_id, value in answers.items() if field_id not in hidden}
+
+
+def seed_submissions(form, count, batch_size=2000, days=365, seed=0):
+    """
+    Store ``count`` submissions spread over the last ``days`` days.
+
+    Each batch is one transaction. Yields the running total after every
+    batch.
+    """
+    schema = get_published_schema(form.slug) or get_form_schema(form.slug)
+    rng = random.Random(seed)
+    now = timezone.now()
+    seconds = max(days * 24 * 60 * 60, 1)
+    seeded = 0
+
+    while seeded < count:
+        size = min(batch_size, count - seeded)
+        answers = [fake_answers(schema, rng) for _ in range(size)]
+        submissions = [
+            FormSubmission(
+                form_id=schema.id,
+                form_version_id=schema.form_version_id,
+                submitted_at=now - timedelta(seconds=rng.randrange(seconds)),
+                data={str(field_id): value for field_id, value in values.items()},
+            )
+            for values in answers
+        ]
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                FormSubmission.objects.bulk_create(submissions)
+            else:
+                for submission in submissions:
+                    submission.save()
+            if stores_field_values(schema):
+                FormFieldValue.objects.bulk_create([
+                    row
+                    for submission, values in zip(submissions, answers)
+                    for row in value_rows(schema, submission, values)
+                ], batch_size=1000)
+            record_submissions(schema, [
+                (submission.submitted_at, values) for submission, values in zip(submissions, answers)
+            ])
+        seeded += size
+        yield seeded
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Form, FormSection, FormField, FieldType
+from .schema import invalidate_form_schema
+
+
+_bumps_suspended = ContextVar('formbuilder_bumps_suspended', default=False)
+
+
+def bump_schema_version(form_ids):
+    """Mark the structure of the given forms as changed and drop their cached schemas"""
+    forms = Form.objects.filter(pk__in=form_ids)
+    slugs = list(forms.values_list('slug', flat=True))
+    forms.update(schema_version=F('schema_version') + 1, updated_at=timezone.now())
+    drop_cached_schemas(slugs)
+
+
+def drop_cached_schemas(slugs):
+    """
+    Drop the cached schemas of the given forms, and again once the transaction commits.
+
+    Until then other connections still read the old rows, and one of them
+    may put the old schema back in the cache.
+    """
+    def drop():
+        for slug in slugs:
+            invalidate_form_schema(slug)
+
+    drop()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(drop)
+
+
+@contextmanager
+def suspend_version_bumps():
+    """Skip the per-row version bumps below; the caller bumps once when it is done"""
+    token = _bumps_suspended.set(True)
+    try:
+        yield
+    finally:
+        _bumps_suspended.reset(token)
+
+
+@receiver(pre_save, sender=Form)
+def form_slug_changed(sender, instance, raw=False, **kwargs):
+    # A renamed slug would otherwise keep serving the old cached schema
+    if raw or instance.pk is None:
+        return
+    old_slug = Form.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+    if old_slug and old_slug != instance.slug:
+        drop_cached_schemas([old_slug])
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+def form_changed(sender, instance, **kwargs):
+    # publish_form saves inside its transaction
+    drop_cached_schemas([instance.slug])
+
+
+@receiver(post_save, sender=FormSection)
+@receiver(post_save, sender=FormField)
+@receiver(post_delete, sender=FormSection)
+@receiver(post_delete, sender=FormField)
+def form_structure_changed(sender, instance, origin=None, **kwargs):
+    # Deleting a whole form cascades here once per child row; the form's
+    # own post_delete already takes care of the cache.
+    if isinstance(origin, Form) or _bumps_suspended.get():
+        return
+    bump_schema_version([instance.form_id])
+
+
+@receiver(post_save, sender=FieldType)
+def field_type_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    bump_schema_version(
+        FormField.objects.filter(field_type=instance).values('form_id')
+    )
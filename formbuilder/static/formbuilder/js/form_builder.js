@@ -5,6 +5,13 @@ let csrfToken = null;
 let existingFields = [];
 let existingSections = [];
 
+// Edits waiting to be sent to the batch endpoint, in the order they were made
+let pendingOps = [];
+let flushTimer = null;
+let refCounter = 0;
+const FLUSH_DELAY = 1000;
+const ORDER_GAP = 1024;
+
 // Initialize the form builder
 function initFormBuilder(config) {
     formId = config.formId;
@@ -19,6 +26,57 @@ function initFormBuilder(config) {
     setupSettingsButton();
     setupSortable();
     setupSectionHandlers();
+    
+    // Send anything still queued when the page goes away
+    window.addEventListener('pagehide', () => flushOps({ keepalive: true }));
+}
+
+// Queue an edit; it is sent with the next flush
+function queueOp(op) {
+    pendingOps.push(op);
+    clearTimeout(flushTimer);
+    flushTimer = setTimeout(flushOps, FLUSH_DELAY);
+}
+
+// A client-side name for a row that does not have an id yet
+function newRef(prefix) {
+    refCounter += 1;
+    return `${prefix}-${Date.now()}-${refCounter}`;
+}
+
+// Send every queued edit in one request; returns the ids of new rows, or null on error
+async function flushOps(fetchOptions = {}) {
+    clearTimeout(flushTimer);
+    if (pendingOps.length === 0) return {};
+    
+    const operations = pendingOps;
+    pendingOps = [];
+    
+    const response = await fetch(`/forms/api/forms/${formId}/batch/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken
+        },
+        body: JSON.stringify({ operations: operations }),
+        ...fetchOptions
+    });
+    
+    const result = await response.json().catch(() => ({}));
+    if (!response.ok) {
+        alert(result.error || 'Error saving changes');
+        location.reload();
+        return null;
+    }
+    return result.ids;
+}
+
+// Queue an edit that needs the page redrawn, then send everything at once
+async function saveAndReload(op) {
+    pendingOps.push(op);
+    if (await flushOps()) {
+        location.reload();
+    }
 }
 
 // Create condition rule HTML
@@ -201,29 +259,18 @@ function setupAddFieldModal() {
             return;
         }
         
-        const response = await fetch(`/forms/api/forms/${formId}/fields/add/`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
-            },
-            body: JSON.stringify({
-                field_type_id: fieldTypeId,
-                label: label,
-                help_text: helpText,
-                placeholder: placeholder,
-                options: options,
-                is_required: isRequired,
-                section_id: sectionId || null,
-                conditional_logic: conditionalLogic
-            })
+        await saveAndReload({
+            op: 'add_field',
+            ref: newRef('field'),
+            field_type_id: fieldTypeId,
+            label: label,
+            help_text: helpText,
+            placeholder: placeholder,
+            options: options,
+            is_required: isRequired,
+            section_id: sectionId || null,
+            conditional_logic: conditionalLogic
         });
-        
-        if (response.ok) {
-            location.reload();
-        } else {
-            alert('Error adding field');
-        }
     });
 }
 
@@ -326,28 +373,19 @@ function setupEditFieldModal() {
         const sectionId = document.getElementById('edit-field-section').value;
         const conditionalLogic = collectConditionalLogic('edit-');
         
-        const response = await fetch(`/forms/api/fields/${fieldId}/update/`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
-            },
-            body: JSON.stringify({
-                label: label,
-                help_text: helpText,
-                placeholder: placeholder,
-                options: options,
-                is_required: isRequired,
-                section_id: sectionId || null,
-                conditional_logic: conditionalLogic
-            })
-        });
+        const op = {
+            op: 'update_field',
+            id: fieldId,
+            label: label,
+            help_text: helpText,
+            placeholder: placeholder,
+            is_required: isRequired,
+            section_id: sectionId || null,
+            conditional_logic: conditionalLogic
+        };
+        if (options) op.options = options;
         
-        if (response.ok) {
-            location.reload();
-        } else {
-            alert('Error updating field');
-        }
+        await saveAndReload(op);
     });
 }
 
@@ -359,18 +397,10 @@ function setupDeleteButtons() {
             
             const fieldId = this.dataset.fieldId;
             
-            const response = await fetch(`/forms/api/fields/${fieldId}/delete/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': csrfToken
-                }
-            });
-            
-            if (response.ok) {
-                location.reload();
-            } else {
-                alert('Error deleting field');
-            }
+            // Nothing else on the page depends on the field, so drop it right away
+            this.closest('.field-item').remove();
+            existingFields = existingFields.filter(f => f.id != fieldId);
+            queueOp({ op: 'delete_field', id: fieldId });
         });
     });
 }
@@ -380,6 +410,9 @@ function setupSettingsButton() {
     document.getElementById('save-settings').addEventListener('click', async function() {
         const status = document.getElementById('form-status').value;
         
+        // Queued edits go first so the reload below shows them
+        if (await flushOps() === null) return;
+        
         const response = await fetch(`/forms/api/forms/${formId}/update/`, {
             method: 'POST',
             headers: {
@@ -410,9 +443,7 @@ function setupSortable() {
         handle: '.drag-handle',
         ghostClass: 'bg-light',
         draggable: '.field-item',
-        onEnd: async function(evt) {
-            await saveFieldOrder();
-        }
+        onEnd: saveFieldMove
     });
     
     // Sortable for each section
@@ -423,38 +454,49 @@ function setupSortable() {
             ghostClass: 'bg-light',
             group: 'fields',
             draggable: '.field-item',
-            onEnd: async function(evt) {
-                await saveFieldOrder();
-            }
+            onEnd: saveFieldMove
         });
     });
 }
 
-// Save field order
-async function saveFieldOrder() {
-    const fieldItems = document.querySelectorAll('.field-item');
-    const newOrder = [];
+// Queue a drag: a single move within a container, a full reorder across containers
+function saveFieldMove(evt) {
+    if (evt.from !== evt.to) {
+        saveFieldOrder();
+        return;
+    }
+    if (evt.oldIndex === evt.newIndex) return;
     
-    fieldItems.forEach((item, index) => {
-        newOrder.push({
+    // Neighbours come from the container the field was dropped in: the
+    // previous field on the page may belong to another section
+    const siblings = Array.from(evt.to.querySelectorAll(':scope > .field-item'));
+    const index = siblings.indexOf(evt.item);
+    const sectionEl = evt.item.closest('.section-fields');
+    const op = {
+        op: 'move_field',
+        id: evt.item.dataset.fieldId,
+        section_id: sectionEl ? sectionEl.dataset.sectionId : null
+    };
+    if (index > 0) {
+        op.after = siblings[index - 1].dataset.fieldId;
+    } else {
+        op.before = siblings[index + 1].dataset.fieldId;
+    }
+    
+    queueOp(op);
+}
+
+// Queue every field's position and section, in page order
+function saveFieldOrder() {
+    document.querySelectorAll('.field-item').forEach((item, index) => {
+        const sectionEl = item.closest('.section-fields');
+        queueOp({
+            op: 'move_field',
             id: item.dataset.fieldId,
-            order: index + 1
+            order: (index + 1) * ORDER_GAP,
+            section_id: sectionEl ? sectionEl.dataset.sectionId : null
         });
     });
-    
-    const response = await fetch(`/forms/api/forms/${formId}/fields/reorder/`, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': csrfToken
-        },
-        body: JSON.stringify({ fields: newOrder })
-    });
-    
-    if (!response.ok) {
-        alert('Error saving field order');
-        location.reload();
-    }
 }
 
 // Setup section handlers
@@ -476,23 +518,12 @@ function setupSectionHandlers() {
             return;
         }
         
-        const response = await fetch(`/forms/api/forms/${formId}/sections/add/`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
-            },
-            body: JSON.stringify({
-                title: title,
-                description: description
-            })
+        await saveAndReload({
+            op: 'add_section',
+            ref: newRef('section'),
+            title: title,
+            description: description
         });
-        
-        if (response.ok) {
-            location.reload();
-        } else {
-            alert('Error adding section');
-        }
     });
     
     // Edit section buttons
@@ -522,23 +553,12 @@ function setupSectionHandlers() {
             return;
         }
         
-        const response = await fetch(`/forms/api/sections/${sectionId}/update/`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
-            },
-            body: JSON.stringify({
-                title: title,
-                description: description
-            })
+        await saveAndReload({
+            op: 'update_section',
+            id: sectionId,
+            title: title,
+            description: description
         });
-        
-        if (response.ok) {
-            location.reload();
-        } else {
-            alert('Error updating section');
-        }
     });
     
     // Delete section buttons
@@ -548,18 +568,7 @@ function setupSectionHandlers() {
             
             const sectionId = this.dataset.sectionId;
             
-            const response = await fetch(`/forms/api/sections/${sectionId}/delete/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': csrfToken
-                }
-            });
-            
-            if (response.ok) {
-                location.reload();
-            } else {
-                alert('Error deleting section');
-            }
+            await saveAndReload({ op: 'delete_section', id: sectionId });
         });
     });
 }
\ No newline at end of file
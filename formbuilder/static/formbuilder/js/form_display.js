@@ -1,92 +1,119 @@
 // Conditional logic handling
-function evaluateConditions() {
-    document.querySelectorAll('.field-wrapper').forEach(wrapper => {
-        const fieldId = wrapper.dataset.fieldId;
-        const conditional = fieldConditions[fieldId];
-        
-        // If no conditional logic, always show
-        if (!conditional || Object.keys(conditional).length === 0) {
-            wrapper.style.display = 'block';
-            return;
-        }
-        
-        // If no rules, always show
-        if (!conditional.rules || conditional.rules.length === 0) {
-            wrapper.style.display = 'block';
-            return;
-        }
-        
-        // Evaluate each rule
-        const results = [];
-        
-        conditional.rules.forEach(rule => {
-            const targetField = document.querySelector(`[name="field_${rule.field_id}"]`);
-            if (!targetField) {
-                results.push(false);
-                return;
-            }
-            
-            let fieldValue = '';
-            if (targetField.type === 'radio') {
-                const checked = document.querySelector(`[name="field_${rule.field_id}"]:checked`);
-                fieldValue = checked ? checked.value : '';
-            } else {
-                fieldValue = targetField.value;
-            }
-            
-            let result = false;
-            switch (rule.operator) {
-                case 'equals':
-                    result = fieldValue === rule.value;
-                    break;
-                case 'not_equals':
-                    result = fieldValue !== rule.value;
-                    break;
-                case 'contains':
-                    result = fieldValue.includes(rule.value);
-                    break;
-                case 'is_empty':
-                    result = fieldValue === '';
-                    break;
-                case 'is_not_empty':
-                    result = fieldValue !== '';
-                    break;
-            }
-            
-            results.push(result);
-        });
-        
-        // Determine if field should show based on logic type
-        let shouldShow = false;
-        if (conditional.logic_type === 'AND') {
-            shouldShow = results.every(r => r === true);
-        } else {
-            shouldShow = results.some(r => r === true);
-        }
-        
-        // Show or hide the field
-        wrapper.style.display = shouldShow ? 'block' : 'none';
-        
-        // Handle required attribute
-        const inputs = wrapper.querySelectorAll('input, select, textarea');
-        inputs.forEach(input => {
-            if (!shouldShow) {
+//
+// conditionGraph comes from the server (see formbuilder/conditions.py):
+//   rules:    field id -> {all: bool, rules: [{field_id, operator, value}]}
+//   order:    conditional field ids, each after the fields it depends on
+//   affected: field id -> conditional fields to re-check when it changes
+
+const wrappers = {};
+const hiddenFields = new Set();
+
+// Current value of a field, treating hidden fields as empty
+function getFieldValue(fieldId) {
+    if (hiddenFields.has(String(fieldId))) return '';
+
+    const inputs = document.querySelectorAll(`[name="field_${fieldId}"]`);
+    if (inputs.length === 0) return null;
+
+    const first = inputs[0];
+    if (first.type === 'checkbox') {
+        return Array.from(inputs).filter(i => i.checked).map(i => i.value);
+    }
+    if (first.type === 'radio') {
+        const checked = Array.from(inputs).find(i => i.checked);
+        return checked ? checked.value : '';
+    }
+    return first.value;
+}
+
+function evaluateRule(rule) {
+    const fieldValue = getFieldValue(rule.field_id);
+    if (fieldValue === null) return false;
+
+    const isList = Array.isArray(fieldValue);
+    switch (rule.operator) {
+        case 'equals':
+            return isList ? fieldValue.includes(rule.value) : fieldValue === rule.value;
+        case 'not_equals':
+            return isList ? !fieldValue.includes(rule.value) : fieldValue !== rule.value;
+        case 'contains':
+            return isList ? fieldValue.some(v => v.includes(rule.value)) : fieldValue.includes(rule.value);
+        case 'is_empty':
+            return fieldValue.length === 0;
+        case 'is_not_empty':
+            return fieldValue.length > 0;
+    }
+    return false;
+}
+
+// Show or hide a single conditional field
+function evaluateField(fieldId) {
+    const wrapper = wrappers[fieldId];
+    const conditional = conditionGraph.rules[fieldId];
+    if (!wrapper || !conditional) return;
+
+    const results = conditional.rules.map(evaluateRule);
+    const shouldShow = conditional.all ? results.every(r => r) : results.some(r => r);
+
+    if (shouldShow) {
+        hiddenFields.delete(fieldId);
+    } else {
+        hiddenFields.add(fieldId);
+    }
+    wrapper.style.display = shouldShow ? 'block' : 'none';
+
+    // Handle required attribute
+    wrapper.querySelectorAll('input, select, textarea').forEach(input => {
+        if (!shouldShow) {
+            if (input.dataset.wasRequired === undefined) {
                 input.dataset.wasRequired = input.hasAttribute('required');
-                input.removeAttribute('required');
-            } else if (input.dataset.wasRequired === 'true') {
-                input.setAttribute('required', 'required');
             }
-        });
+            input.removeAttribute('required');
+        } else if (input.dataset.wasRequired === 'true') {
+            input.setAttribute('required', 'required');
+        }
     });
 }
 
+// Re-check only the fields downstream of the one that changed
+function onFieldChange(event) {
+    const match = /^field_(\d+)$/.exec(event.target.name || '');
+    if (!match) return;
+
+    (conditionGraph.affected[match[1]] || []).forEach(id => evaluateField(String(id)));
+}
+
+// The page is cached for every visitor without a CSRF token, so fetch one
+// (which also sets the CSRF cookie) and add it to the form. Submitting
+// before it arrives would be refused, so the submit button waits for it.
+function addCsrfToken(form) {
+    const buttons = form.querySelectorAll('[type="submit"]');
+    buttons.forEach(button => button.disabled = true);
+    fetch(form.dataset.csrfUrl, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => {
+            const input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = 'csrfmiddlewaretoken';
+            input.value = data.token;
+            form.appendChild(input);
+        })
+        .finally(() => buttons.forEach(button => button.disabled = false));
+}
+
 // Run on page load
 document.addEventListener('DOMContentLoaded', function() {
-    evaluateConditions();
-    
-    // Add change listeners to all inputs
-    document.querySelectorAll('input, select, textarea').forEach(el => {
-        el.addEventListener('change', evaluateConditions);
-        el.addEventListener('input', evaluateConditions);
+    document.querySelectorAll('.field-wrapper').forEach(wrapper => {
+        wrappers[wrapper.dataset.fieldId] = wrapper;
     });
-});
\ No newline at end of file
+
+    conditionGraph.order.forEach(id => evaluateField(String(id)));
+
+    // One delegated listener instead of one per input
+    const form = document.querySelector('form');
+    if (form) {
+        if (form.dataset.csrfUrl) addCsrfToken(form);
+        form.addEventListener('change', onFieldChange);
+        form.addEventListener('input', onFieldChange);
+    }
+});
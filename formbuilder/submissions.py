@@ -0,0 +1,258 @@
+import math
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from .analytics import record_submissions
+from .models import Form, FormFieldFile, FormSubmission, FormFieldValue, FormVersion, QueuedSubmission
+from .schema import get_form_schema, schema_from_snapshot
+from .uploads import delete_uploads, is_upload, store_upload
+
+
+def stores_field_values(schema):
+    """Whether FormFieldValue rows are written for this form, or only the JSON payload"""
+    return schema.slug not in getattr(settings, 'FORMBUILDER_PAYLOAD_ONLY_FORMS', ())
+
+
+def queues_submissions():
+    """Whether form_submit queues submissions for drain_submissions instead of storing them"""
+    return getattr(settings, 'FORMBUILDER_QUEUE_SUBMISSIONS', False)
+
+
+def field_values(schema, answers):
+    """Return {field_id: stored value} for the schema's fields present in answers"""
+    values = {}
+    for field in schema.fields:
+        if field.id in answers:
+            value = answers[field.id]
+            if isinstance(value, list):
+                value = ','.join(value)
+            elif is_upload(value):
+                value = value.name
+            values[field.id] = value
+    return values
+
+
+def typed_columns(input_type, value):
+    """The typed copies of a stored answer written alongside FormFieldValue.value"""
+    try:
+        if input_type == 'number':
+            number = float(value)
+            return {'value_number': number if math.isfinite(number) else None}
+        if input_type == 'date':
+            return {'value_date': date.fromisoformat(value)}
+    except ValueError:
+        return {}
+    if input_type == 'yes_no':
+        return {'value_bool': {'Yes': True, 'No': False}.get(value)}
+    return {}
+
+
+def value_rows(schema, submission, values):
+    """FormFieldValue rows for a submission's {field_id: stored value}"""
+    input_types = {field.id: field.input_type for field in schema.fields}
+    return [
+        FormFieldValue(
+            submission=submission, field_id=field_id, value=value,
+            **typed_columns(input_types.get(field_id), value),
+        )
+        for field_id, value in values.items()
+    ]
+
+
+def live_fields(schema, values):
+    """
+    Drop answers to fields deleted since the schema's published version was taken.
+
+    Only snapshot schemas can name such fields; their answers stay in the JSON
+    payload but get no FormFieldValue, FormFieldFile or counter rows.
+    """
+    if not schema.deleted_field_ids:
+        return values
+    return {field_id: value for field_id, value in values.items() if field_id not in schema.deleted_field_ids}
+
+
+def answers_payload(schema, answers):
+    """field_values keyed by string id, as stored in the JSON columns"""
+    return {str(field_id): value for field_id, value in field_values(schema, answers).items()}
+
+
+def save_submission(schema, answers, submitted_by=None, ip_address=None):
+    """
+    Store one submission and all of its field values.
+
+    ``answers`` maps field id to the submitted value, as returned by
+    validation.validate_submission; checkbox lists are stored comma-joined
+    and fields missing from it (e.g. hidden by conditional logic) are not
+    stored. Fields come from the compiled FormSchema, so no schema queries
+    are made here. The answers are stored as a JSON payload on the
+    submission and, unless the form is listed in
+    FORMBUILDER_PAYLOAD_ONLY_FORMS, as FormFieldValue rows written with one
+    bulk insert; number, date and yes/no rows also carry typed copies of the
+    answer (see typed_columns). Either way the number of queries does not
+    grow with the number of fields on the form.
+
+    Uploaded files are written to storage inside the transaction (see
+    uploads.store_upload) and recorded as FormFieldFile rows; their answer
+    is the file name. Files written here are deleted again if the
+    transaction fails. The
+    form's analytics counters are updated in the same transaction. When
+    ``schema`` is a published version, the submission records it.
+    """
+    values = field_values(schema, answers)
+    stored = live_fields(schema, values)
+    uploads = {field_id: value for field_id, value in answers.items() if field_id in stored and is_upload(value)}
+    written = []
+
+    try:
+        with transaction.atomic():
+            submission = FormSubmission.objects.create(
+                form_id=schema.id,
+                form_version_id=schema.form_version_id,
+                submitted_by=submitted_by,
+                ip_address=ip_address,
+                data={str(field_id): value for field_id, value in values.items()},
+            )
+            if stores_field_values(schema):
+                FormFieldValue.objects.bulk_create(value_rows(schema, submission, stored))
+            if uploads:
+                files = []
+                for field_id, upload in uploads.items():
+                    name, created = store_upload(upload)
+                    if created:
+                        written.append(name)
+                    files.append(FormFieldFile(
+                        submission=submission,
+                        field_id=field_id,
+                        file=name,
+                        original_name=upload.name,
+                        content_type=upload.content_type or '',
+                        size=upload.size,
+                        sha256=upload.sha256,
+                    ))
+                FormFieldFile.objects.bulk_create(files)
+            record_submissions(schema, [(submission.submitted_at, stored)])
+    except Exception:
+        # Files shared with earlier submissions were not written here and stay
+        delete_uploads(written)
+        raise
+
+    return submission
+
+
+async def asave_submission(schema, answers, submitted_by=None, ip_address=None):
+    """
+    Async save_submission.
+
+    Django's async ORM cannot run a transaction, and every submission also
+    updates the analytics counters, so the whole atomic write runs in one
+    sync_to_async call.
+    """
+    return await sync_to_async(save_submission)(schema, answers, submitted_by, ip_address)
+
+
+def queue_submission(schema, answers, submitted_by=None, ip_address=None):
+    """
+    Append a validated submission to the ingestion queue with a single INSERT.
+
+    Takes the same arguments as save_submission. drain_queued_submissions
+    later stores it with its original submission time.
+    """
+    return QueuedSubmission.objects.create(
+        form_id=schema.id,
+        form_version_id=schema.form_version_id,
+        submitted_by=submitted_by,
+        ip_address=ip_address,
+        answers=answers_payload(schema, answers),
+    )
+
+
+async def aqueue_submission(schema, answers, submitted_by=None, ip_address=None):
+    """Async queue_submission"""
+    return await QueuedSubmission.objects.acreate(
+        form_id=schema.id,
+        form_version_id=schema.form_version_id,
+        submitted_by=submitted_by,
+        ip_address=ip_address,
+        answers=answers_payload(schema, answers),
+    )
+
+
+def store_queued(schema, queued):
+    """Store QueuedSubmission rows of one form with one insert per table, then update its counters"""
+    submissions = [
+        FormSubmission(
+            form_id=schema.id,
+            form_version_id=item.form_version_id,
+            submitted_by_id=item.submitted_by_id,
+            ip_address=item.ip_address,
+            submitted_at=item.submitted_at,
+            data=item.answers,
+        )
+        for item in queued
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        FormSubmission.objects.bulk_create(submissions)
+    else:
+        for submission in submissions:
+            submission.save()
+
+    # Like save_submission, answers to fields deleted since the submission
+    # was queued stay in the payload but get no value or counter rows
+    live_ids = {field.id for field in schema.fields} - schema.deleted_field_ids
+    stored = [
+        {int(field_id): value for field_id, value in submission.data.items() if int(field_id) in live_ids}
+        for submission in submissions
+    ]
+    if stores_field_values(schema):
+        FormFieldValue.objects.bulk_create([
+            row
+            for submission, values in zip(submissions, stored)
+            for row in value_rows(schema, submission, values)
+        ], batch_size=1000)
+
+    record_submissions(schema, [
+        (submission.submitted_at, values) for submission, values in zip(submissions, stored)
+    ])
+
+
+def drain_queued_submissions(batch_size=500):
+    """
+    Move up to batch_size queued submissions into FormSubmission in one transaction.
+
+    Rows are taken oldest first and deleted from the queue in the same
+    transaction, so each one is stored exactly once even with several
+    workers (on databases with SKIP LOCKED). Returns the number stored.
+    """
+    with transaction.atomic():
+        queued = list(QueuedSubmission.objects.select_for_update(skip_locked=True)[:batch_size])
+        if not queued:
+            return 0
+
+        # Each submission is stored against the published version it was
+        # filled in, even if the form has been edited since
+        by_schema = {}
+        for item in queued:
+            by_schema.setdefault((item.form_id, item.form_version_id), []).append(item)
+        forms = Form.objects.in_bulk({form_id for form_id, _ in by_schema})
+        version_ids = {version_id for _, version_id in by_schema} - {None}
+        versions = FormVersion.objects.in_bulk(version_ids) if version_ids else {}
+        for (form_id, version_id), items in by_schema.items():
+            form = forms[form_id]
+            if version_id in versions:
+                schema = schema_from_snapshot(form, versions[version_id])
+            else:
+                schema = get_form_schema(form.slug)
+            store_queued(schema, items)
+
+        QueuedSubmission.objects.filter(pk__in=[item.pk for item in queued]).delete()
+
+    return len(queued)
+
+
+def get_submission_values(submission):
+    """Return {field_id: value} for a submission, preferring the JSON payload"""
+    if submission.data is not None:
+        return {int(field_id): value for field_id, value in submission.data.items()}
+    return dict(submission.values.values_list('field_id', 'value'))
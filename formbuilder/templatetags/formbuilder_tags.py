@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def get_item(mapping, key):
+    """Look up a dict key from a template: {{ errors|get_item:field.id }}"""
+    if not mapping:
+        return None
+    return mapping.get(key)
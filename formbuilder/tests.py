@@ -1,3 +1,1557 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, models
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from .models import (
+    DailySubmissionCount, FieldType, Form, FormField, FormFieldFile, FormSection, FormSubmission, FormFieldValue,
+    OptionCount, QueuedSubmission,
+)
+from . import instrumentation, retention, seeding, urls as formbuilder_urls, validation, views
+from .batch import BatchError, apply_batch
+from .conditions import ConditionCycleError, compile_conditions
+from .exports import iter_submission_rows
+from .filters import filter_by_fields
+from .fragments import form_body_cache_key
+from .ordering import ORDER_GAP
+from .schema import get_form_schema, get_published_schema, published_schema_cache_key, schema_cache_key
+from .search import search_submissions
+from .signals import bump_schema_version
+from .submissions import drain_queued_submissions, get_submission_values, queue_submission, save_submission
+from .validation import validate_submission
+from .versions import publish_form
+
+
+class FormBuilderTestCase(TestCase):
+    """Shared fixtures for building forms in tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.text_type = FieldType.objects.create(name='Short Text', input_type='text')
+        cls.checkbox_type = FieldType.objects.create(
+            name='Checkboxes', input_type='checkbox', has_options=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Compiled validators are keyed by form id and version, which repeat between tests
+        validation._compiled.clear()
+
+    def make_form(self, field_count, **kwargs):
+        kwargs.setdefault('status', 'published')
+        form = Form.objects.create(name=kwargs.pop('name', f'Form {field_count}'), **kwargs)
+        FormField.objects.bulk_create([
+            FormField(form=form, field_type=self.text_type, label=f'Field {i}', order=i)
+            for i in range(field_count)
+        ])
+        return form
+
+
+class SaveSubmissionTests(FormBuilderTestCase):
+
+    def post_data(self, form):
+        data = QueryDict(mutable=True)
+        for field in form.fields.all():
+            data[f'field_{field.id}'] = f'answer {field.id}'
+        return data
+
+    def answers(self, form):
+        return {field.id: f'answer {field.id}' for field in form.fields.all()}
+
+    def test_saves_every_field_value(self):
+        form = self.make_form(3)
+        field = FormField.objects.create(
+            form=form, field_type=self.checkbox_type, label='Pick', order=4
+        )
+        answers = self.answers(form)
+        answers[field.id] = ['a', 'b']
+
+        submission = save_submission(get_form_schema(form.slug), answers)
+
+        values = dict(submission.values.values_list('field_id', 'value'))
+        self.assertEqual(len(values), 4)
+        self.assertEqual(values[field.id], 'a,b')
+
+    def test_query_count_does_not_grow_with_fields(self):
+        for field_count in (5, 60):
+            form = self.make_form(field_count)
+            answers = self.answers(form)
+            schema = get_form_schema(form.slug)
+            # savepoint, submission insert, bulk insert, daily counter, release
+            with self.assertNumQueries(5):
+                save_submission(schema, answers)
+
+    def test_form_submit_view(self):
+        form = self.make_form(2)
+        response = self.client.post(
+            reverse('formbuilder:form_submit', kwargs={'slug': form.slug}),
+            self.post_data(form),
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse('formbuilder:form_success', kwargs={'slug': form.slug})))
+        self.assertEqual(FormSubmission.objects.filter(form=form).count(), 1)
+        self.assertEqual(FormFieldValue.objects.filter(submission__form=form).count(), 2)
+
+
+class FormSchemaCacheTests(FormBuilderTestCase):
+
+    def display_url(self, form):
+        return reverse('formbuilder:form_display', kwargs={'slug': form.slug})
+
+    def test_schema_holds_ordered_sections_and_fields(self):
+        form = self.make_form(2)
+        second = FormSection.objects.create(form=form, title='Second', order=2)
+        first = FormSection.objects.create(form=form, title='First', order=1)
+        FormField.objects.create(
+            form=form, section=first, field_type=self.checkbox_type, label='Pick',
+            options={'choices': [{'value': 'a', 'label': 'A'}]},
+        )
+
+        schema = get_form_schema(form.slug)
+
+        self.assertEqual([s.id for s in schema.sections], [first.id, second.id])
+        self.assertEqual(len(schema.fields_without_section), 2)
+        pick = schema.sections[0].fields[0]
+        self.assertEqual(pick.input_type, 'checkbox')
+        self.assertEqual(pick.choices, ({'value': 'a', 'label': 'A'},))
+
+    def test_cache_hit_serves_form_without_queries(self):
+        form = self.make_form(10)
+        self.client.get(self.display_url(form))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.display_url(form))
+        self.assertContains(response, 'Field 9')
+
+    def test_cache_miss_query_count_is_independent_of_form_size(self):
+        for section_count, field_count in ((1, 5), (10, 100)):
+            form = self.make_form(field_count, name=f'Sized {field_count}')
+            sections = FormSection.objects.bulk_create([
+                FormSection(form=form, title=f'Section {i}', order=i) for i in range(section_count)
+            ])
+            fields = list(form.fields.all())
+            for i, field in enumerate(fields):
+                field.section = sections[i % section_count]
+            FormField.objects.bulk_update(fields, ['section'])
+
+            cache.clear()
+            # form, fields with their field types, sections
+            with self.assertNumQueries(3):
+                response = self.client.get(self.display_url(form))
+            self.assertContains(response, 'class="mb-3 field-wrapper"', count=field_count)
+
+    def test_field_changes_invalidate_schema(self):
+        form = self.make_form(1)
+        version = get_form_schema(form.slug).version
+
+        field = FormField.objects.create(form=form, field_type=self.text_type, label='Added')
+        schema = get_form_schema(form.slug)
+        self.assertGreater(schema.version, version)
+        self.assertIn(field.id, [f.id for f in schema.fields])
+
+        field.delete()
+        self.assertNotIn(field.id, [f.id for f in get_form_schema(form.slug).fields])
+
+    def test_schema_cached_before_the_commit_is_dropped_after_it(self):
+        form = self.make_form(1)
+        stale = get_form_schema(form.slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_schema_version([form.id])
+            # Another connection still reads the old rows and caches them again
+            cache.set(schema_cache_key(form.slug), stale)
+        self.assertGreater(get_form_schema(form.slug).version, stale.version)
+
+    def test_unpublishing_hides_form(self):
+        form = self.make_form(1)
+        self.assertEqual(self.client.get(self.display_url(form)).status_code, 200)
+        form.status = 'draft'
+        form.save()
+        self.assertEqual(self.client.get(self.display_url(form)).status_code, 404)
+
+    def test_saving_stale_form_keeps_schema_version(self):
+        form = self.make_form(1)
+        FormSection.objects.create(form=form, title='New')
+        form.name = 'Renamed'
+        form.save()
+        form.refresh_from_db()
+        self.assertEqual(form.schema_version, 2)
+
+
+class FormBodyFragmentTests(FormBuilderTestCase):
+
+    def test_body_is_rendered_once_per_schema_version(self):
+        form = self.make_form(3)
+        url = reverse('formbuilder:form_display', kwargs={'slug': form.slug})
+        schema = get_form_schema(form.slug)
+        self.client.get(url)
+        self.assertIn('Field 2', cache.get(form_body_cache_key(schema)))
+
+        with mock.patch('formbuilder.fragments.render_form_body') as render_body:
+            response = self.client.get(url)
+        render_body.assert_not_called()
+        self.assertContains(response, reverse('formbuilder:api_csrf_token'))
+
+        FormField.objects.create(form=form, field_type=self.text_type, label='Brand new')
+        self.assertContains(self.client.get(url), 'Brand new')
+
+
+class SubmissionBrowserTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='admin')
+        self.client.force_login(self.user)
+        self.form = self.make_form(3)
+        schema = get_form_schema(self.form.slug)
+        for i in range(7):
+            save_submission(schema, {field.id: f'answer {i}' for field in schema.fields})
+        self.url = reverse('formbuilder:form_submissions', kwargs={'pk': self.form.pk})
+
+    @mock.patch('formbuilder.views.SUBMISSIONS_PAGE_SIZE', 3)
+    def test_pages_through_every_submission_in_order(self):
+        expected = list(
+            self.form.submissions.order_by('-submitted_at', '-id').values_list('id', flat=True)
+        )
+        seen, pages, params = [], [], {}
+        while True:
+            response = self.client.get(self.url, params)
+            pages.append(response.context)
+            seen.extend(s.id for s in response.context['submissions'])
+            if not response.context['older_cursor']:
+                break
+            params = {'before': response.context['older_cursor']}
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(self.url, {'after': pages[-1]['newer_cursor']})
+        self.assertEqual([s.id for s in response.context['submissions']], expected[3:6])
+
+    def test_page_query_count_is_constant(self):
+        # session, user, form, page, count
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_submission_detail_endpoint(self):
+        submission = self.form.submissions.first()
+        with self.assertNumQueries(3):  # session, user, submission with its form
+            response = self.client.get(
+                reverse('formbuilder:api_get_submission', kwargs={'pk': submission.pk})
+            )
+        data = response.json()
+        self.assertEqual(data['id'], submission.id)
+        self.assertEqual([v['label'] for v in data['values']], ['Field 0', 'Field 1', 'Field 2'])
+
+
+class SubmissionExportTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(2)
+        schema = get_form_schema(self.form.slug)
+        self.fields = schema.fields
+        self.submissions = [
+            save_submission(schema, {self.fields[0].id: f'row {i}'})
+            for i in range(3)
+        ]
+
+    def export(self, **params):
+        response = self.client.get(
+            reverse('formbuilder:form_export', kwargs={'pk': self.form.pk}), params
+        )
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_column_per_field(self):
+        lines = self.export(format='csv').splitlines()
+        self.assertEqual(lines[0], 'submission_id,submitted_at,Field 0,Field 1')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith(f'{self.submissions[0].id},'))
+        self.assertTrue(lines[1].endswith(',row 0,'))
+
+    def test_jsonl_since_id(self):
+        lines = self.export(format='jsonl', since_id=self.submissions[0].id).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([r['submission_id'] for r in rows], [s.id for s in self.submissions[1:]])
+        self.assertEqual(rows[0]['values'][str(self.fields[0].id)], 'row 1')
+
+    def test_rejects_bad_filters(self):
+        url = reverse('formbuilder:form_export', kwargs={'pk': self.form.pk})
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('export_submissions', self.form.pk, format='jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+class SubmissionPayloadTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(2)
+        self.schema = get_form_schema(self.form.slug)
+        self.data = {field.id: '' for field in self.schema.fields}
+        self.data[self.schema.fields[0].id] = 'hello'
+
+    def test_payload_written_with_submission(self):
+        submission = save_submission(self.schema, self.data)
+        submission.refresh_from_db()
+        self.assertEqual(submission.data, {str(self.schema.fields[0].id): 'hello', str(self.schema.fields[1].id): ''})
+        self.assertEqual(submission.values.count(), 2)
+
+    def test_payload_only_forms_skip_value_rows(self):
+        with self.settings(FORMBUILDER_PAYLOAD_ONLY_FORMS=[self.form.slug]):
+            with self.assertNumQueries(4):  # savepoint, submission insert, daily counter, release
+                submission = save_submission(self.schema, self.data)
+        self.assertFalse(submission.values.exists())
+        self.assertEqual(get_submission_values(submission)[self.schema.fields[0].id], 'hello')
+
+    def test_backfill_and_export_of_legacy_submissions(self):
+        submission = save_submission(self.schema, self.data)
+        FormSubmission.objects.filter(pk=submission.pk).update(data=None)
+
+        rows = list(iter_submission_rows(self.form))
+        self.assertEqual(rows[0][2][self.schema.fields[0].id], 'hello')
+
+        call_command('backfill_submission_data', stdout=StringIO())
+        submission.refresh_from_db()
+        self.assertEqual(submission.data[str(self.schema.fields[0].id)], 'hello')
+
+
+class ValidationTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = Form.objects.create(name='Validated', status='published')
+        email_type = FieldType.objects.create(
+            name='Email', input_type='email', default_validations={'pattern': 'email'}
+        )
+        number_type = FieldType.objects.create(name='Number', input_type='number')
+        self.email = FormField.objects.create(
+            form=self.form, field_type=email_type, label='Email', is_required=True, order=1
+        )
+        self.age = FormField.objects.create(
+            form=self.form, field_type=number_type, label='Age', order=2,
+            validations={'min': 18},
+        )
+        self.name = FormField.objects.create(
+            form=self.form, field_type=self.text_type, label='Name', order=3,
+            validations={'max_length': 5},
+        )
+        self.pick = FormField.objects.create(
+            form=self.form, field_type=self.checkbox_type, label='Pick', order=4,
+            options={'choices': [{'value': 'a', 'label': 'A'}, {'value': 'b', 'label': 'B'}]},
+        )
+        self.schema = get_form_schema(self.form.slug)
+
+    def test_valid_submission(self):
+        data = QueryDict(f'field_{self.email.id}=a@b.co&field_{self.age.id}=30&field_{self.pick.id}=a&field_{self.pick.id}=b')
+        values, errors = validate_submission(self.schema, data)
+        self.assertEqual(errors, {})
+        self.assertEqual(values[self.pick.id], ['a', 'b'])
+
+    def test_collects_errors_per_field(self):
+        data = QueryDict(f'field_{self.age.id}=12&field_{self.name.id}=toolong&field_{self.pick.id}=z')
+        _, errors = validate_submission(self.schema, data)
+        self.assertEqual(set(errors), {self.email.id, self.age.id, self.name.id, self.pick.id})
+
+        data = QueryDict(f'field_{self.email.id}=not-an-email&field_{self.age.id}=abc')
+        _, errors = validate_submission(self.schema, data)
+        self.assertEqual(errors[self.email.id], ['Enter a valid email address.'])
+        self.assertEqual(errors[self.age.id], ['Enter a number.'])
+
+    def test_invalid_post_is_rejected_and_refilled(self):
+        response = self.client.post(
+            reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug}),
+            {f'field_{self.name.id}': 'Bob', f'field_{self.email.id}': ''},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'This field is required.', status_code=400)
+        self.assertContains(response, 'value="Bob"', status_code=400)
+        self.assertFalse(FormSubmission.objects.filter(form=self.form).exists())
+
+    def test_pattern_must_match_the_whole_value(self):
+        self.name.validations = {'pattern': r'[A-Z]\w*'}
+        self.name.save()
+        schema = get_form_schema(self.form.slug)
+        _, errors = validate_submission(schema, QueryDict(f'field_{self.name.id}=Bob!'))
+        self.assertEqual(errors[self.name.id], ['Enter a valid value.'])
+
+    def test_number_bounds_that_are_not_numbers_are_ignored(self):
+        self.age.validations = {'min': 'eighteen', 'max': '65'}
+        self.age.save()
+        schema = get_form_schema(self.form.slug)
+        _, errors = validate_submission(schema, QueryDict(f'field_{self.age.id}=70'))
+        self.assertEqual(errors[self.age.id], ['Ensure this value is less than or equal to 65.0.'])
+        _, errors = validate_submission(schema, QueryDict(f'field_{self.age.id}=5'))
+        self.assertNotIn(self.age.id, errors)
+
+    def test_invalid_lengths_are_rejected_on_save_and_skipped_if_stored(self):
+        with self.assertRaisesMessage(BatchError, 'max_length must be a whole number'):
+            apply_batch(self.form, [{'op': 'update_field', 'id': self.name.id, 'validations': {'max_length': 'ten'}}])
+
+        self.name.validations = {'max_length': 'ten', 'min_length': 2}
+        self.name.save()
+        schema = get_form_schema(self.form.slug)
+        with self.assertLogs('formbuilder.validation', 'WARNING'):
+            _, errors = validate_submission(schema, QueryDict(f'field_{self.name.id}=B'))
+        self.assertEqual(errors[self.name.id], ['Ensure this value has at least 2 characters.'])
+
+    def test_invalid_pattern_is_rejected_on_save_and_logged_if_stored(self):
+        with self.assertRaisesMessage(BatchError, 'Invalid pattern'):
+            apply_batch(self.form, [{'op': 'update_field', 'id': self.name.id, 'validations': {'pattern': '('}}])
+        self.name.validations = {'pattern': '('}
+        with self.assertRaises(ValidationError):
+            self.name.full_clean()
+
+        # Rows saved before patterns were checked
+        self.name.save()
+        schema = get_form_schema(self.form.slug)
+        with self.assertLogs('formbuilder.validation', 'WARNING'):
+            _, errors = validate_submission(schema, QueryDict(f'field_{self.name.id}=Bob'))
+        self.assertNotIn(self.name.id, errors)
+
+
+class ConditionalLogicTests(FormBuilderTestCase):
+
+    def test_hidden_fields_cascade_in_dependency_order(self):
+        graph = compile_conditions({
+            3: {'logic_type': 'AND', 'rules': [{'field_id': 2, 'operator': 'is_not_empty'}]},
+            2: {'logic_type': 'AND', 'rules': [{'field_id': 1, 'operator': 'equals', 'value': 'Yes'}]},
+            4: {'logic_type': 'OR', 'rules': [
+                {'field_id': 1, 'operator': 'equals', 'value': 'No'},
+                {'field_id': 5, 'operator': 'contains', 'value': 'b'},
+            ]},
+        })
+        self.assertEqual(graph.order, (2, 3, 4))
+        self.assertEqual(graph.affected[1], (2, 3, 4))
+
+        self.assertEqual(graph.hidden_fields({1: 'No', 2: 'x', 3: '', 5: []}), {2, 3})
+        self.assertEqual(graph.hidden_fields({1: 'Yes', 2: 'x', 3: '', 5: ['ab']}), set())
+
+    def test_rules_default_to_or_and_malformed_rules_are_skipped(self):
+        graph = compile_conditions({
+            3: {'rules': [
+                {'field_id': 1, 'operator': 'equals', 'value': 'Yes'},
+                {'field_id': 2, 'operator': 'equals', 'value': 'Yes'},
+                {'field_id': 'not-a-field', 'operator': 'equals', 'value': 'Yes'},
+                {'operator': 'is_empty'},
+            ]},
+        })
+        self.assertEqual(len(graph.rules[3][1]), 2)
+        self.assertEqual(graph.hidden_fields({1: 'Yes', 2: 'No'}), set())
+        self.assertEqual(graph.hidden_fields({1: 'No', 2: 'No'}), {3})
+
+    def test_cycles_are_detected(self):
+        with self.assertRaises(ConditionCycleError):
+            compile_conditions({
+                1: {'rules': [{'field_id': 2, 'operator': 'is_empty'}]},
+                2: {'rules': [{'field_id': 1, 'operator': 'is_empty'}]},
+            })
+
+    def test_update_field_rejects_cycle(self):
+        self.client.force_login(User.objects.create(username='admin'))
+        form = self.make_form(2)
+        first, second = form.fields.all()
+        second.conditional_logic = {'rules': [{'field_id': first.id, 'operator': 'is_empty'}]}
+        second.save()
+
+        response = self.client.post(
+            reverse('formbuilder:api_update_field', kwargs={'pk': first.pk}),
+            {'conditional_logic': {'rules': [{'field_id': second.id, 'operator': 'is_empty'}]}},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        first.refresh_from_db()
+        self.assertEqual(first.conditional_logic, {})
+
+    def test_submit_ignores_hidden_fields(self):
+        form = self.make_form(1)
+        trigger = form.fields.get()
+        hidden = FormField.objects.create(
+            form=form, field_type=self.text_type, label='Only when yes', is_required=True, order=2,
+            conditional_logic={'rules': [{'field_id': trigger.id, 'operator': 'equals', 'value': 'yes'}]},
+        )
+        response = self.client.post(
+            reverse('formbuilder:form_submit', kwargs={'slug': form.slug}),
+            {f'field_{trigger.id}': 'no', f'field_{hidden.id}': 'sneaky'},
+        )
+        self.assertEqual(response.status_code, 302)
+        submission = FormSubmission.objects.get(form=form)
+        self.assertNotIn(str(hidden.id), submission.data)
+        self.assertFalse(submission.values.filter(field=hidden).exists())
+
+
+class ReorderTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(5)
+        self.fields = list(self.form.fields.order_by('order'))
+        self.url = reverse('formbuilder:api_reorder_fields', kwargs={'pk': self.form.pk})
+
+    def post(self, payload, url=None):
+        return self.client.post(url or self.url, payload, content_type='application/json')
+
+    def field_order(self):
+        return list(self.form.fields.order_by('order', 'id').values_list('id', flat=True))
+
+    def test_full_reorder_is_one_update(self):
+        new_order = [field.id for field in reversed(self.fields)]
+        payload = {'fields': [{'id': pk, 'order': i} for i, pk in enumerate(new_order)]}
+        # session, user, form, sections, savepoint, select, update, release, bump (2)
+        with self.assertNumQueries(10):
+            response = self.post(payload)
+        self.assertEqual(response.json(), {'success': True, 'updated': 5})
+        self.assertEqual(self.field_order(), new_order)
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.schema_version, 2)
+
+    def test_rejects_ids_from_another_form(self):
+        other = self.make_form(1, name='Other').fields.get()
+        payload = {'fields': [{'id': self.fields[0].id, 'order': 9}, {'id': other.id, 'order': 0}]}
+        response = self.post(payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(other.id), response.json()['error'])
+        self.assertEqual(self.field_order(), [field.id for field in self.fields])
+
+    def test_moves_field_between_sections(self):
+        section = FormSection.objects.create(form=self.form, title='Contact', order=1)
+        foreign = FormSection.objects.create(form=self.make_form(0, name='Other'), title='X', order=1)
+        field = self.fields[0]
+
+        response = self.post({'fields': [{'id': field.id, 'order': 0, 'section_id': foreign.id}]})
+        self.assertEqual(response.status_code, 400)
+
+        self.post({'fields': [{'id': field.id, 'order': 0, 'section_id': section.id}]})
+        field.refresh_from_db()
+        self.assertEqual(field.section, section)
+
+    def test_single_move_updates_one_row_when_there_is_a_gap(self):
+        FormField.objects.filter(form=self.form).update(order=(models.F('order') + 1) * ORDER_GAP)
+        last, first = self.fields[-1], self.fields[0]
+
+        response = self.post({'move': {'id': last.id, 'before': first.id}})
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(self.field_order()[0], last.id)
+
+    def test_single_move_renumbers_when_there_is_no_gap(self):
+        # make_form uses consecutive orders 0..4, so there is no room anywhere
+        moved, target = self.fields[4], self.fields[1]
+        response = self.post({'move': {'id': moved.id, 'after': target.id}})
+        self.assertEqual(response.json()['updated'], 5)
+
+        expected = [f.id for f in self.fields[:2]] + [moved.id] + [f.id for f in self.fields[2:4]]
+        self.assertEqual(self.field_order(), expected)
+        orders = list(self.form.fields.order_by('order').values_list('order', flat=True))
+        self.assertEqual(orders, [ORDER_GAP * i for i in range(1, 6)])
+
+    def test_reorders_sections(self):
+        first = FormSection.objects.create(form=self.form, title='A', order=1)
+        second = FormSection.objects.create(form=self.form, title='B', order=2)
+        url = reverse('formbuilder:api_reorder_sections', kwargs={'pk': self.form.pk})
+
+        self.post({'sections': [{'id': first.id, 'order': 2}, {'id': second.id, 'order': 1}]}, url)
+        self.assertEqual(
+            list(self.form.sections.order_by('order').values_list('id', flat=True)),
+            [second.id, first.id],
+        )
+
+
+class BatchTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(3)
+        self.fields = list(self.form.fields.order_by('order'))
+        self.url = reverse('formbuilder:api_batch', kwargs={'pk': self.form.pk})
+
+    def post(self, operations):
+        return self.client.post(self.url, {'operations': operations}, content_type='application/json')
+
+    def test_applies_operations_in_order_and_returns_new_ids(self):
+        response = self.post([
+            {'op': 'add_section', 'ref': 's1', 'title': 'Contact'},
+            {'op': 'add_field', 'ref': 'f1', 'field_type_id': self.checkbox_type.id,
+             'label': 'Pick', 'options': 'a\nb', 'section_id': 's1'},
+            {'op': 'add_field', 'ref': 'f2', 'field_type_id': self.text_type.id, 'label': 'Why',
+             'conditional_logic': {'rules': [{'field_id': 'f1', 'operator': 'equals', 'value': 'a'}]}},
+            {'op': 'update_field', 'id': self.fields[0].id, 'label': 'Renamed', 'section_id': 's1'},
+            {'op': 'delete_field', 'id': self.fields[1].id},
+            {'op': 'move_field', 'id': 'f2', 'before': self.fields[0].id},
+        ])
+        ids = response.json()['ids']
+        self.assertEqual(set(ids), {'s1', 'f1', 'f2'})
+
+        section = FormSection.objects.get(pk=ids['s1'])
+        pick = FormField.objects.get(pk=ids['f1'])
+        self.assertEqual(pick.section, section)
+        self.assertEqual(pick.options['choices'][1]['value'], 'b')
+        why = FormField.objects.get(pk=ids['f2'])
+        self.assertEqual(why.conditional_logic['rules'][0]['field_id'], pick.id)
+
+        renamed = FormField.objects.get(pk=self.fields[0].id)
+        self.assertEqual((renamed.label, renamed.section), ('Renamed', section))
+        self.assertFalse(FormField.objects.filter(pk=self.fields[1].id).exists())
+        self.assertEqual(self.form.fields.order_by('order').first(), why)
+
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.schema_version, 2)
+
+    def test_moves_field_to_the_top_of_a_section_with_older_fields(self):
+        section = FormSection.objects.create(form=self.form, title='Contact', order=1)
+        FormField.objects.filter(pk__in=[self.fields[0].id, self.fields[1].id]).update(section=section)
+        moved = self.fields[2]
+
+        def section_order():
+            return list(section.fields.order_by('order', 'id').values_list('id', flat=True))
+
+        # A move next to the first field of the section it was dropped in
+        self.post([{'op': 'move_field', 'id': moved.id, 'section_id': section.id, 'before': self.fields[0].id}])
+        self.assertEqual(section_order(), [moved.id, self.fields[0].id, self.fields[1].id])
+
+        # The full reorder the builder sends after a drag between containers
+        FormField.objects.filter(pk=moved.id).update(section=None, order=2)
+        self.post([
+            {'op': 'move_field', 'id': pk, 'order': (i + 1) * ORDER_GAP, 'section_id': section.id}
+            for i, pk in enumerate([moved.id, self.fields[0].id, self.fields[1].id])
+        ])
+        self.assertEqual(section_order(), [moved.id, self.fields[0].id, self.fields[1].id])
+        self.assertFalse(self.form.fields.filter(section=None).exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def operations(count):
+            return [
+                {'op': 'add_field', 'ref': f'f{i}', 'field_type_id': self.text_type.id, 'label': f'New {i}'}
+                for i in range(count)
+            ] + [{'op': 'update_field', 'id': field.id, 'label': 'x'} for field in self.fields]
+
+        # field types, savepoint, sections, fields, insert, update, bump (2), release
+        with self.assertNumQueries(9) as small:
+            apply_batch(self.form, operations(2))
+        with self.assertNumQueries(len(small.captured_queries)):
+            apply_batch(self.form, operations(50))
+
+    def test_failed_operation_rolls_back_everything(self):
+        other = self.make_form(1, name='Other').fields.get()
+        response = self.post([
+            {'op': 'add_field', 'ref': 'f1', 'field_type_id': self.text_type.id, 'label': 'New'},
+            {'op': 'delete_field', 'id': other.id},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Operation 1', response.json()['error'])
+        self.assertEqual(self.form.fields.count(), 3)
+        self.assertTrue(FormField.objects.filter(pk=other.pk).exists())
+
+    def test_rejects_conditional_logic_cycles(self):
+        first, second = self.fields[:2]
+        response = self.post([
+            {'op': 'update_field', 'id': first.id,
+             'conditional_logic': {'rules': [{'field_id': second.id, 'operator': 'is_empty'}]}},
+            {'op': 'update_field', 'id': second.id,
+             'conditional_logic': {'rules': [{'field_id': first.id, 'operator': 'is_empty'}]}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        first.refresh_from_db()
+        self.assertEqual(first.conditional_logic, {})
+
+    def test_deleting_a_section_keeps_its_fields(self):
+        section = FormSection.objects.create(form=self.form, title='Contact', order=1)
+        self.form.fields.update(section=section)
+        self.post([
+            {'op': 'update_field', 'id': self.fields[0].id, 'label': 'Still here'},
+            {'op': 'delete_section', 'id': section.id},
+        ])
+        self.assertFalse(FormSection.objects.filter(pk=section.pk).exists())
+        self.assertEqual(self.form.fields.filter(section=None).count(), 3)
+
+
+class SubmissionQueueTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(2)
+        self.schema = get_form_schema(self.form.slug)
+        self.fields = self.schema.fields
+
+    def answers(self, i=0):
+        return {field.id: f'answer {i}' for field in self.fields}
+
+    @override_settings(FORMBUILDER_QUEUE_SUBMISSIONS=True)
+    def test_submit_only_queues_in_queued_mode(self):
+        get_published_schema(self.form.slug)
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug}),
+                {f'field_{field.id}': 'hello' for field in self.fields},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(FormSubmission.objects.exists())
+        queued = QueuedSubmission.objects.get()
+        self.assertEqual(queued.answers, {str(field.id): 'hello' for field in self.fields})
+
+    def test_drain_stores_batches_with_original_times(self):
+        for i in range(5):
+            queue_submission(self.schema, self.answers(i), ip_address='10.0.0.1')
+        first_queued = QueuedSubmission.objects.first()
+
+        self.assertEqual(drain_queued_submissions(batch_size=3), 3)
+        self.assertEqual(drain_queued_submissions(batch_size=3), 2)
+        self.assertEqual(drain_queued_submissions(batch_size=3), 0)
+
+        self.assertFalse(QueuedSubmission.objects.exists())
+        first = FormSubmission.objects.order_by('id').first()
+        self.assertEqual(first.submitted_at, first_queued.submitted_at)
+        self.assertEqual(first.ip_address, '10.0.0.1')
+        self.assertEqual(get_submission_values(first), {field.id: 'answer 0' for field in self.fields})
+        self.assertEqual(FormFieldValue.objects.count(), 10)
+
+    def test_drain_query_count_does_not_grow_with_the_batch(self):
+        for i in range(20):
+            queue_submission(self.schema, self.answers(i))
+        # savepoint, queue, forms, submissions, values, daily counter, delete, release
+        with self.assertNumQueries(8):
+            drain_queued_submissions()
+
+    def test_drain_stores_against_the_version_that_was_filled_in(self):
+        version = publish_form(self.form)
+        queue_submission(get_published_schema(self.form.slug), {self.fields[0].id: '12'})
+        # Edited after the submission was queued
+        field = FormField.objects.get(pk=self.fields[0].id)
+        field.field_type = FieldType.objects.create(name='Number', input_type='number')
+        field.save()
+
+        drain_queued_submissions()
+        submission = FormSubmission.objects.get()
+        self.assertEqual(submission.form_version, version)
+        value = submission.values.get()
+        self.assertEqual(value.value, '12')
+        self.assertIsNone(value.value_number)
+
+    def test_drain_keeps_answers_to_fields_deleted_while_queued_in_the_payload(self):
+        queue_submission(self.schema, self.answers())
+        FormField.objects.filter(pk=self.fields[0].id).delete()
+
+        call_command('drain_submissions', stdout=StringIO())
+        submission = FormSubmission.objects.get()
+        self.assertEqual(set(submission.data), {str(field.id) for field in self.fields})
+        self.assertEqual(list(submission.values.values_list('field_id', flat=True)), [self.fields[1].id])
+
+
+ASYNC_PUBLIC_VIEWS = {
+    'form_display': views.aform_display,
+    'form_submit': views.aform_submit,
+    'form_success': views.aform_success,
+}
+
+
+class AsyncViewsURLConf:
+    """The app's URLs with the async public views swapped in"""
+    urlpatterns = [
+        path('admin/', admin.site.urls),
+        path('forms/', include(([
+            path(str(pattern.pattern), ASYNC_PUBLIC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+            for pattern in formbuilder_urls.urlpatterns
+        ], 'formbuilder'))),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncPublicViewTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(2)
+        self.fields = list(self.form.fields.all())
+
+    async def test_display_renders_from_the_cached_schema(self):
+        url = reverse('formbuilder:form_display', kwargs={'slug': self.form.slug})
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Field 1')
+        self.assertEqual(response.context['form'].id, self.form.id)
+
+        draft = await Form.objects.acreate(name='Draft', status='draft')
+        response = await self.async_client.get(
+            reverse('formbuilder:form_display', kwargs={'slug': draft.slug})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_submit_saves_and_redirects(self):
+        url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+        response = await self.async_client.post(url, {f'field_{field.id}': 'hi' for field in self.fields})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse('formbuilder:form_success', kwargs={'slug': self.form.slug})))
+        submission = await FormSubmission.objects.aget(form=self.form)
+        self.assertEqual(submission.data, {str(field.id): 'hi' for field in self.fields})
+        self.assertEqual(await submission.values.acount(), 2)
+
+    @override_settings(FORMBUILDER_PAYLOAD_ONLY_FORMS=['form-2'])
+    def test_payload_only_submit_is_one_transaction(self):
+        url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+        self.client.get(reverse('formbuilder:form_display', kwargs={'slug': self.form.slug}))
+        # Savepoint, submission insert, daily counter upsert, release
+        with self.assertNumQueries(4):
+            self.client.post(url, {f'field_{field.id}': 'hi' for field in self.fields})
+        self.assertFalse(FormFieldValue.objects.exists())
+
+    async def test_submit_shows_errors(self):
+        required = self.fields[0]
+        required.is_required = True
+        await required.asave()
+        url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+        response = await self.async_client.post(url, {})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await FormSubmission.objects.aexists())
+
+    async def test_success_page(self):
+        response = await self.async_client.get(
+            reverse('formbuilder:form_success', kwargs={'slug': self.form.slug})
+        )
+        self.assertContains(response, self.form.success_message)
+
+
+class FileUploadTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        file_type = FieldType.objects.create(
+            name='File Upload', input_type='file', default_validations={'max_size_mb': 10}
+        )
+        self.form = self.make_form(1)
+        self.upload_field = FormField.objects.create(
+            form=self.form, field_type=file_type, label='CV', order=2,
+            validations={'max_size_mb': 0.001},  # about 1 KB
+        )
+        self.text_field = self.form.fields.get(label='Field 0')
+        self.url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+
+    def submit(self, content, name='cv.txt'):
+        return self.client.post(self.url, {
+            f'field_{self.text_field.id}': 'hello',
+            f'field_{self.upload_field.id}': SimpleUploadedFile(name, content, content_type='text/plain'),
+        })
+
+    def test_upload_is_stored_with_its_hash(self):
+        response = self.submit(b'my cv')
+        self.assertEqual(response.status_code, 302)
+
+        stored = FormFieldFile.objects.get()
+        self.assertEqual(stored.original_name, 'cv.txt')
+        self.assertEqual(stored.size, 5)
+        self.assertEqual(stored.sha256, hashlib.sha256(b'my cv').hexdigest())
+        self.assertEqual(stored.file.read(), b'my cv')
+        self.assertEqual(stored.submission.data[str(self.upload_field.id)], 'cv.txt')
+
+    def test_identical_uploads_share_one_stored_file(self):
+        self.submit(b'same bytes', name='a.txt')
+        self.submit(b'same bytes', name='b.txt')
+        first, second = FormFieldFile.objects.order_by('id')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual([first.original_name, second.original_name], ['a.txt', 'b.txt'])
+
+    def test_failed_submission_removes_only_the_files_it_wrote(self):
+        self.submit(b'shared')
+        shared = FormFieldFile.objects.get().file.name
+        schema = get_published_schema(self.form.slug)
+        uploads = [SimpleUploadedFile('a.txt', b'shared'), SimpleUploadedFile('b.txt', b'new bytes')]
+
+        with mock.patch('formbuilder.submissions.record_submissions', side_effect=RuntimeError):
+            for upload in uploads:
+                with self.assertRaises(RuntimeError):
+                    save_submission(schema, {self.upload_field.id: upload})
+
+        storage = FormFieldFile.file.field.storage
+        self.assertTrue(storage.exists(shared))
+        new_hash = hashlib.sha256(b'new bytes').hexdigest()
+        self.assertFalse(storage.exists(str(Path(shared).parent.parent / new_hash[:2] / new_hash)))
+        self.assertEqual(FormSubmission.objects.count(), 1)
+
+    def test_bad_size_limits_are_refused_on_save(self):
+        for size in ('abc', 0, -1):
+            with self.assertRaisesMessage(BatchError, 'max_size_mb'):
+                apply_batch(self.form, [
+                    {'op': 'update_field', 'id': self.upload_field.id, 'validations': {'max_size_mb': size}},
+                ])
+
+        # A limit saved before it was checked falls back to the default
+        FormField.objects.filter(pk=self.upload_field.pk).update(validations={'max_size_mb': 'abc'})
+        cache.clear()
+        self.assertEqual(self.submit(b'x' * 5000).status_code, 302)
+
+    def test_oversized_upload_is_refused(self):
+        response = self.submit(b'x' * 5000)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most', response.context['errors'][self.upload_field.id][0])
+        self.assertFalse(FormSubmission.objects.exists())
+
+    def test_required_file_is_enforced(self):
+        self.upload_field.is_required = True
+        self.upload_field.save()
+        response = self.client.post(self.url, {f'field_{self.text_field.id}': 'hello'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(self.upload_field.id, response.context['errors'])
+
+    def test_download_streams_the_file(self):
+        self.submit(b'download me')
+        stored = FormFieldFile.objects.get()
+        url = reverse('formbuilder:form_file_download', kwargs={'pk': stored.pk})
+
+        self.assertEqual(self.client.get(url).status_code, 302)  # login required
+        self.client.force_login(User.objects.create(username='viewer'))
+        self.assertEqual(self.client.get(url).status_code, 302)  # staff only
+        self.client.force_login(User.objects.create(username='admin', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'download me')
+        self.assertIn('attachment; filename="cv.txt"', response['Content-Disposition'])
+
+
+class AnalyticsTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(1)
+        self.pick = FormField.objects.create(
+            form=self.form, field_type=self.checkbox_type, label='Pick', order=2,
+            options={'choices': [{'value': 'a', 'label': 'A'}, {'value': 'b', 'label': 'B'}]},
+        )
+        self.schema = get_form_schema(self.form.slug)
+        self.url = reverse('formbuilder:api_form_analytics', kwargs={'pk': self.form.pk})
+        self.client.force_login(User.objects.create(username='admin'))
+
+    def submit(self, *picked):
+        save_submission(self.schema, {self.pick.id: list(picked)})
+
+    def option_counts(self, data):
+        return {option['value']: option['count'] for option in data['fields'][0]['options']}
+
+    def test_counters_follow_submissions(self):
+        self.submit('a', 'b')
+        self.submit('a')
+        queue_submission(self.schema, {self.pick.id: ['b']})
+        drain_queued_submissions()
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['days'], [{'date': str(timezone.localdate()), 'count': 3}])
+        self.assertEqual(self.option_counts(data), {'a': 2, 'b': 2})
+        self.assertEqual(data['fields'][0]['options'][0]['label'], 'A')
+
+    def test_reads_do_not_grow_with_submissions(self):
+        for _ in range(30):
+            self.submit('a')
+        # session, user, form, daily counts, option counts
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_rebuild_recomputes_from_submissions(self):
+        self.submit('a')
+        self.submit('b')
+        DailySubmissionCount.objects.all().delete()
+        OptionCount.objects.update(count=99)
+
+        call_command('rebuild_analytics', stdout=StringIO())
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(self.option_counts(data), {'a': 1, 'b': 1})
+
+    def test_live_counts_match_a_rebuild(self):
+        # A comma in an option value splits the same way however it is counted
+        self.pick.options = {'choices': [{'value': 'a,b', 'label': 'A and B'}]}
+        self.pick.save()
+        self.schema = get_form_schema(self.form.slug)
+        self.submit('a,b')
+        live = self.option_counts(self.client.get(self.url).json())
+
+        call_command('rebuild_analytics', stdout=StringIO())
+        self.assertEqual(self.option_counts(self.client.get(self.url).json()), live)
+
+    def test_removed_options_are_still_reported(self):
+        self.submit('a')
+        self.pick.options = {'choices': [{'value': 'b', 'label': 'B'}]}
+        self.pick.save()
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(self.option_counts(data), {'b': 0, 'a': 1})
+
+
+class FormListTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='admin')
+        self.client.force_login(self.user)
+        self.url = reverse('formbuilder:form_list')
+
+    def make_forms(self, count, **kwargs):
+        forms = [self.make_form(2, name=f'{kwargs.get("status", "form")} {i}', **kwargs) for i in range(count)]
+        save_submission(get_form_schema(forms[0].slug), {})
+        return forms
+
+    def test_query_count_does_not_grow_with_forms(self):
+        self.make_forms(2)
+        with self.assertNumQueries(3):  # session, user, annotated page
+            response = self.client.get(self.url)
+        counts = {form.name: (form.field_count, form.submission_count) for form in response.context['forms']}
+        self.assertEqual(counts, {'form 0': (2, 1), 'form 1': (2, 0)})
+
+        self.make_forms(8, status='draft')
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    @mock.patch('formbuilder.views.FORMS_PAGE_SIZE', 2)
+    def test_pages_keep_filters(self):
+        drafts = self.make_forms(3, status='draft')
+        self.make_forms(2, status='published')
+
+        response = self.client.get(self.url, {'status': 'draft'})
+        self.assertEqual([f.name for f in response.context['forms']], ['draft 2', 'draft 1'])
+        self.assertContains(response, f'status=draft&before={response.context["older_cursor"]}')
+
+        response = self.client.get(self.url, {'status': 'draft', 'before': response.context['older_cursor']})
+        self.assertEqual([f.pk for f in response.context['forms']], [drafts[0].pk])
+        self.assertIsNone(response.context['older_cursor'])
+
+    def test_search_and_creator_filters(self):
+        other = User.objects.create(username='other')
+        self.make_form(1, name='Customer survey', created_by=other)
+        self.make_form(1, name='Job application', created_by=self.user)
+
+        response = self.client.get(self.url, {'q': 'survey'})
+        self.assertEqual([f.name for f in response.context['forms']], ['Customer survey'])
+        response = self.client.get(self.url, {'creator': 'admin'})
+        self.assertEqual([f.name for f in response.context['forms']], ['Job application'])
+        response = self.client.get(self.url, {'q': 'nothing'})
+        self.assertContains(response, 'No forms match these filters.')
+
+
+class SubmissionSearchTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(2)
+        self.schema = get_form_schema(self.form.slug)
+        self.email, self.order = self.schema.fields
+
+    def submit(self, email, order):
+        return save_submission(self.schema, {self.email.id: email, self.order.id: order})
+
+    def search(self, query):
+        url = reverse('formbuilder:api_search_submissions', kwargs={'pk': self.form.pk})
+        return self.client.get(url, {'q': query}).json()['ids']
+
+    def test_finds_submissions_by_answer(self):
+        first = self.submit('jane@example.com', 'ORD-1001')
+        second = self.submit('john@example.com', 'ORD-1002')
+        other_form = self.make_form(1, name='Other')
+        save_submission(get_form_schema(other_form.slug), {other_form.fields.get().id: 'jane@example.com'})
+
+        self.assertEqual(self.search('jane@example.com'), [first.id])
+        self.assertEqual(self.search('ORD-100'), [second.id, first.id])
+        self.assertEqual(self.search('john ORD-1002'), [second.id])
+        self.assertEqual(self.search('nobody'), [])
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        submission = self.submit('jane@example.com', 'ORD-1')
+        submission.data = {str(self.email.id): 'jane@corp.example'}
+        submission.save()
+        self.assertEqual(self.search('jane@example.com'), [])
+        self.assertEqual(self.search('corp'), [submission.id])
+
+        self.form.delete()
+        self.assertEqual(FormSubmission.objects.count(), 0)
+        self.assertEqual(search_submissions(submission.form_id, 'corp'), [])
+
+    def test_search_box_on_submissions_page(self):
+        match = self.submit('jane@example.com', 'ORD-1')
+        self.submit('john@example.com', 'ORD-2')
+        url = reverse('formbuilder:form_submissions', kwargs={'pk': self.form.pk})
+        response = self.client.get(url, {'q': 'jane'})
+        self.assertEqual([s.id for s in response.context['submissions']], [match.id])
+        self.assertContains(response, '1 submission(s) matching')
+
+
+class TypedValueFilterTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(0)
+        self.age, self.born, self.member = FormField.objects.bulk_create([
+            FormField(form=self.form, field_type=FieldType.objects.create(name=name, input_type=input_type),
+                      label=name, order=i)
+            for i, (name, input_type) in enumerate([('Age', 'number'), ('Born', 'date'), ('Member', 'yes_no')])
+        ])
+        self.schema = get_form_schema(self.form.slug)
+        self.people = [
+            save_submission(self.schema, {self.age.id: age, self.born.id: born, self.member.id: member})
+            for age, born, member in [('25', '2001-03-05', 'No'), ('31', '1995-03-20', 'Yes'), ('47', '1979-11-02', 'Yes')]
+        ]
+
+    def ids(self, **params):
+        response = self.client.get(reverse('formbuilder:api_filter_submissions', kwargs={'pk': self.form.pk}), params)
+        return response.json().get('ids', response.json())
+
+    def test_typed_columns_written_with_values(self):
+        value = FormFieldValue.objects.get(submission=self.people[1], field=self.age)
+        self.assertEqual(value.value_number, 31.0)
+        value = FormFieldValue.objects.get(submission=self.people[1], field=self.born)
+        self.assertEqual(str(value.value_date), '1995-03-20')
+        self.assertIs(FormFieldValue.objects.get(submission=self.people[0], field=self.member).value_bool, False)
+
+    def test_filters_use_typed_columns(self):
+        newest_first = [p.id for p in reversed(self.people)]
+        self.assertEqual(self.ids(**{f'field_{self.age.id}__gt': '30'}), newest_first[:2])
+        self.assertEqual(self.ids(**{f'field_{self.born.id}__lt': '2000-01-01',
+                                     f'field_{self.member.id}__eq': 'Yes'}), newest_first[:2])
+        self.assertEqual(self.ids(**{f'field_{self.age.id}__lte': '31', f'field_{self.member.id}__eq': 'Yes'}),
+                         [self.people[1].id])
+
+        queryset = str(filter_by_fields(FormSubmission.objects.all(), [(self.age.id, 'value_number__gt', 30)]).query)
+        self.assertIn('"value_number" > 30', queryset)
+
+    def test_rejects_bad_filters(self):
+        self.assertIn('invalid value', self.ids(**{f'field_{self.age.id}__gt': 'thirty'})['error'])
+        self.assertIn('only support eq', self.ids(**{f'field_{self.member.id}__gt': 'Yes'})['error'])
+        text = FormField.objects.create(form=self.form, field_type=self.text_type, label='Name', order=9)
+        self.assertIn('can be filtered', self.ids(**{f'field_{text.id}__eq': 'x'})['error'])
+
+    def test_submissions_page_and_export_apply_filters(self):
+        params = {f'field_{self.age.id}__gte': '40'}
+        response = self.client.get(reverse('formbuilder:form_submissions', kwargs={'pk': self.form.pk}), params)
+        self.assertEqual([s.id for s in response.context['submissions']], [self.people[2].id])
+
+        response = self.client.get(
+            reverse('formbuilder:form_export', kwargs={'pk': self.form.pk}), {'format': 'jsonl', **params}
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['submission_id'] for row in rows], [self.people[2].id])
+
+
+class RetentionTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        self.enterContext(mock.patch('formbuilder.retention.ARCHIVE_DIR', Path(archive_dir)))
+
+        self.form = self.make_form(1, retention_days=30)
+        self.pick = FormField.objects.create(
+            form=self.form, field_type=self.checkbox_type, label='Pick', order=2,
+            options={'choices': [{'value': 'a', 'label': 'A'}]},
+        )
+        self.schema = get_form_schema(self.form.slug)
+        self.old = [self.submit(days_ago=40 + i) for i in range(5)]
+        self.recent = self.submit(days_ago=1)
+
+    def submit(self, days_ago):
+        submission = save_submission(self.schema, {self.schema.fields[0].id: 'hello', self.pick.id: ['a']})
+        submission.submitted_at = timezone.now() - timedelta(days=days_ago)
+        FormSubmission.objects.filter(pk=submission.pk).update(submitted_at=submission.submitted_at)
+        return submission
+
+    def prune(self, *args):
+        output = StringIO()
+        call_command('prune_submissions', '--batch-size=2', *args, stdout=output)
+        return output.getvalue()
+
+    def test_prunes_expired_submissions_into_an_archive(self):
+        call_command('rebuild_analytics', stdout=StringIO())
+        output = self.prune()
+        self.assertIn('pruned 5 submissions', output)
+        self.assertEqual(list(FormSubmission.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertEqual(FormFieldValue.objects.count(), 2)
+        self.assertEqual(OptionCount.objects.get().count, 1)
+        self.assertEqual(sum(DailySubmissionCount.objects.values_list('count', flat=True)), 1)
+
+        archive = next(retention.ARCHIVE_DIR.glob('*.jsonl.gz'))
+        with gzip.open(archive, 'rt') as lines:
+            records = [json.loads(line) for line in lines]
+        self.assertEqual(sorted(r['id'] for r in records), sorted(s.id for s in self.old))
+
+        call_command('rehydrate_submissions', str(archive), stdout=StringIO())
+        call_command('rehydrate_submissions', str(archive), stdout=StringIO())  # already restored
+        self.assertEqual(FormSubmission.objects.count(), 6)
+        restored = FormSubmission.objects.get(pk=self.old[0].pk)
+        self.assertEqual(restored.submitted_at, self.old[0].submitted_at)
+        self.assertEqual(get_submission_values(restored), {self.schema.fields[0].id: 'hello', self.pick.id: 'a'})
+        self.assertEqual(OptionCount.objects.get().count, 6)
+
+    def test_rehydrate_keeps_answers_to_deleted_fields_in_the_payload(self):
+        self.prune()
+        pick_id = self.pick.id
+        self.pick.delete()
+        call_command('rehydrate_submissions', str(next(retention.ARCHIVE_DIR.glob('*.jsonl.gz'))), stdout=StringIO())
+
+        restored = FormSubmission.objects.get(pk=self.old[0].pk)
+        self.assertEqual(restored.data, {str(self.schema.fields[0].id): 'hello', str(pick_id): 'a'})
+        self.assertEqual(list(restored.values.values_list('field_id', flat=True)), [self.schema.fields[0].id])
+
+    def test_rehydrate_keeps_the_published_version(self):
+        version = publish_form(self.form)
+        self.schema = get_published_schema(self.form.slug)
+        submission = self.submit(days_ago=50)
+        self.prune()
+        call_command('rehydrate_submissions', str(next(retention.ARCHIVE_DIR.glob('*.jsonl.gz'))), stdout=StringIO())
+
+        restored = FormSubmission.objects.get(pk=submission.pk)
+        self.assertEqual(restored.form_version_id, version.id)
+        self.assertIsNone(FormSubmission.objects.get(pk=self.old[0].pk).form_version_id)
+
+    def test_forms_without_retention_are_kept(self):
+        self.form.retention_days = None
+        self.form.save()
+        self.prune()
+        self.assertEqual(FormSubmission.objects.count(), 6)
+
+    def test_prune_without_archive(self):
+        self.form.archive_pruned = False
+        self.form.save()
+        self.assertNotIn(' into ', self.prune())
+        self.assertEqual(FormSubmission.objects.count(), 1)
+        self.assertFalse(list(retention.ARCHIVE_DIR.glob('*')))
+
+    def test_large_forms_are_deleted_in_the_background(self):
+        self.client.force_login(User.objects.create(username='admin'))
+        with mock.patch('formbuilder.retention.PRUNE_BATCH_SIZE', 2):
+            self.client.post(reverse('formbuilder:form_delete', kwargs={'pk': self.form.pk}))
+        self.form.refresh_from_db()
+        self.assertIsNotNone(self.form.deletion_requested_at)
+        self.assertEqual(self.form.status, 'archived')
+        self.assertNotIn(self.form, self.client.get(reverse('formbuilder:form_list')).context['forms'])
+
+        self.assertIn('and 6 submissions', self.prune())
+        self.assertFalse(Form.objects.filter(pk=self.form.pk).exists())
+        self.assertFalse(FormFieldValue.objects.exists())
+
+    def test_small_forms_are_deleted_right_away(self):
+        self.client.force_login(User.objects.create(username='admin'))
+        self.client.post(reverse('formbuilder:form_delete', kwargs={'pk': self.form.pk}))
+        self.assertFalse(Form.objects.filter(pk=self.form.pk).exists())
+
+
+class VersionTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='admin'))
+        self.form = self.make_form(2, status='draft')
+        self.first, self.second = self.form.fields.order_by('order')
+
+    def publish(self):
+        response = self.client.post(
+            reverse('formbuilder:api_update_form', kwargs={'pk': self.form.pk}),
+            json.dumps({'status': 'published'}), content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'success': True})
+        self.form.refresh_from_db()
+        return self.form.published_version
+
+    def display(self):
+        return self.client.get(reverse('formbuilder:form_display', kwargs={'slug': self.form.slug})).content.decode()
+
+    def submit(self, data):
+        return self.client.post(reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug}), data)
+
+    def test_published_schema_cached_before_the_commit_is_dropped_after_it(self):
+        self.publish()
+        stale = get_published_schema(self.form.slug)
+        self.first.label = 'Renamed'
+        self.first.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_form(self.form)
+            # Another connection still reads the old version and caches it again
+            cache.set(published_schema_cache_key(self.form.slug), stale)
+        self.assertIn('Renamed', self.display())
+
+    def test_edits_go_live_when_published_again(self):
+        version = self.publish()
+        self.assertEqual(version.number, 1)
+
+        self.first.label = 'Renamed'
+        self.first.save()
+        self.assertNotIn('Renamed', self.display())
+        self.assertIn('Field 0', self.display())
+
+        self.assertEqual(self.publish().number, 2)
+        self.assertIn('Renamed', self.display())
+        # Nothing changed since, so republishing keeps the version
+        self.assertEqual(self.publish().number, 2)
+        self.assertEqual(self.form.versions.count(), 2)
+
+    def test_submissions_record_their_version(self):
+        version = self.publish()
+        self.first.label = 'Renamed'
+        self.first.save()
+        self.submit({f'field_{self.first.id}': 'one', f'field_{self.second.id}': 'two'})
+
+        submission = FormSubmission.objects.get()
+        self.assertEqual(submission.form_version, version)
+        data = self.client.get(reverse('formbuilder:api_get_submission', kwargs={'pk': submission.pk})).json()
+        self.assertEqual(data['version'], 1)
+        self.assertEqual([value['label'] for value in data['values']], ['Field 0', 'Field 1'])
+
+    def test_fields_deleted_after_publishing_are_not_stored_as_rows(self):
+        self.publish()
+        deleted_id = self.second.id
+        self.second.delete()
+        response = self.submit({f'field_{self.first.id}': 'one', f'field_{deleted_id}': 'two'})
+        self.assertEqual(response.status_code, 302)
+
+        submission = FormSubmission.objects.get()
+        self.assertEqual(submission.data, {str(self.first.id): 'one', str(deleted_id): 'two'})
+        self.assertEqual(list(submission.values.values_list('field_id', flat=True)), [self.first.id])
+
+    def test_legacy_published_forms_serve_their_live_fields(self):
+        self.form.status = 'published'
+        self.form.save()
+        self.assertIn('Field 0', self.display())
+        self.submit({f'field_{self.first.id}': 'one'})
+        self.assertIsNone(FormSubmission.objects.get().form_version)
+
+
+@override_settings(MIDDLEWARE=[
+    'formbuilder.instrumentation.RequestInstrumentationMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+])
+class InstrumentationTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir, ignore_errors=True)
+        self.enterContext(mock.patch('formbuilder.instrumentation.LOG_PATH', Path(log_dir) / 'requests.jsonl'))
+        self.addCleanup(lambda: [handler.close() for handler in instrumentation.logger.handlers])
+        self.form = self.make_form(2)
+        self.display_url = reverse('formbuilder:form_display', kwargs={'slug': self.form.slug})
+
+    def records(self):
+        return list(instrumentation.read_records())
+
+    def test_unsampled_requests_are_not_recorded(self):
+        self.client.get(self.display_url)
+        self.assertEqual(self.records(), [])
+
+    @mock.patch('formbuilder.instrumentation.SAMPLE_RATE', 1)
+    def test_records_timings_queries_and_duplicates(self):
+        self.client.get(self.display_url)
+        record, = self.records()
+        self.assertEqual(record['view'], 'formbuilder:form_display')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['duplicates'], [])
+
+        recorder = instrumentation.RequestRecorder()
+        with connection.execute_wrapper(recorder):
+            for field in self.form.fields.all():
+                field.field_type.name
+        with mock.patch('formbuilder.instrumentation.DUPLICATE_THRESHOLD', 2):
+            self.assertEqual([item['count'] for item in recorder.duplicates()], [2])
+
+    @mock.patch('formbuilder.instrumentation.SAMPLE_RATE', 1)
+    @override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+    async def test_records_async_views(self):
+        response = await self.async_client.get(self.display_url)
+        self.assertEqual(response.status_code, 200)
+        record, = self.records()
+        self.assertEqual(record['view'], 'formbuilder:form_display')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    @mock.patch('formbuilder.instrumentation.SAMPLE_RATE', 1)
+    def test_endpoint_reports_percentiles_to_staff_only(self):
+        for _ in range(4):
+            self.client.get(self.display_url)
+        url = reverse('formbuilder:api_instrumentation')
+
+        self.client.force_login(User.objects.create(username='viewer'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        views = self.client.get(url).json()['views']
+        display, = [view for view in views if view['view'] == 'formbuilder:form_display']
+        self.assertEqual(display['count'], 4)
+        self.assertEqual(set(display['wall_ms']), {'p50', 'p95', 'p99'})
+        self.assertLessEqual(display['wall_ms']['p50'], display['wall_ms']['p99'])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([instrumentation.percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(instrumentation.percentile([7], 99), 7)
+
+
+class SeedTests(FormBuilderTestCase):
+
+    def test_seeds_forms_and_submissions(self):
+        output = StringIO()
+        call_command(
+            'seed_formbuilder', '--forms=2', '--sections=3', '--fields=12', '--options=4', '--rules=2',
+            '--submissions=25', '--batch-size=10', stdout=output,
+        )
+        self.assertIn('Created 2 forms and 50 submissions', output.getvalue())
+
+        form = Form.objects.get(name='Seeded Form 1')
+        self.assertEqual(form.status, 'published')
+        self.assertEqual(form.sections.count(), 3)
+        self.assertEqual(form.fields.exclude(conditional_logic={}).count(), 2)
+        self.assertEqual(form.submissions.count(), 25)
+        self.assertEqual(set(form.submissions.values_list('form_version', flat=True)), {form.published_version_id})
+        self.assertEqual(sum(DailySubmissionCount.objects.filter(form=form).values_list('count', flat=True)), 25)
+
+    def test_seeding_twice_adds_more_forms(self):
+        for _ in range(2):
+            call_command('seed_formbuilder', '--forms=2', '--fields=3', '--submissions=2', stdout=StringIO())
+        self.assertEqual(
+            sorted(Form.objects.values_list('slug', flat=True)),
+            ['seeded-form-1', 'seeded-form-2', 'seeded-form-3', 'seeded-form-4'],
+        )
+
+    def test_seeded_answers_pass_validation(self):
+        call_command('setup_field_types', stdout=StringIO())
+        form = seeding.seed_form('Seeded', sections=2, fields=20, rules=3)
+        schema = get_published_schema(form.slug)
+        checkbox_ids = {field.id for field in schema.fields if field.input_type == 'checkbox'}
+        rng = random.Random(1)
+        for _ in range(20):
+            data = QueryDict(mutable=True)
+            for field_id, value in seeding.fake_answers(schema, rng).items():
+                data.setlist(f'field_{field_id}', value.split(',') if field_id in checkbox_ids else [value])
+            self.assertEqual(validate_submission(schema, data, {})[1], {})
+
+
+class ConditionalGetTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(2)
+        self.display_url = reverse('formbuilder:form_display', kwargs={'slug': self.form.slug})
+
+    def test_public_pages_are_cacheable_and_revalidate_without_queries(self):
+        response = self.client.get(self.display_url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertFalse(response.cookies)
+
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.display_url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+        success_url = reverse('formbuilder:form_success', kwargs={'slug': self.form.slug})
+        success = self.client.get(success_url)
+        self.assertContains(success, self.form.success_message)
+        revalidated = self.client.get(success_url, headers={'if-modified-since': success['Last-Modified']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_publishing_changes_the_etag(self):
+        etag = self.client.get(self.display_url)['ETag']
+        FormField.objects.create(form=self.form, field_type=self.text_type, label='New', order=5)
+        publish_form(self.form)
+        response = self.client.get(self.display_url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_csrf_token_is_fetched_separately(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        submit_url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+        self.assertEqual(client.post(submit_url, {}).status_code, 403)
+
+        response = client.get(reverse('formbuilder:api_csrf_token'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = client.post(submit_url, {'csrfmiddlewaretoken': response.json()['token']})
+        self.assertEqual(response.status_code, 302)
+
+    def test_builder_reads_revalidate_privately(self):
+        self.client.force_login(User.objects.create(username='admin'))
+        field = self.form.fields.first()
+        url = reverse('formbuilder:api_get_field', kwargs={'pk': field.pk})
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+
+        field.label = 'Changed'
+        field.save()
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.json()['label'], 'Changed')
+
+        section = FormSection.objects.create(form=self.form, title='Intro')
+        url = reverse('formbuilder:api_get_section', kwargs={'pk': section.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+
+@override_settings(FORMBUILDER_PAYLOAD_ONLY_FORMS=['form-2'])
+class StatelessSuccessTests(FormBuilderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.form = self.make_form(2)
+        self.submit_url = reverse('formbuilder:form_submit', kwargs={'slug': self.form.slug})
+        self.data = {f'field_{field.id}': 'hi' for field in self.form.fields.all()}
+        # Warm the published schema, as every request after the first finds it
+        self.client.get(reverse('formbuilder:form_display', kwargs={'slug': self.form.slug}))
+
+    def test_anonymous_submission_is_one_write_transaction(self):
+        # Savepoint, submission insert, daily counter upsert, release
+        with self.assertNumQueries(4):
+            response = self.client.post(self.submit_url, self.data)
+        self.assertFalse(Session.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        with self.assertNumQueries(0):
+            success = self.client.get(response.url)
+        self.assertContains(success, f'Reference: #{FormSubmission.objects.get().pk}')
+        self.assertIn('private', success['Cache-Control'])
+
+    def test_bad_or_foreign_tokens_show_the_plain_page(self):
+        other = self.make_form(1, name='Other')
+        success_url = reverse('formbuilder:form_success', kwargs={'slug': self.form.slug})
+        for token in ('garbage', views.success_token(get_form_schema(other.slug), 7)):
+            response = self.client.get(success_url, {'token': token})
+            self.assertContains(response, self.form.success_message)
+            self.assertNotContains(response, 'Reference')
+
+        with mock.patch('formbuilder.views.SUCCESS_TOKEN_MAX_AGE', -1):
+            token = views.success_token(get_form_schema(self.form.slug), 7)
+            self.assertNotContains(self.client.get(success_url, {'token': token}), 'Reference')
+
+    @override_settings(FORMBUILDER_INLINE_SUCCESS=True)
+    def test_inline_success_page(self):
+        with self.assertNumQueries(4):
+            response = self.client.post(self.submit_url, self.data)
+        self.assertContains(response, self.form.success_message)
+        self.assertContains(response, f'Reference: #{FormSubmission.objects.get().pk}')
@@ -0,0 +1,122 @@
+"""
+Streaming storage of file field uploads.
+
+FieldUploadHandler replaces Django's upload handlers on form submissions.
+Each file is written to a temporary file on disk chunk by chunk while its
+SHA-256 is computed, and a file that goes over its field's size limit is
+dropped the moment it does, so oversized uploads are never buffered.
+Stored files are named after their hash, so identical uploads share one
+copy in storage.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .validation import as_bound
+
+
+DEFAULT_MAX_SIZE_MB = getattr(settings, 'FORMBUILDER_MAX_UPLOAD_SIZE_MB', 10)
+UPLOAD_DIRECTORY = 'formbuilder/uploads'
+
+
+def upload_storage():
+    """The storage backend for uploads, FORMBUILDER_FILE_STORAGE from STORAGES"""
+    return storages[getattr(settings, 'FORMBUILDER_FILE_STORAGE', 'default')]
+
+
+def max_upload_size(field):
+    """A file field's size limit in bytes, from its max_size_mb validation"""
+    # check_validations refuses bad limits; one saved before that gets the default
+    size_mb = as_bound(field.validations.get('max_size_mb', DEFAULT_MAX_SIZE_MB))
+    return int((size_mb if size_mb and size_mb > 0 else DEFAULT_MAX_SIZE_MB) * 1024 * 1024)
+
+
+def is_upload(value):
+    return isinstance(value, UploadedFile)
+
+
+class RejectedUpload:
+    """Stands in request.FILES for an upload refused while it was streaming"""
+
+    def __init__(self, name, error):
+        self.name = name
+        self.error = error
+
+
+class FieldUploadHandler(FileUploadHandler):
+    """Stream the file fields of a FormSchema to disk, enforcing per-field size limits"""
+
+    def __init__(self, schema, request=None):
+        super().__init__(request)
+        self.limits = {
+            f'field_{field.id}': max_upload_size(field)
+            for field in schema.fields
+            if field.input_type == 'file'
+        }
+        self.file = None
+        self.error = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.limit = self.limits.get(field_name)
+        self.error = None
+        self.file = None
+        # Files sent for anything but a file field of this form are ignored
+        if self.limit is not None:
+            self.file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+            self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.file is None:
+            return None
+        if start + len(raw_data) > self.limit:
+            self.file.close()
+            self.file = None
+            self.error = f'Files can be at most {self.limit / 1024 / 1024:g} MB.'
+            return None
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        if self.file is None:
+            return None
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+
+def store_upload(upload):
+    """
+    Save an upload under its content hash and return (storage name, created).
+
+    An identical file that is already stored is reused instead of saved
+    again, and ``created`` is False. Uploads on disk are moved into place
+    rather than copied by FileSystemStorage.
+    """
+    if not getattr(upload, 'sha256', None):
+        # Not streamed through FieldUploadHandler
+        hasher = hashlib.sha256()
+        for chunk in upload.chunks():
+            hasher.update(chunk)
+        upload.sha256 = hasher.hexdigest()
+        upload.seek(0)
+
+    name = f'{UPLOAD_DIRECTORY}/{upload.sha256[:2]}/{upload.sha256}'
+    storage = upload_storage()
+    if storage.exists(name):
+        return name, False
+    return storage.save(name, upload), True
+
+
+def delete_uploads(names):
+    """Remove files written by store_upload for a submission that was not saved"""
+    storage = upload_storage()
+    for name in names:
+        storage.delete(name)
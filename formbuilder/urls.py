@@ -1,8 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'formbuilder'
 
+if getattr(settings, 'FORMBUILDER_ASYNC_VIEWS', False):
+    form_display, form_submit, form_success = views.aform_display, views.aform_submit, views.aform_success
+else:
+    form_display, form_submit, form_success = views.form_display, views.form_submit, views.form_success
+
 urlpatterns = [
     # Form builder admin views
     path('', views.form_list, name='form_list'),
@@ -10,17 +16,31 @@ urlpatterns = [
     path('<int:pk>/edit/', views.form_edit, name='form_edit'),
     path('<int:pk>/delete/', views.form_delete, name='form_delete'),
     path('<int:pk>/submissions/', views.form_submissions, name='form_submissions'),
+    path('<int:pk>/submissions/export/', views.form_export, name='form_export'),
+    path('files/<int:pk>/download/', views.form_file_download, name='form_file_download'),
     
     # Public form views
-    path('f/<slug:slug>/', views.form_display, name='form_display'),
-    path('f/<slug:slug>/submit/', views.form_submit, name='form_submit'),
-    path('f/<slug:slug>/success/', views.form_success, name='form_success'),
+    path('f/<slug:slug>/', form_display, name='form_display'),
+    path('f/<slug:slug>/submit/', form_submit, name='form_submit'),
+    path('f/<slug:slug>/success/', form_success, name='form_success'),
+    
+    # API endpoints - Public
+    path('api/csrf/', views.api_csrf_token, name='api_csrf_token'),
     
     # API endpoints - Forms
     path('api/forms/<int:pk>/update/', views.api_update_form, name='api_update_form'),
+    path('api/forms/<int:pk>/batch/', views.api_batch, name='api_batch'),
+    
+    # API endpoints - Submissions
+    path('api/submissions/<int:pk>/', views.api_get_submission, name='api_get_submission'),
+    path('api/forms/<int:pk>/submissions/', views.api_filter_submissions, name='api_filter_submissions'),
+    path('api/forms/<int:pk>/submissions/search/', views.api_search_submissions, name='api_search_submissions'),
+    path('api/forms/<int:pk>/analytics/', views.api_form_analytics, name='api_form_analytics'),
+    path('api/instrumentation/', views.api_instrumentation, name='api_instrumentation'),
     
     # API endpoints - Sections
     path('api/forms/<int:pk>/sections/add/', views.api_add_section, name='api_add_section'),
+    path('api/forms/<int:pk>/sections/reorder/', views.api_reorder_sections, name='api_reorder_sections'),
     path('api/sections/<int:pk>/', views.api_get_section, name='api_get_section'),
     path('api/sections/<int:pk>/update/', views.api_update_section, name='api_update_section'),
     path('api/sections/<int:pk>/delete/', views.api_delete_section, name='api_delete_section'),
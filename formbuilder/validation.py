@@ -0,0 +1,235 @@
+"""
+Server-side validation driven by each field's validations JSON.
+
+Rules are compiled once per schema version into plain callables (with any
+regexes precompiled), so validating a submission walks the fields without
+re-reading any JSON.
+"""
+import logging
+import math
+import re
+from datetime import date
+
+
+PATTERNS = {
+    'email': (re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$'), 'Enter a valid email address.'),
+    'phone': (re.compile(r'^\+?[\d\s().-]{7,20}$'), 'Enter a valid phone number.'),
+}
+TEXT_INPUT_TYPES = {'text', 'textarea', 'email', 'tel'}
+MAX_COMPILED_SCHEMAS = 256
+
+_compiled = {}
+
+logger = logging.getLogger(__name__)
+
+
+def max_length(limit):
+    def validate(value):
+        if len(value) > limit:
+            return f'Ensure this value has at most {limit} characters.'
+    return validate
+
+
+def min_length(limit):
+    def validate(value):
+        if len(value) < limit:
+            return f'Ensure this value has at least {limit} characters.'
+    return validate
+
+
+def pattern(name_or_regex):
+    if name_or_regex in PATTERNS:
+        regex, message = PATTERNS[name_or_regex]
+    else:
+        regex, message = re.compile(name_or_regex), 'Enter a valid value.'
+
+    def validate(value):
+        if not regex.fullmatch(value):
+            return message
+    return validate
+
+
+def as_bound(value):
+    """A min/max rule as a float, or None when it is missing or not a number"""
+    try:
+        bound = float(value)
+    except (TypeError, ValueError):
+        return None
+    return bound if math.isfinite(bound) else None
+
+
+def as_length(value):
+    """A min_length/max_length rule as an int, or None when it is missing or not a whole number"""
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        return None
+    return length if length >= 0 else None
+
+
+def number(minimum=None, maximum=None):
+    def validate(value):
+        try:
+            parsed = float(value)
+        except ValueError:
+            return 'Enter a number.'
+        if minimum is not None and parsed < minimum:
+            return f'Ensure this value is greater than or equal to {minimum}.'
+        if maximum is not None and parsed > maximum:
+            return f'Ensure this value is less than or equal to {maximum}.'
+    return validate
+
+
+def iso_date(value):
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return 'Enter a valid date.'
+
+
+def one_of(allowed):
+    allowed = frozenset(allowed)
+
+    def validate(value):
+        if value not in allowed:
+            return 'Select a valid choice.'
+    return validate
+
+
+def each_one_of(allowed):
+    allowed = frozenset(allowed)
+
+    def validate(values):
+        if not allowed.issuperset(values):
+            return 'Select a valid choice.'
+    return validate
+
+
+def compile_field_validators(field):
+    """Turn a FieldSchema's rules into a list of callables returning an error or None"""
+    rules = field.validations
+    validators = []
+
+    if field.input_type in TEXT_INPUT_TYPES:
+        for name, validator in (('min_length', min_length), ('max_length', max_length)):
+            if rules.get(name):
+                limit = as_length(rules[name])
+                if limit is None:
+                    logger.warning('Ignoring invalid %s %r on field %s', name, rules[name], field.id)
+                else:
+                    validators.append(validator(limit))
+        if field.input_type == 'email' and 'pattern' not in rules:
+            validators.append(pattern('email'))
+        if rules.get('pattern'):
+            try:
+                validators.append(pattern(rules['pattern']))
+            except re.error as e:
+                # check_validations keeps these out of new edits; older rows are skipped
+                logger.warning('Ignoring invalid pattern %r on field %s: %s', rules['pattern'], field.id, e)
+    elif field.input_type == 'number':
+        validators.append(number(as_bound(rules.get('min')), as_bound(rules.get('max'))))
+    elif field.input_type == 'date':
+        validators.append(iso_date)
+    elif field.input_type in ('select', 'radio') and field.choices:
+        validators.append(one_of(choice['value'] for choice in field.choices))
+    elif field.input_type == 'checkbox' and field.choices:
+        validators.append(each_one_of(choice['value'] for choice in field.choices))
+    elif field.input_type == 'yes_no':
+        validators.append(one_of(['Yes', 'No']))
+
+    return validators
+
+
+def check_validations(rules):
+    """Raise ValueError if a field's validations hold a pattern, bound, length or size limit that cannot be used"""
+    rules = rules or {}
+    if not isinstance(rules, dict):
+        raise ValueError('Validations must be an object')
+    regex = rules.get('pattern')
+    if regex and regex not in PATTERNS:
+        try:
+            re.compile(regex)
+        except (re.error, TypeError) as e:
+            raise ValueError(f'Invalid pattern {regex!r}: {e}')
+    for name in ('min', 'max'):
+        if rules.get(name) not in (None, '') and as_bound(rules[name]) is None:
+            raise ValueError(f'{name} must be a number')
+    for name in ('min_length', 'max_length'):
+        if rules.get(name) not in (None, '') and as_length(rules[name]) is None:
+            raise ValueError(f'{name} must be a whole number')
+    # Read by uploads.FieldUploadHandler before the view runs
+    if 'max_size_mb' in rules and not (as_bound(rules['max_size_mb']) or 0) > 0:
+        raise ValueError('max_size_mb must be a positive number')
+
+
+def compile_validators(schema):
+    return [(field, f'field_{field.id}', compile_field_validators(field)) for field in schema.fields]
+
+
+def get_validators(schema):
+    """Return the compiled validators for a schema, compiling once per version"""
+    key = (schema.id, schema.version)
+    validators = _compiled.get(key)
+    if validators is None:
+        if len(_compiled) >= MAX_COMPILED_SCHEMAS:
+            _compiled.clear()
+        validators = _compiled[key] = compile_validators(schema)
+    return validators
+
+
+def validate_submission(schema, data, files=None):
+    """
+    Validate POST data (and uploaded files) against a schema.
+
+    Returns (values, errors): the submitted value of every visible field (a
+    list for checkboxes, an UploadedFile for file fields) and a
+    {field_id: [messages]} dict that is empty when the submission is valid.
+    Fields hidden by conditional logic are dropped from values and never
+    validated. Size limits on files are enforced while they stream in (see
+    uploads.FieldUploadHandler); refused uploads are reported here.
+    """
+    validators = get_validators(schema)
+    files = files or {}
+    values = {}
+    rejected = {}
+    for field, key, _ in validators:
+        if field.input_type == 'checkbox':
+            values[field.id] = data.getlist(key)
+        elif field.input_type == 'file':
+            upload = files.get(key)
+            if getattr(upload, 'error', None):
+                rejected[field.id] = upload.error
+                upload = None
+            values[field.id] = upload
+        else:
+            values[field.id] = data.get(key, '').strip()
+
+    # Conditions compare against the file name, not the file
+    hidden = schema.conditions.hidden_fields({
+        field_id: '' if value is None else getattr(value, 'name', value)
+        for field_id, value in values.items()
+    })
+    errors = {}
+
+    for field, key, field_validators in validators:
+        if field.id in hidden:
+            del values[field.id]
+            continue
+
+        if field.id in rejected:
+            errors[field.id] = [rejected[field.id]]
+            continue
+
+        value = values[field.id]
+        if not value:
+            if field.is_required:
+                errors[field.id] = ['This field is required.']
+            if value is None:
+                del values[field.id]
+            continue
+
+        messages = [message for message in (validate(value) for validate in field_validators) if message]
+        if messages:
+            errors[field.id] = messages
+
+    return values, errors
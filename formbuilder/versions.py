@@ -0,0 +1,45 @@
+"""
+Published versions of forms.
+
+Publishing freezes the form's current FormSchema into a numbered
+FormVersion. The public display and submit views serve that snapshot (see
+schema.get_published_schema), so builder edits stay invisible until the
+form is published again, and each submission records the version that was
+filled in.
+"""
+import json
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import FormVersion
+from .schema import build_form_schema, snapshot_schema
+
+
+def publish_form(form, published_by=None):
+    """
+    Snapshot the form's current structure as its next version and publish it.
+
+    Republishing a form whose snapshot would be unchanged keeps its current
+    version. Returns the published FormVersion.
+    """
+    with transaction.atomic():
+        # Round-trip through JSON so tuples compare equal to the stored lists
+        snapshot = json.loads(json.dumps(snapshot_schema(build_form_schema(form))))
+        version = form.published_version
+        if version is None or version.snapshot != snapshot:
+            number = (form.versions.aggregate(number=Max('number'))['number'] or 0) + 1
+            version = FormVersion.objects.create(
+                form=form, number=number, snapshot=snapshot, published_by=published_by,
+            )
+        form.published_version = version
+        form.status = 'published'
+        # post_save drops the cached schemas, and again after the commit
+        form.save()
+    return version
+
+
+def has_unpublished_changes(form):
+    """Whether the form's structure changed since its published version was taken"""
+    version = form.published_version
+    return version is not None and version.snapshot['version'] != form.schema_version
@@ -1,18 +1,95 @@
 import json
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core import signing
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import models
-from django.http import JsonResponse
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import add_never_cache_headers
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_POST, require_GET
-from .models import Form, FormField, FormSection, FormSubmission, FormFieldValue, FieldType
+from .models import Form, FormField, FormFieldFile, FormSection, FormSubmission, FieldType
+from . import instrumentation
+from .analytics import form_analytics
+from .batch import BatchError, apply_batch, parse_options
+from .conditional import cache_privately, cache_publicly, not_modified, schema_etag
+from .conditions import ConditionCycleError, check_conditional_logic
+from .exports import EXPORT_FORMATS, parse_export_filters, stream_export
+from .filters import field_filter_params, filter_by_fields, parse_field_filters
+from .fragments import aget_form_body, get_form_body, render_form_body
+from .ordering import ORDER_GAP, OrderingError, move, reorder
+from .pagination import keyset_page
+from .retention import request_form_deletion
+from .schema import (
+    aget_form_schema, aget_published_schema, get_form_schema, get_published_schema, schema_from_snapshot,
+)
+from .search import search_submissions
+from .signals import bump_schema_version
+from .submissions import (
+    aqueue_submission, asave_submission, get_submission_values, queue_submission, queues_submissions,
+    save_submission,
+)
+from .uploads import FieldUploadHandler
+from .validation import validate_submission
+from .versions import has_unpublished_changes, publish_form
+
+
+SUBMISSIONS_PAGE_SIZE = getattr(settings, 'FORMBUILDER_SUBMISSIONS_PAGE_SIZE', 50)
+FORMS_PAGE_SIZE = getattr(settings, 'FORMBUILDER_FORMS_PAGE_SIZE', 50)
+SUCCESS_TOKEN_MAX_AGE = getattr(settings, 'FORMBUILDER_SUCCESS_TOKEN_MAX_AGE', 60 * 60)
+
+
+def count_of(model):
+    """A correlated subquery counting the model's rows for each form"""
+    rows = model.objects.filter(form=models.OuterRef('pk')).order_by().values('form')
+    return Coalesce(models.Subquery(rows.annotate(count=models.Count('pk')).values('count')), 0)
 
 
 @login_required
 def form_list(request):
-    """List all forms for admin"""
-    forms = Form.objects.all()
-    return render(request, 'formbuilder/form_list.html', {'forms': forms})
+    """List forms for admin, one keyset page at a time, with search and filters"""
+    forms = Form.objects.filter(deletion_requested_at__isnull=True).select_related('created_by').annotate(
+        field_count=count_of(FormField),
+        submission_count=count_of(FormSubmission),
+    )
+    
+    filters = {}
+    search = request.GET.get('q', '').strip()
+    if search:
+        forms = forms.filter(models.Q(name__icontains=search) | models.Q(slug__icontains=search))
+        filters['q'] = search
+    status = request.GET.get('status')
+    if status in dict(Form.STATUS_CHOICES):
+        forms = forms.filter(status=status)
+        filters['status'] = status
+    creator = request.GET.get('creator', '').strip()
+    if creator:
+        forms = forms.filter(created_by__username=creator)
+        filters['creator'] = creator
+    
+    forms, older, newer = keyset_page(
+        forms,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+        page_size=FORMS_PAGE_SIZE,
+        order_field='created_at',
+    )
+    
+    return render(request, 'formbuilder/form_list.html', {
+        'forms': forms,
+        'filters': filters,
+        'filter_query': urlencode(filters),
+        'status_choices': Form.STATUS_CHOICES,
+        'older_cursor': older,
+        'newer_cursor': newer,
+    })
 
 
 @login_required
@@ -36,7 +113,7 @@ def form_create(request):
 @login_required
 def form_edit(request, pk):
     """Edit form and its fields"""
-    form = get_object_or_404(Form, pk=pk)
+    form = get_object_or_404(Form.objects.select_related('published_version'), pk=pk)
     field_types = FieldType.objects.filter(is_active=True)
     sections = form.sections.all().order_by('order')
     
@@ -44,6 +121,7 @@ def form_edit(request, pk):
         'form': form,
         'field_types': field_types,
         'sections': sections,
+        'unpublished_changes': has_unpublished_changes(form),
     })
 
 
@@ -54,75 +132,295 @@ def form_delete(request, pk):
     
     if request.method == 'POST':
         name = form.name
-        form.delete()
-        messages.success(request, f'Form "{name}" deleted successfully!')
+        if request_form_deletion(form):
+            messages.success(request, f'Form "{name}" deleted successfully!')
+        else:
+            messages.success(request, f'Form "{name}" was unpublished and will be deleted in the background.')
         return redirect('formbuilder:form_list')
     
     return render(request, 'formbuilder/form_delete.html', {'form': form})
 
 
+def submission_queryset(form, params):
+    """A form's submissions narrowed by any field_<id>__<op> filters in params"""
+    submissions = form.submissions.select_related('submitted_by')
+    if field_filter_params(params):
+        conditions = parse_field_filters(get_form_schema(form.slug), params)
+        submissions = filter_by_fields(submissions, conditions)
+    return submissions
+
+
 @login_required
 def form_submissions(request, pk):
-    """View all submissions for a form"""
+    """View submissions for a form, one keyset page at a time"""
     form = get_object_or_404(Form, pk=pk)
-    submissions = form.submissions.all()
+    try:
+        submissions = submission_queryset(form, request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    search = request.GET.get('q', '').strip()
+    if search:
+        # Search results are capped at FORMBUILDER_SEARCH_LIMIT and not paged
+        submissions = list(submissions.filter(
+            id__in=search_submissions(form.id, search)
+        ).order_by('-submitted_at', '-id'))
+        older = newer = None
+    else:
+        submissions, older, newer = keyset_page(
+            submissions,
+            before=request.GET.get('before'),
+            after=request.GET.get('after'),
+            page_size=SUBMISSIONS_PAGE_SIZE,
+        )
     
+    field_filters = field_filter_params(request.GET)
     return render(request, 'formbuilder/form_submissions.html', {
         'form': form,
         'submissions': submissions,
+        'search': search,
+        'field_filters': field_filters,
+        'filter_query': urlencode(field_filters),
+        'total_count': form.submissions.count(),
+        'older_cursor': older,
+        'newer_cursor': newer,
     })
 
 
+@login_required
+@require_GET
+def form_export(request, pk):
+    """Stream a form's submissions as CSV or JSON Lines"""
+    form = get_object_or_404(Form, pk=pk)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Unsupported export format')
+    
+    try:
+        filters = parse_export_filters(
+            since_id=request.GET.get('since_id'),
+            start=request.GET.get('start'),
+            end=request.GET.get('end'),
+        )
+        if field_filter_params(request.GET):
+            filters['field_filters'] = parse_field_filters(get_form_schema(form.slug), request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream_export(form, export_format, **filters), content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="{form.slug}-submissions.{extension}"'
+    return response
+
+
+@staff_member_required
+@require_GET
+def form_file_download(request, pk):
+    """Stream an uploaded file back as an attachment, to staff only"""
+    field_file = get_object_or_404(FormFieldFile, pk=pk)
+    return FileResponse(
+        field_file.file.storage.open(field_file.file.name, 'rb'),
+        as_attachment=True,
+        filename=field_file.original_name,
+        content_type=field_file.content_type or 'application/octet-stream',
+    )
+
+
+def get_published_schema_or_404(slug):
+    """Return the cached published version of a form or raise Http404"""
+    schema = get_published_schema(slug)
+    if schema is None:
+        raise Http404('No published form matches the given query.')
+    return schema
+
+
+def render_form_page(request, schema, form_body, errors=None):
+    return render(request, 'formbuilder/form_display.html', {
+        'form': schema,
+        'form_body': form_body,
+        'condition_graph': schema.conditions.as_json(),
+        'errors': errors,
+        # Public pages are the same for every visitor (see conditional.py)
+        'messages': (),
+    }, status=400 if errors else 200)
+
+
 def form_display(request, slug):
     """Display form for users to fill out"""
-    form = get_object_or_404(Form, slug=slug, status='published')
-    sections = form.sections.all().order_by('order')
-    fields_without_section = form.fields.filter(section__isnull=True).order_by('order')
-    
-    return render(request, 'formbuilder/form_display.html', {
-        'form': form,
-        'sections': sections,
-        'fields_without_section': fields_without_section,
-    })
+    schema = get_published_schema_or_404(slug)
+    etag = schema_etag(schema)
+    response = not_modified(request, etag, schema.updated_at) or render_form_page(
+        request, schema, get_form_body(schema)
+    )
+    return cache_publicly(response, etag, schema.updated_at)
 
 
+@csrf_exempt
 def form_submit(request, slug):
     """Handle form submission"""
-    form = get_object_or_404(Form, slug=slug, status='published')
-    
+    schema = get_published_schema_or_404(slug)
+    # Uploads have to stream through FieldUploadHandler, which must be in
+    # place before anything (the CSRF check included) reads request.POST
+    request.upload_handlers = [FieldUploadHandler(schema, request)]
+    return process_submission(request, schema)
+
+
+@csrf_protect
+def process_submission(request, schema):
     if request.method == 'POST':
-        # Create submission
-        submission = FormSubmission.objects.create(
-            form=form,
+        values, errors = validate_submission(schema, request.POST, request.FILES)
+        if errors:
+            form_body = render_form_body(schema, values=values, errors=errors)
+            return render_form_page(request, schema, form_body, errors)
+        
+        # In queued mode drain_submissions stores it later; files are stored now
+        store = queue_submission if queues_submissions() and not request.FILES else save_submission
+        stored = store(
+            schema,
+            values,
             submitted_by=request.user if request.user.is_authenticated else None,
             ip_address=request.META.get('REMOTE_ADDR')
         )
-        
-        # Save field values
-        for field in form.fields.all():
-            value = request.POST.get(f'field_{field.id}', '')
-            
-            # Handle multiple values (checkboxes)
-            if field.field_type.input_type == 'checkbox':
-                values = request.POST.getlist(f'field_{field.id}')
-                value = ','.join(values)
-            
-            FormFieldValue.objects.create(
-                submission=submission,
-                field=field,
-                value=value
-            )
-        
-        messages.success(request, form.success_message)
-        return redirect('formbuilder:form_success', slug=slug)
+
+        return submission_succeeded(request, schema, stored)
     
-    return redirect('formbuilder:form_display', slug=slug)
+    return redirect('formbuilder:form_display', slug=schema.slug)
+
+
+def success_token(schema, submission_id):
+    """A signed, expiring token naming a stored submission, for the success page URL"""
+    return signing.dumps({'form': schema.id, 'submission': submission_id}, salt='formbuilder.success')
+
+
+def read_success_token(token, schema):
+    """The submission id in a success token for this form, or None if it is invalid or expired"""
+    try:
+        data = signing.loads(token, salt='formbuilder.success', max_age=SUCCESS_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data['submission'] if data.get('form') == schema.id else None
+
+
+def submission_succeeded(request, schema, stored):
+    """
+    Respond to a stored submission without touching the session.
+
+    The success page is reached by a redirect carrying a success token, or
+    with FORMBUILDER_INLINE_SUCCESS set, returned directly in the POST
+    response, which saves the second request but resubmits on a reload.
+    Queued submissions have no id yet and get the plain success page.
+    """
+    submission_id = stored.pk if isinstance(stored, FormSubmission) else None
+    if getattr(settings, 'FORMBUILDER_INLINE_SUCCESS', False):
+        return render_success_page(request, schema, submission_id)
+
+    url = reverse('formbuilder:form_success', kwargs={'slug': schema.slug})
+    if submission_id is not None:
+        url += '?' + urlencode({'token': success_token(schema, submission_id)})
+    return redirect(url)
+
+
+def get_success_schema_or_404(slug):
+    """The published version of a form for its success page, or its live schema if it has none"""
+    schema = get_published_schema(slug) or get_form_schema(slug)
+    if schema is None:
+        raise Http404('No form matches the given query.')
+    return schema
+
+
+def render_success_page(request, schema, submission_id=None):
+    if submission_id is not None:
+        # Names the visitor's own submission, so it is kept out of shared caches
+        response = render(request, 'formbuilder/form_success.html', {
+            'form': schema, 'submission_id': submission_id, 'messages': (),
+        })
+        add_never_cache_headers(response)
+        return response
+
+    etag = schema_etag(schema)
+    response = not_modified(request, etag, schema.updated_at) or render(
+        request, 'formbuilder/form_success.html', {'form': schema, 'messages': ()}
+    )
+    return cache_publicly(response, etag, schema.updated_at)
 
 
 def form_success(request, slug):
     """Show success page after submission"""
-    form = get_object_or_404(Form, slug=slug)
-    return render(request, 'formbuilder/form_success.html', {'form': form})
+    schema = get_success_schema_or_404(slug)
+    token = request.GET.get('token')
+    return render_success_page(request, schema, read_success_token(token, schema) if token else None)
+
+
+@never_cache
+@require_GET
+def api_csrf_token(request):
+    """API: A CSRF token for the public form pages, which are cached without one"""
+    return JsonResponse({'token': get_token(request)})
+
+
+# =============================================================================
+# PUBLIC VIEWS - ASYNC
+# Used instead of the views above when FORMBUILDER_ASYNC_VIEWS is set, so an
+# ASGI worker can serve many slow anonymous clients without a thread each.
+# =============================================================================
+
+async def aget_published_schema_or_404(slug):
+    """Async get_published_schema_or_404"""
+    schema = await aget_published_schema(slug)
+    if schema is None:
+        raise Http404('No published form matches the given query.')
+    return schema
+
+
+async def aform_display(request, slug):
+    """Display form for users to fill out"""
+    schema = await aget_published_schema_or_404(slug)
+    etag = schema_etag(schema)
+    response = not_modified(request, etag, schema.updated_at) or render_form_page(
+        request, schema, await aget_form_body(schema)
+    )
+    return cache_publicly(response, etag, schema.updated_at)
+
+
+@csrf_exempt
+async def aform_submit(request, slug):
+    """Handle form submission"""
+    schema = await aget_published_schema_or_404(slug)
+    request.upload_handlers = [FieldUploadHandler(schema, request)]
+    return await aprocess_submission(request, schema)
+
+
+@csrf_protect
+async def aprocess_submission(request, schema):
+    if request.method == 'POST':
+        values, errors = validate_submission(schema, request.POST, request.FILES)
+        if errors:
+            form_body = render_form_body(schema, values=values, errors=errors)
+            return render_form_page(request, schema, form_body, errors)
+        
+        user = await request.auser()
+        store = aqueue_submission if queues_submissions() and not request.FILES else asave_submission
+        stored = await store(
+            schema,
+            values,
+            submitted_by=user if user.is_authenticated else None,
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+
+        return submission_succeeded(request, schema, stored)
+    
+    return redirect('formbuilder:form_display', slug=schema.slug)
+
+
+async def aform_success(request, slug):
+    """Show success page after submission"""
+    schema = await aget_published_schema(slug) or await aget_form_schema(slug)
+    if schema is None:
+        raise Http404('No form matches the given query.')
+    token = request.GET.get('token')
+    return render_success_page(request, schema, read_success_token(token, schema) if token else None)
 
 
 # =============================================================================
@@ -136,18 +434,144 @@ def api_update_form(request, pk):
     form = get_object_or_404(Form, pk=pk)
     data = json.loads(request.body)
     
-    if 'status' in data:
+    publish = data.get('status') == 'published'
+    if 'status' in data and not publish:
         form.status = data['status']
     if 'name' in data:
         form.name = data['name']
     if 'description' in data:
         form.description = data['description']
-    
-    form.save()
+    if 'retention_days' in data:
+        try:
+            form.retention_days = int(data['retention_days']) if data['retention_days'] else None
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'retention_days must be a number of days'}, status=400)
+        if form.retention_days is not None and form.retention_days < 1:
+            return JsonResponse({'success': False, 'error': 'retention_days must be at least 1'}, status=400)
+    if 'archive_pruned' in data:
+        form.archive_pruned = bool(data['archive_pruned'])
+    
+    if publish:
+        # Freezes the current fields as a new version; saves the form too
+        publish_form(form, published_by=request.user)
+    else:
+        form.save()
     
     return JsonResponse({'success': True})
 
 
+@login_required
+@require_POST
+def api_batch(request, pk):
+    """API: Apply a queued list of builder edits in one request"""
+    form = get_object_or_404(Form, pk=pk)
+    data = json.loads(request.body)
+    
+    try:
+        ids = apply_batch(form, data.get('operations'))
+    except BatchError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, 'ids': ids})
+
+
+# =============================================================================
+# API ENDPOINTS - SUBMISSIONS
+# =============================================================================
+
+@login_required
+@require_GET
+def api_get_submission(request, pk):
+    """API: Get a submission with all of its values"""
+    submission = get_object_or_404(
+        FormSubmission.objects.select_related('form', 'form_version', 'submitted_by'), pk=pk
+    )
+    
+    if submission.form_version is not None:
+        # Labels as they were in the version that was filled in
+        schema = schema_from_snapshot(submission.form, submission.form_version)
+    else:
+        schema = get_form_schema(submission.form.slug)
+    if submission.data is not None:
+        # Labels come from the schema; answers from the JSON payload
+        fields = schema.fields
+        values = get_submission_values(submission)
+        rows = [(field.id, field.label, values[field.id]) for field in fields if field.id in values]
+    else:
+        rows = [
+            (value.field_id, value.field.label, value.value)
+            for value in submission.values.select_related('field')
+        ]
+    
+    downloads = {}
+    if any(field.input_type == 'file' for field in schema.fields):
+        downloads = {
+            field_id: reverse('formbuilder:form_file_download', kwargs={'pk': file_id})
+            for file_id, field_id in submission.files.values_list('id', 'field_id')
+        }
+    
+    return JsonResponse({
+        'id': submission.id,
+        'submitted_by': str(submission.submitted_by) if submission.submitted_by else None,
+        'submitted_at': submission.submitted_at.isoformat(),
+        'version': submission.form_version.number if submission.form_version else None,
+        'values': [
+            {'field_id': field_id, 'label': label, 'value': value, 'download_url': downloads.get(field_id)}
+            for field_id, label, value in rows
+        ],
+    })
+
+
+@login_required
+@require_GET
+def api_filter_submissions(request, pk):
+    """API: One keyset page of submission ids matching field_<id>__<op> filters"""
+    form = get_object_or_404(Form, pk=pk)
+    try:
+        submissions = submission_queryset(form, request.GET).select_related(None).only('id', 'submitted_at')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    submissions, older, newer = keyset_page(
+        submissions,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+        page_size=SUBMISSIONS_PAGE_SIZE,
+    )
+    return JsonResponse({
+        'ids': [submission.id for submission in submissions],
+        'older_cursor': older,
+        'newer_cursor': newer,
+    })
+
+
+@login_required
+@require_GET
+def api_search_submissions(request, pk):
+    """API: Ids of a form's submissions whose answers match ?q=, newest first"""
+    form = get_object_or_404(Form, pk=pk)
+    query = request.GET.get('q', '').strip()
+    return JsonResponse({'query': query, 'ids': search_submissions(form.id, query)})
+
+
+@login_required
+@require_GET
+def api_form_analytics(request, pk):
+    """API: Submission totals, per-day counts and option frequencies for a form"""
+    form = get_object_or_404(Form, pk=pk)
+    return JsonResponse(form_analytics(get_form_schema(form.slug)))
+
+
+@staff_member_required
+@require_GET
+def api_instrumentation(request):
+    """API: Per-view timing and query percentiles from the instrumentation log"""
+    return JsonResponse({
+        'sample_rate': instrumentation.SAMPLE_RATE,
+        'views': instrumentation.summarize(instrumentation.read_records()),
+    })
+
+
 # =============================================================================
 # API ENDPOINTS - SECTIONS
 # =============================================================================
@@ -166,7 +590,7 @@ def api_add_section(request, pk):
         form=form,
         title=data['title'],
         description=data.get('description', ''),
-        order=max_order + 1
+        order=max_order + ORDER_GAP
     )
     
     return JsonResponse({'success': True, 'section_id': section.id})
@@ -176,13 +600,17 @@ def api_add_section(request, pk):
 @require_GET
 def api_get_section(request, pk):
     """API: Get section details"""
-    section = get_object_or_404(FormSection, pk=pk)
+    section = get_object_or_404(FormSection.objects.select_related('form'), pk=pk)
+    etag = f'"{section.form_id}-{section.form.schema_version}-section-{section.pk}"'
+    response = not_modified(request, etag, section.form.updated_at)
+    if response is not None:
+        return cache_privately(response, etag, section.form.updated_at)
     
-    return JsonResponse({
+    return cache_privately(JsonResponse({
         'id': section.id,
         'title': section.title,
         'description': section.description,
-    })
+    }), etag, section.form.updated_at)
 
 
 @login_required
@@ -232,17 +660,14 @@ def api_add_field(request, pk):
         section = get_object_or_404(FormSection, pk=data['section_id'], form=form)
     
     # Parse options if provided
-    options = {}
-    if data.get('options'):
-        choices = []
-        for line in data['options'].strip().split('\n'):
-            line = line.strip()
-            if line:
-                choices.append({'value': line, 'label': line})
-        options = {'choices': choices}
+    options = parse_options(data['options']) if data.get('options') else {}
     
     # Get conditional logic
     conditional_logic = data.get('conditional_logic', {})
+    try:
+        check_conditional_logic(form, None, conditional_logic)
+    except ConditionCycleError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     # Get next order number
     max_order = form.fields.aggregate(models.Max('order'))['order__max'] or 0
@@ -257,7 +682,7 @@ def api_add_field(request, pk):
         is_required=data.get('is_required', False),
         options=options,
         conditional_logic=conditional_logic,
-        order=max_order + 1
+        order=max_order + ORDER_GAP
     )
     
     return JsonResponse({'success': True, 'field_id': field.id})
@@ -267,9 +692,13 @@ def api_add_field(request, pk):
 @require_GET
 def api_get_field(request, pk):
     """API: Get field details"""
-    field = get_object_or_404(FormField, pk=pk)
+    field = get_object_or_404(FormField.objects.select_related('form', 'field_type'), pk=pk)
+    etag = f'"{field.form_id}-{field.form.schema_version}-field-{field.pk}"'
+    response = not_modified(request, etag, field.form.updated_at)
+    if response is not None:
+        return cache_privately(response, etag, field.form.updated_at)
     
-    return JsonResponse({
+    return cache_privately(JsonResponse({
         'id': field.id,
         'label': field.label,
         'help_text': field.help_text,
@@ -279,7 +708,7 @@ def api_get_field(request, pk):
         'has_options': field.field_type.has_options,
         'conditional_logic': field.conditional_logic,
         'section_id': field.section_id,
-    })
+    }), etag, field.form.updated_at)
 
 
 @login_required
@@ -303,15 +732,14 @@ def api_update_field(request, pk):
     
     # Parse options if provided
     if data.get('options'):
-        choices = []
-        for line in data['options'].strip().split('\n'):
-            line = line.strip()
-            if line:
-                choices.append({'value': line, 'label': line})
-        field.options = {'choices': choices}
+        field.options = parse_options(data['options'])
     
     # Update conditional logic
     field.conditional_logic = data.get('conditional_logic', {})
+    try:
+        check_conditional_logic(field.form, field.id, field.conditional_logic)
+    except ConditionCycleError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     field.save()
     
@@ -328,17 +756,45 @@ def api_delete_field(request, pk):
     return JsonResponse({'success': True})
 
 
+def apply_reorder(request, form, queryset, key, section_ids=None):
+    """
+    Apply a reorder payload: either a full list under ``key`` or a single
+    {'move': {'id', 'before' | 'after'}}.
+    """
+    data = json.loads(request.body)
+    try:
+        if 'move' in data:
+            to_move = data['move']
+            updated = move(
+                queryset,
+                int(to_move['id']),
+                before=int(to_move['before']) if to_move.get('before') else None,
+                after=int(to_move['after']) if to_move.get('after') else None,
+            )
+        else:
+            updated = reorder(queryset, data[key], section_ids=section_ids)
+    except (OrderingError, KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    # Bulk updates skip the model signals
+    if updated:
+        bump_schema_version([form.id])
+
+    return JsonResponse({'success': True, 'updated': updated})
+
+
 @login_required
 @require_POST
 def api_reorder_fields(request, pk):
     """API: Reorder fields in a form"""
     form = get_object_or_404(Form, pk=pk)
-    data = json.loads(request.body)
-    
-    for field_data in data['fields']:
-        FormField.objects.filter(
-            id=field_data['id'],
-            form=form
-        ).update(order=field_data['order'])
-    
-    return JsonResponse({'success': True})
\ No newline at end of file
+    section_ids = set(form.sections.values_list('id', flat=True))
+    return apply_reorder(request, form, form.fields.all(), 'fields', section_ids=section_ids)
+
+
+@login_required
+@require_POST
+def api_reorder_sections(request, pk):
+    """API: Reorder sections in a form"""
+    form = get_object_or_404(Form, pk=pk)
+    return apply_reorder(request, form, form.sections.all(), 'sections')